@@ -1,8 +1,26 @@
+import json
+import time
+import asyncio
+import threading
 import logging
+from datetime import datetime
+from typing import Optional
 from config import Config
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Body, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from dotenv import load_dotenv
+from utils.vstore import VectorStoreManager
 from utils.init_vector_store import initialize_vector_store
+from utils.semantic_cache import SemanticCache
+from utils.results_store import ResultsStore
+from utils.prewarm import PrewarmScheduler, catalogue_jobs
+from utils.history_store import HistoryStore, HISTORY_ANALYSES
+from utils.job_queue import JobQueue, TERMINAL_STATUSES
+from utils.admission import AdmissionController, AdmissionControlMiddleware
+from utils.cancellation import RequestCancellationMiddleware, cancellation_stats
+from utils.responses import ModelResponse, CompressionMiddleware
+from utils.usage import UsageAttributionMiddleware, usage_scope, usage_tracker
 from utils.custom_chat_chains import (
     visibility_chain,
     comparison_chain,
@@ -17,6 +35,10 @@ from utils.custom_chat_chains import (
     gpt_perception_chain,
     self_vs_gpt_comparison_chain,
     brand_ranking_chain,
+    brand_differentiators_chain,
+    chain_coalescer,
+    chain_registry,
+    model_router,
 )
 from models.input_models import (
     BrandRequest,
@@ -42,13 +64,16 @@ from models.output_models import (
     GPTPerceptionResponse,
     SelfVsGPTResponse,
     BrandRankingResponse,
+    HistoryWindowResponse,
+    HistoryDeltaResponse,
+    JobStatusResponse,
 )
 
 # Load environment variables
 load_dotenv()
 
-# Initialize vector store
-vector_store_manager = initialize_vector_store()
+# Indices are built from saved scraped data after startup (see `warm_up`), not at import
+vector_store_manager = VectorStoreManager()
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -60,6 +85,218 @@ logging.basicConfig(
 )
 logger = logging.getLogger("brand_analysis_api")
 
+# Results of topic analyses, reused for near-identical topic lists of the same brand
+chain_result_cache = SemanticCache(
+    "chain_results",
+    threshold=Config.SemanticCache.CHAIN_THRESHOLD,
+    scope_thresholds=Config.SemanticCache.CHAIN_THRESHOLDS,
+)
+
+
+async def run_topic_analysis(chain, brand_name, topics, compute):
+    """
+    Run a topic-based analysis through `compute()`, serving a cached result for a semantically
+    equivalent topic list when chain result caching is enabled.
+    """
+    if not Config.SemanticCache.CHAIN_RESULTS_ENABLED:
+        return await compute()
+
+    query = ", ".join(sorted(topics))
+    vector = await vector_store_manager.aembed_query(query, brand=brand_name)
+    scope = f"{chain.name}:{brand_name}"
+    cached = chain_result_cache.lookup(scope, vector, query)
+    if cached is not None:
+        logger.info(f"Serving cached {chain.name} result for {brand_name} on topics: {topics}")
+        return cached.model_copy(update={"topics": topics})
+
+    response = await compute()
+    if response is not None:
+        chain_result_cache.store(scope, vector, query, response)
+    return response
+
+
+# Every computed trends, crisis, health score and regional trends result, for windows and deltas
+history_store = HistoryStore(Config.Paths.HISTORY_DB)
+
+
+def record_history(chain, inputs, response):
+    if response is not None and chain.name in HISTORY_ANALYSES:
+        history_store.append(
+            chain.name,
+            inputs["brand_name"],
+            response,
+            time_period=inputs.get("time_period"),
+            region=inputs.get("region"),
+        )
+
+
+# Analysis results with freshness metadata, filled by interactive requests and off-peak pre-warming
+results_store = ResultsStore(Config.Paths.RESULTS_DB, ttl=Config.Prewarm.RESULT_TTL_SECONDS)
+
+
+async def run_analysis(chain, refresh=False, source="interactive", **inputs):
+    """
+    Serve a fresh stored result for (chain, inputs), or run the chain and store its result.
+
+    Args:
+        refresh (bool): Ignore any stored result and recompute.
+        source (str): Recorded with the result, "interactive" or "prewarm".
+    """
+    if not refresh:
+        stored = results_store.get(chain.name, inputs)
+        if stored is not None:
+            return chain.pydantic_object.model_validate(stored["response"])
+
+    started = time.perf_counter()
+    response = await chain.ainvoke(**inputs)
+    if response is not None:
+        results_store.put(chain.name, inputs, response, time.perf_counter() - started, source=source)
+        record_history(chain, inputs, response)
+    return response
+
+
+async def prewarm_analysis(chain, inputs):
+    with usage_scope(endpoint="prewarm"):
+        return await run_analysis(chain, refresh=True, source="prewarm", **inputs)
+
+
+prewarm_scheduler = PrewarmScheduler(
+    jobs=catalogue_jobs(
+        {
+            chain.name: chain
+            for chain in (visibility_chain, brand_health_score_chain, trend_chain, crisis_analysis_chain, audience_segmentation_chain)
+        },
+        brands=[brand["name"] for brand in Config.VectorStore.BRAND_DATA],
+        time_periods=Config.Prewarm.TIME_PERIODS,
+    ),
+    compute=prewarm_analysis,
+    store=results_store,
+    window_start_hour=Config.Prewarm.WINDOW_START_HOUR,
+    window_end_hour=Config.Prewarm.WINDOW_END_HOUR,
+    max_calls=Config.Prewarm.MAX_CALLS_PER_WINDOW,
+    max_seconds=Config.Prewarm.MAX_SECONDS_PER_WINDOW,
+    concurrency=Config.Prewarm.CONCURRENCY,
+    refresh_after=Config.Prewarm.REFRESH_AFTER_SECONDS,
+    check_interval=Config.Prewarm.CHECK_INTERVAL_SECONDS,
+)
+
+
+# Endpoints whose stored results, even expired ones, are served instead of rejecting a request while shedding load
+SHEDDING_FALLBACK_CHAINS = {
+    "/brand/visibility": visibility_chain,
+    "/brand/trends": trend_chain,
+    "/brand/crisis_analysis": crisis_analysis_chain,
+    "/brand/audience_segmentation": audience_segmentation_chain,
+    "/brand/health_score": brand_health_score_chain,
+}
+
+
+def stored_result_for(path, body):
+    chain = SHEDDING_FALLBACK_CHAINS.get(path)
+    if chain is None:
+        return None
+    stored = results_store.get(chain.name, json.loads(body), include_expired=True)
+    return stored["response"] if stored else None
+
+
+admission_controller = AdmissionController(
+    limits=Config.Admission.LIMITS,
+    default_limit=Config.Admission.DEFAULT_LIMIT,
+    path_prefixes=Config.Admission.PATH_PREFIXES,
+    queue_size=Config.Admission.QUEUE_SIZE,
+    max_wait=Config.Admission.MAX_WAIT_SECONDS,
+    retry_after=Config.Admission.RETRY_AFTER_SECONDS,
+)
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller, fallback=stored_result_for)
+# Added after admission control so it wraps it: requests abandoned while queued are cancelled too
+app.add_middleware(
+    RequestCancellationMiddleware,
+    path_prefixes=Config.Cancellation.PATH_PREFIXES,
+    default_timeout=Config.Cancellation.DEFAULT_TIMEOUT_SECONDS,
+    max_timeout=Config.Cancellation.MAX_TIMEOUT_SECONDS,
+    header=Config.Cancellation.HEADER,
+)
+if Config.Usage.ENABLED:
+    # Wraps cancellation, whose request task inherits the attribution set here
+    app.add_middleware(UsageAttributionMiddleware, header=Config.Usage.REQUEST_ID_HEADER)
+if Config.Compression.ENABLED:
+    # Outermost, so stored-result fallbacks and every other JSON body are compressed alike
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=Config.Compression.MINIMUM_SIZE,
+        gzip_level=Config.Compression.GZIP_LEVEL,
+        brotli_quality=Config.Compression.BROTLI_QUALITY,
+    )
+
+
+def build_indices_and_chains():
+    with usage_scope(endpoint="startup"):
+        initialize_vector_store(vector_store_manager)
+    for chain in chain_registry.values():
+        try:
+            chain.build()
+        except Exception:
+            pass  # Logged by the chain; retried on its first call
+
+
+@app.on_event("startup")
+async def warm_up():
+    """
+    Build the brand indices and chains in the background, so the server answers from the moment it starts.
+    """
+    app.state.warm_up = asyncio.create_task(asyncio.to_thread(build_indices_and_chains))
+
+
+def require_indices():
+    """
+    Dependency of the endpoints that analyze retrieved website content: answer 503 while the brand
+    indices are still being built, instead of running the analysis without any context.
+    """
+    warm_up = getattr(app.state, "warm_up", None)
+    if warm_up is not None and not warm_up.done():
+        raise HTTPException(
+            status_code=503,
+            detail="Brand indices are still being built, retry shortly",
+            headers={"Retry-After": str(Config.VectorStore.WARM_UP_RETRY_AFTER_SECONDS)},
+        )
+
+
+async def wait_for_indices():
+    """
+    Wait until the brand indices are built, for background work that can afford to.
+    """
+    warm_up = getattr(app.state, "warm_up", None)
+    if warm_up is not None:
+        await asyncio.wait({warm_up})
+
+
+@app.on_event("startup")
+async def start_prewarm_scheduler():
+    if Config.Prewarm.ENABLED:
+        # Pre-warmed results are computed over the brand indices, so wait for them
+        app.state.warm_up.add_done_callback(lambda _: prewarm_scheduler.start())
+
+
+@app.on_event("shutdown")
+async def stop_prewarm_scheduler():
+    await prewarm_scheduler.stop()
+
+
+@app.on_event("startup")
+async def start_usage_tracker():
+    usage_tracker.start()
+
+
+@app.on_event("shutdown")
+async def stop_usage_tracker():
+    await usage_tracker.stop()
+
+
+@app.on_event("shutdown")
+async def close_semantic_caches():
+    for cache in (vector_store_manager.retrieval_cache, chain_result_cache):
+        await asyncio.to_thread(cache.close)
+
 
 # APIs
 
@@ -70,14 +307,59 @@ async def api_get_brand_visibility(request: BrandRequest):
     """
     try:
         logger.info(f"Received request for brand visibility: {request.brand_name}")
-        response = visibility_chain.invoke(brand_name=request.brand_name)
+        response = await run_analysis(visibility_chain, brand_name=request.brand_name)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing visibility request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process brand visibility analysis")
 
 
+async def brand_visibility_profiles(brands):
+    """
+    Visibility results of `brands`: fresh stored results are reused and missing brands are
+    analyzed concurrently, so composing a comparison costs one LLM call per missing brand.
+
+    Returns:
+        dict[str, BrandVisibilityResponse]: Results keyed by brand, in the order of `brands`.
+    """
+    brands = list(dict.fromkeys(brands))
+    responses = await asyncio.gather(*(run_analysis(visibility_chain, brand_name=brand) for brand in brands))
+    missing = [brand for brand, response in zip(brands, responses) if response is None]
+    if missing:
+        raise ValueError(f"No visibility analysis for {missing}")
+    return dict(zip(brands, responses))
+
+
+async def brand_differentiators(profiles):
+    """
+    Key differentiators of each brand from one LLM call over the brands' visibility profiles.
+    The call is stored like any analysis, so repeating a comparison over unchanged profiles is free.
+    """
+    brand_profiles = json.dumps({brand: response.model_dump() for brand, response in profiles.items()}, indent=1)
+    response = await run_analysis(brand_differentiators_chain, brand_profiles=brand_profiles)
+    if response is None:
+        raise ValueError(f"No differentiators for {list(profiles)}")
+    by_brand = {entry.brand_name.casefold(): entry.differentiators for entry in response.brands}
+    return {brand: by_brand.get(brand.casefold(), []) for brand in profiles}
+
+
+async def compare_brands(request: BrandComparisonRequest):
+    """
+    Compare two brands, directly with the comparison chain or composed from their visibility results.
+    """
+    if (request.mode or Config.Comparison.MODE) == "direct":
+        return await comparison_chain.ainvoke(brand1=request.brand1, brand2=request.brand2)
+
+    profiles = await brand_visibility_profiles([request.brand1, request.brand2])
+    differentiators = await brand_differentiators(profiles)
+    return BrandComparisonResponse(
+        brand1_visibility=profiles[request.brand1].visibility_score,
+        brand2_visibility=profiles[request.brand2].visibility_score,
+        differentiators=[f"{brand}: {item}" for brand, items in differentiators.items() for item in items],
+    )
+
+
 @app.post("/brand/comparison", response_model=BrandComparisonResponse)
 async def api_compare_brands(request: BrandComparisonRequest):
     """
@@ -85,9 +367,9 @@ async def api_compare_brands(request: BrandComparisonRequest):
     """
     try:
         logger.info(f"Received request to compare brands: {request.brand1} and {request.brand2}")
-        response = comparison_chain.invoke(brand1=request.brand1, brand2=request.brand2)
+        response = await compare_brands(request)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing comparison request between {request.brand1} and {request.brand2}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process brand comparison")
@@ -100,9 +382,9 @@ async def api_get_brand_trends(request: TrendRequest):
     """
     try:
         logger.info(f"Received request for brand trends: {request.brand_name} over {request.time_period}")
-        response = trend_chain.invoke(brand_name=request.brand_name, time_period=request.time_period)
+        response = await run_analysis(trend_chain, brand_name=request.brand_name, time_period=request.time_period)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing trends request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process brand trends analysis")
@@ -115,9 +397,9 @@ async def api_get_emerging_competitors(request: BrandRequestWithIndustry):
     """
     try:
         logger.info(f"Received request for emerging competitors: {request.brand_name} in industry: {request.industry}")
-        response = emerging_competitors_chain.invoke(brand_name=request.brand_name, industry=request.industry)
+        response = await emerging_competitors_chain.ainvoke(brand_name=request.brand_name, industry=request.industry)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing emerging competitors request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process emerging competitors analysis")
@@ -130,9 +412,9 @@ async def api_get_crisis_analysis(request: TrendRequest):
     """
     try:
         logger.info(f"Received request for crisis analysis: {request.brand_name} over {request.time_period}")
-        response = crisis_analysis_chain.invoke(brand_name=request.brand_name, time_period=request.time_period)
+        response = await run_analysis(crisis_analysis_chain, brand_name=request.brand_name, time_period=request.time_period)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing crisis analysis request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process crisis analysis")
@@ -145,14 +427,38 @@ async def api_get_audience_segmentation(request: TrendRequest):
     """
     try:
         logger.info(f"Received request for audience segmentation: {request.brand_name} over {request.time_period}")
-        response = audience_segmentation_chain.invoke(brand_name=request.brand_name, time_period=request.time_period)
+        response = await run_analysis(audience_segmentation_chain, brand_name=request.brand_name, time_period=request.time_period)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing audience segmentation request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process audience segmentation")
 
 
+async def benchmark_competitors(request: CompetitiveBenchmarkingRequest):
+    """
+    Benchmark a brand against its competitors, directly with the benchmarking chain or composed
+    from the brands' visibility results. Visibility results are not scoped to a time period, so
+    compositional benchmarks do not depend on `time_period`.
+    """
+    if (request.mode or Config.Comparison.MODE) == "direct":
+        return await competitive_benchmarking_chain.ainvoke(
+            brand_name=request.brand_name,
+            competitors=request.competitors,
+            time_period=request.time_period
+        )
+
+    profiles = await brand_visibility_profiles([request.brand_name, *request.competitors])
+    differentiators = await brand_differentiators(profiles)
+    return CompetitiveBenchmarkingResponse(
+        brand_name=request.brand_name,
+        competitors=request.competitors,
+        visibility_scores={brand: response.visibility_score for brand, response in profiles.items()},
+        sentiment_distributions={brand: response.key_sentiments.model_dump() for brand, response in profiles.items()},
+        key_differentiators=differentiators,
+    )
+
+
 @app.post("/brand/competitive_benchmarking", response_model=CompetitiveBenchmarkingResponse)
 async def api_get_competitive_benchmarking(request: CompetitiveBenchmarkingRequest):
     """
@@ -160,13 +466,9 @@ async def api_get_competitive_benchmarking(request: CompetitiveBenchmarkingReque
     """
     try:
         logger.info(f"Received request for competitive benchmarking: {request.brand_name} with competitors {request.competitors}")
-        response = competitive_benchmarking_chain.invoke(
-            brand_name=request.brand_name,
-            competitors=request.competitors,
-            time_period=request.time_period
-        )
+        response = await benchmark_competitors(request)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing competitive benchmarking: {e}")
         raise HTTPException(status_code=500, detail="Failed to process competitive benchmarking")
@@ -179,9 +481,9 @@ async def api_get_brand_health_score(request: BrandRequest):
     """
     try:
         logger.info(f"Received request for brand health score: {request.brand_name}")
-        response = brand_health_score_chain.invoke(brand_name=request.brand_name)
+        response = await run_analysis(brand_health_score_chain, brand_name=request.brand_name)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing brand health score: {e}")
         raise HTTPException(status_code=500, detail="Failed to process brand health score")
@@ -194,148 +496,435 @@ async def api_get_regional_trends(request: RegionalTrendRequest):
     """
     try:
         logger.info(f"Received request for regional trends: {request.brand_name} in {request.time_period}")
-        response = regional_trends_chain.invoke(
-            brand_name=request.brand_name,
-            region=request.region,
-            time_period=request.time_period
-        )
+        inputs = {"brand_name": request.brand_name, "region": request.region, "time_period": request.time_period}
+        response = await regional_trends_chain.ainvoke(**inputs)
+        record_history(regional_trends_chain, inputs, response)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing regional trends: {e}")
         raise HTTPException(status_code=500, detail="Failed to process regional trends")
 
 
-@app.post("/brand/self_representation", response_model=SelfRepresentationResponse)
+@app.post("/brand/self_representation", response_model=SelfRepresentationResponse, dependencies=[Depends(require_indices)])
 async def api_get_self_representation(request: MultiTopicRequest):
     """
     Analyze a brand's self-representation.
     """
     try:
         logger.info(f"Analyzing self-representation for {request.brand_name} on topics: {request.topics}")
-        documents = vector_store_manager.retrieve_documents_by_topics(request.brand_name, request.topics)
-        response = self_representation_chain.invoke(
-            brand_name=request.brand_name,
-            topics=request.topics,
-            retrieved_documents="\n".join([doc.page_content for doc in documents]),
-        )
-        return response
+
+        async def compute():
+            documents = await vector_store_manager.aretrieve_documents_by_topics(request.brand_name, request.topics)
+            return await self_representation_chain.ainvoke(
+                brand_name=request.brand_name,
+                topics=request.topics,
+                retrieved_documents="\n".join([doc.page_content for doc in documents]),
+            )
+
+        response = await run_topic_analysis(self_representation_chain, request.brand_name, request.topics, compute)
+        if response:
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing self-representation request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process self-representation analysis")
 
 
-@app.post("/brand/gpt_perception", response_model=GPTPerceptionResponse)
+@app.post("/brand/gpt_perception", response_model=GPTPerceptionResponse, dependencies=[Depends(require_indices)])
 async def api_get_gpt_perception(request: MultiTopicRequest):
     """
     Analyze GPT's perception of a brand.
     """
     try:
         logger.info(f"Analyzing GPT perception for {request.brand_name} on topics: {request.topics}")
-        documents = vector_store_manager.retrieve_documents_by_topics(request.brand_name, request.topics)
-        response = gpt_perception_chain.invoke(
-            brand_name=request.brand_name,
-            topics=request.topics,
-            retrieved_documents=documents,
-        )
-        return response
+
+        async def compute():
+            documents = await vector_store_manager.aretrieve_documents_by_topics(request.brand_name, request.topics)
+            return await gpt_perception_chain.ainvoke(
+                brand_name=request.brand_name,
+                topics=request.topics,
+                retrieved_documents=documents,
+            )
+
+        response = await run_topic_analysis(gpt_perception_chain, request.brand_name, request.topics, compute)
+        if response:
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing GPT perception request for {request.brand_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to process GPT perception analysis")
 
 
-@app.post("/brand/self_vs_gpt", response_model=SelfVsGPTResponse)
+@app.post("/brand/self_vs_gpt", response_model=SelfVsGPTResponse, dependencies=[Depends(require_indices)])
 async def api_self_vs_gpt(request: MultiTopicRequest):
     """
     Compare a brand's self-representation with GPT's perception.
     """
     try:
         logger.info(f"Received request for self vs GPT analysis: {request.brand_name} on topics: {request.topics}")
-        
-        documents = vector_store_manager.retrieve_documents_by_topics(request.brand_name, topics=request.topics)
-        if not documents:
-            logger.error(f"No relevant documents found for {request.brand_name}. Skipping.")
-            
-        response = self_vs_gpt_comparison_chain.invoke(
-            brand_name=request.brand_name,
-            retrieved_documents=documents,
-            topics=request.topics
-        )
+
+        async def compute():
+            documents = await vector_store_manager.aretrieve_documents_by_topics(request.brand_name, topics=request.topics)
+            if not documents:
+                logger.error(f"No relevant documents found for {request.brand_name}. Skipping.")
+            return await self_vs_gpt_comparison_chain.ainvoke(
+                brand_name=request.brand_name,
+                retrieved_documents=documents,
+                topics=request.topics
+            )
+
+        response = await run_topic_analysis(self_vs_gpt_comparison_chain, request.brand_name, request.topics, compute)
         if response:
-            return response
+            return ModelResponse(response)
     except Exception as e:
         logger.error(f"Error processing self vs GPT analysis: {e}")
         raise HTTPException(status_code=500, detail="Failed to process self vs GPT analysis")
 
 
-@app.post("/brand/self_representation_ranking")#, response_model=BrandSelfRepresentationRankingResponse
+async def rank_brands_by_self_representation(request: BrandRankingRequest):
+    """
+    Score each brand's self-representation on the topics and rank the brands by score.
+    """
+    brand_scores = []
+
+    for brand_name in request.brands:
+        try:
+            documents = await vector_store_manager.aretrieve_documents_by_topics(brand_name, topics=request.topics)
+            if not documents:
+                logger.warning(f"No relevant documents found for {brand_name}. Skipping.")
+                continue
+
+            response = await self_representation_chain.ainvoke(
+                brand_name=brand_name,
+                retrieved_documents=documents,
+                topics=request.topics,
+            )
+            brand_scores.append({
+                "brand_name": brand_name,
+                "score": response.self_representation_score,
+                "insights": response.insights,
+            })
+
+        except Exception as e:
+            logger.error(f"Error evaluating self-representation for {brand_name}: {e}")
+
+    ranked_brands = sorted(brand_scores, key=lambda x: x["score"], reverse=True)
+    return {"ranked_brands": ranked_brands}
+
+
+@app.post("/brand/self_representation_ranking", dependencies=[Depends(require_indices)])#, response_model=BrandSelfRepresentationRankingResponse
 async def api_rank_brands_by_self_representation(request: BrandRankingRequest):
     """
     Rank brands based on self-representation across a set of topics.
     """
     try:
         logger.info(f"Ranking brands based on self-representation: {request.brands}")
-        brand_scores = []
-
-        for brand_name in request.brands:
-            try:
-                documents = vector_store_manager.retrieve_documents_by_topics(brand_name, topics=request.topics)
-                if not documents:
-                    logger.warning(f"No relevant documents found for {brand_name}. Skipping.")
-                    continue
-
-                response = self_representation_chain.invoke(
-                    brand_name=brand_name,
-                    retrieved_documents=documents,
-                    topics=request.topics,
-                )
-                brand_scores.append({
-                    "brand_name": brand_name,
-                    "score": response.self_representation_score,
-                    "insights": response.insights,
-                })
-
-            except Exception as e:
-                logger.error(f"Error evaluating self-representation for {brand_name}: {e}")
-
-        ranked_brands = sorted(brand_scores, key=lambda x: x["score"], reverse=True)
-        return {"ranked_brands": ranked_brands}
+        return ModelResponse(await rank_brands_by_self_representation(request))
     except Exception as e:
         logger.error(f"Error processing self-representation ranking: {e}")
         raise HTTPException(status_code=500, detail="Failed to process self-representation ranking")
 
 
-@app.post("/brand/rankings", response_model=BrandRankingResponse)
+async def rank_brands(request: BrandRankingRequest):
+    """
+    Rank brands per topic and overall from their retrieved website content.
+    """
+    all_documents = []
+
+    for brand in request.brands:
+        documents = await vector_store_manager.aretrieve_documents_by_topics(brand, request.topics)
+        if documents:
+            all_documents.append({
+                "brand": brand,
+                "documents": "\n".join([doc.page_content for doc in documents])
+            })
+        else:
+            logger.warning(f"No relevant documents found for {brand}")
+
+    return await brand_ranking_chain.ainvoke(
+        brands=request.brands,
+        topics=request.topics,
+        retrieved_documents=all_documents
+    )
+
+
+@app.post("/brand/rankings", response_model=BrandRankingResponse, dependencies=[Depends(require_indices)])
 async def api_rank_brands(request: BrandRankingRequest):
     """
     Rank brands based on their performance across multiple topics.
     """
     try:
         logger.info(f"Received request to rank brands: {request.brands} for topics: {request.topics}")
-        all_documents = []
-        
-        for brand in request.brands:
-            documents = vector_store_manager.retrieve_documents_by_topics(brand, request.topics)
-            if documents:
-                all_documents.append({
-                    "brand": brand,
-                    "documents": "\n".join([doc.page_content for doc in documents])
-                })
-            else:
-                logger.warning(f"No relevant documents found for {brand}")
-
-        response = brand_ranking_chain.invoke(
-            brands=request.brands,
-            topics=request.topics,
-            retrieved_documents=all_documents
-        )
+        response = await rank_brands(request)
 
         if response:
             logger.info(f"Ranking response: {response}")
-            return response.dict()
+            return ModelResponse(response)
         else:
             raise ValueError("Chain did not return a response.")
 
     except Exception as e:
         logger.error(f"Error processing brand rankings: {e}")
-        return {"error": "Failed to process brand rankings"}
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to process brand rankings")
+
+
+async def refresh_brand(request: BrandRequest):
+    """
+    Re-crawl one configured brand on the shared browser pool and swap in indices built from the new crawl.
+
+    A brand has at most one refresh running. When the job times out or is cancelled, its crawl thread
+    is told to stop after the current page and the brand keeps its current data and indices.
+    """
+    brand = next((brand for brand in Config.VectorStore.BRAND_DATA if brand["name"] == request.brand_name), None)
+    if brand is None:
+        raise ValueError(f"Unknown brand: {request.brand_name}")
+    from utils.browser_pool import browser_pool_service
+
+    stop = threading.Event()
+    try:
+        rebuilt = await asyncio.to_thread(vector_store_manager.refresh_brand, brand["url"], brand["name"], stop)
+    except asyncio.CancelledError:
+        stop.set()
+        raise
+    if not rebuilt:
+        raise ValueError(f"The new crawl of {request.brand_name} returned no pages; its data and indices were kept")
+    # Topic analyses cached over the previous indices are stale now
+    chain_result_cache.clear()
+    return {"brand_name": request.brand_name, "browser_pool": browser_pool_service.stats()}
+
+
+# Heavy work that can run as background jobs: request model and implementation per job type
+JOB_TYPES = {
+    "rankings": (BrandRankingRequest, rank_brands),
+    "self_representation_ranking": (BrandRankingRequest, rank_brands_by_self_representation),
+    "competitive_benchmarking": (CompetitiveBenchmarkingRequest, benchmark_competitors),
+    "refresh_brand": (BrandRequest, refresh_brand),
+}
+
+
+def job_handler(job_type, request_model, analysis):
+    async def handle(payload):
+        # Jobs resumed at startup would otherwise run before the indices they retrieve from exist
+        await wait_for_indices()
+        with usage_scope(endpoint=f"/jobs/{job_type}"):
+            response = await analysis(request_model.model_validate(payload))
+        if response is None:
+            raise ValueError("Analysis did not return a result")
+        return response.model_dump() if hasattr(response, "model_dump") else response
+    return handle
+
+
+job_queue = JobQueue(
+    Config.Paths.JOBS_DB,
+    handlers={job_type: job_handler(job_type, *spec) for job_type, spec in JOB_TYPES.items()},
+    concurrency=Config.Jobs.CONCURRENCY,
+    timeouts=Config.Jobs.TIMEOUT_SECONDS,
+    workers=Config.Jobs.WORKERS,
+)
+
+
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+
+@app.post("/jobs/{job_type}", response_model=JobStatusResponse, status_code=202)
+async def api_submit_job(job_type: str, payload: dict = Body(...)):
+    """
+    Queue a heavy analysis and return its job ID immediately.
+    """
+    if job_type not in JOB_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown job type: {job_type}")
+    request_model, _ = JOB_TYPES[job_type]
+    try:
+        request = request_model.model_validate(payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    job_id = job_queue.submit(job_type, request.model_dump())
+    logger.info(f"Queued {job_type} job {job_id}")
+    return job_queue.get(job_id)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def api_get_job(job_id: str):
+    """
+    Get the status of a job, and its result once it has succeeded.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def api_stream_job(job_id: str):
+    """
+    Stream status changes of a job as server-sent events until it finishes.
+    """
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+
+    async def events():
+        last_status = None
+        while True:
+            job = job_queue.get(job_id)
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {JobStatusResponse.model_validate(job).model_dump_json()}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            await job_queue.wait_for_change(timeout=Config.Jobs.STREAM_KEEPALIVE_SECONDS)
+            yield ": keepalive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatusResponse)
+async def api_cancel_job(job_id: str):
+    """
+    Cancel a queued or running job.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if not job_queue.cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already {job['status']}")
+    return job_queue.get(job_id)
+
+
+def _check_history_type(analysis_type):
+    if analysis_type not in HISTORY_ANALYSES:
+        raise HTTPException(status_code=404, detail=f"No history for analysis type: {analysis_type}")
+
+
+@app.get("/history/{analysis_type}", response_model=HistoryWindowResponse)
+async def api_get_history(
+    analysis_type: str,
+    brand_name: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    time_period: Optional[str] = None,
+    region: Optional[str] = None,
+    limit: int = 100,
+):
+    """
+    Get stored results of an analysis for a brand within a time window, without calling the model.
+    """
+    _check_history_type(analysis_type)
+    records = history_store.window(
+        analysis_type,
+        brand_name,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None,
+        time_period=time_period,
+        region=region,
+        limit=limit,
+    )
+    return {"brand_name": brand_name, "analysis_type": analysis_type, "records": records}
+
+
+@app.get("/history/{analysis_type}/delta", response_model=HistoryDeltaResponse)
+async def api_get_history_delta(
+    analysis_type: str,
+    brand_name: str,
+    since: Optional[datetime] = None,
+    time_period: Optional[str] = None,
+    region: Optional[str] = None,
+):
+    """
+    Get the changes between the latest stored result and the previous one (or the oldest one since `since`).
+    """
+    _check_history_type(analysis_type)
+    delta = history_store.delta(
+        analysis_type,
+        brand_name,
+        since=since.timestamp() if since else None,
+        time_period=time_period,
+        region=region,
+    )
+    if delta is None:
+        raise HTTPException(status_code=404, detail=f"Fewer than two stored {analysis_type} results for {brand_name}")
+    return {"brand_name": brand_name, "analysis_type": analysis_type, **delta}
+
+
+@app.get("/metrics/coalescing")
+async def api_get_coalescing_metrics():
+    """
+    Get request coalescing counters per chain: requests received, LLM calls made and calls saved.
+    """
+    return chain_coalescer.stats()
+
+
+@app.get("/metrics/semantic_cache")
+async def api_get_semantic_cache_metrics():
+    """
+    Get hit/miss counters of the semantic retrieval and chain result caches.
+    """
+    return {
+        "retrieval": vector_store_manager.retrieval_cache.stats(),
+        "chain_results": chain_result_cache.stats(),
+    }
+
+
+@app.get("/metrics/prewarm")
+async def api_get_prewarm_metrics():
+    """
+    Get results store freshness counters and pre-warm scheduler progress.
+    """
+    return {
+        "results_store": results_store.stats(),
+        "scheduler": prewarm_scheduler.stats(),
+    }
+
+
+@app.get("/metrics/admission")
+async def api_get_admission_metrics():
+    """
+    Get per-endpoint admission counters: active and waiting requests, rejections and cache fallbacks.
+    """
+    return admission_controller.stats()
+
+
+@app.get("/metrics/routing")
+async def api_get_routing_metrics():
+    """
+    Get per-route (chain, model) call counts, unusable outputs, escalations, tokens, cost and latency.
+    """
+    return model_router.stats()
+
+
+@app.get("/usage/summary")
+async def api_get_usage_summary(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    group_by: str = "endpoint,brand,model",
+):
+    """
+    Get tokens, latency and cost of chat and embedding calls per group of `group_by` (comma-separated
+    request_id, endpoint, brand, chain, kind and/or model) between `since` and `until`.
+    """
+    try:
+        return await asyncio.to_thread(
+            usage_tracker.summary,
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            group_by=tuple(dimension.strip() for dimension in group_by.split(",") if dimension.strip()),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/metrics/cancellation")
+async def api_get_cancellation_metrics():
+    """
+    Get requests cancelled by client disconnects or deadlines, the work stages cut short, and shared
+    LLM calls cancelled after all their callers went away.
+    """
+    return {
+        **cancellation_stats.stats(),
+        "coalesced_calls_cancelled": chain_coalescer.stats()["totals"]["cancelled"],
+    }
@@ -0,0 +1,81 @@
+"""
+Per-call overhead of a chain excluding the network: the previous per-call format instructions and
+full f-string logging versus pre-partialed prompts with sampled, size-capped lazy logging.
+
+A fake chat model returns a fixed valid response, so the timings only cover prompt rendering,
+logging and output parsing. Log records are written to os.devnull.
+
+Usage (from the backend directory):
+    python benchmarks/bench_chain_overhead.py [--calls 500] [--documents 20]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain.docstore.document import Document as LangChainDocument
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.output_parsers import JsonOutputParser
+
+from models.output_models import SelfRepresentationResponse
+from utils.custom_chat_chains import custom_chat_chain, logger, self_representation_prompt
+
+RESPONSE = (
+    '{"brand_name": "Ally", "topics": ["loans", "savings"], "self_representation_score": 82, '
+    '"insights": ["Ally presents itself as a digital-first bank."]}'
+)
+
+
+def previous_invoke(chain, parser, pydantic_object, **kwargs):
+    kwargs["format_instructions"] = parser.get_format_instructions()
+    logger.info(f"Invoking chain with input: {kwargs}")
+    response = chain.invoke(kwargs)
+    logger.info(f"Chain output: {response}")
+    return pydantic_object(**response)
+
+
+def timed(calls, fn):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--documents", type=int, default=20, help="retrieved documents passed to the prompt")
+    args = parser.parse_args()
+
+    logger.handlers = [logging.FileHandler(os.devnull)]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    documents = [
+        LangChainDocument(page_content="Ally Bank offers savings accounts and auto loans. " * 20, metadata={"url": f"https://ally.com/{i}"})
+        for i in range(args.documents)
+    ]
+    inputs = {"brand_name": "Ally", "topics": ["loans", "savings"], "retrieved_documents": documents}
+
+    fake = FakeListChatModel(responses=[RESPONSE])
+    json_parser = JsonOutputParser(pydantic_object=SelfRepresentationResponse)
+    previous_chain = self_representation_prompt | fake | json_parser
+
+    current = custom_chat_chain(SelfRepresentationResponse, self_representation_prompt, name="bench", output_mode="prompt")
+    current.chain = current.prompt | fake
+
+    previous = timed(args.calls, lambda: previous_invoke(previous_chain, json_parser, SelfRepresentationResponse, **inputs))
+    now = timed(args.calls, lambda: current.invoke(**inputs))
+    print(f"calls: {args.calls}, documents per call: {args.documents}")
+    print(f"previous (per-call instructions, full logging): {previous:9.1f} us/call")
+    print(f"pre-partialed, sampled capped logging:          {now:9.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
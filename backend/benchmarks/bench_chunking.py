@@ -0,0 +1,44 @@
+"""
+Chunk count and embedding volume of the previous flat chunking versus structure-aware chunking.
+
+Usage (from the backend directory):
+    python benchmarks/bench_chunking.py [--brand Ally]
+
+Requires saved scraped data for the brand (see `VectorStoreManager.load_scraped_data`).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config import Config
+from utils.chunking import StructuredChunker
+from utils.vstore import VectorStoreManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brand", default=Config.VectorStore.BRAND_DATA[0]["name"])
+    args = parser.parse_args()
+
+    scraped_data = list(VectorStoreManager().load_scraped_data(args.brand) or [])  # Chunked twice
+    if not scraped_data:
+        sys.exit(f"No saved scraped data for {args.brand}")
+
+    flat_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    flat_chunks = [chunk for data in scraped_data if data.get("content") for chunk in flat_splitter.split_text(data["content"])]
+    _, structured = StructuredChunker().chunk_pages(scraped_data, args.brand)
+
+    flat_chars = sum(len(chunk) for chunk in flat_chunks)
+    structured_chars = sum(len(document.page_content) for document in structured)
+    print(f"pages: {len(scraped_data)}")
+    print(f"flat (1000/200):   {len(flat_chunks):6d} chunks {flat_chars:10d} chars embedded")
+    print(f"structure-aware:   {len(structured):6d} chunks {structured_chars:10d} chars embedded")
+    print(f"with header path:  {sum(1 for d in structured if d.metadata['header_path'])} chunks")
+
+
+if __name__ == "__main__":
+    main()
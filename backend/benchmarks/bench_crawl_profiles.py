@@ -0,0 +1,48 @@
+"""
+Pages/sec benchmark for the crawl profiles in `utils.crawl_profiles`.
+
+Crawls the same site once per profile and reports throughput and how pages were fetched.
+
+Usage (from the backend directory):
+    python benchmarks/bench_crawl_profiles.py --url https://www.ally.com/ --max-depth 1
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from utils.crawl_profiles import PROFILES, CrawlStats
+from utils.playwright_scraper import scrape_website_recursive
+
+
+async def run(url, max_depth, profiles):
+    rows = []
+    for name in profiles:
+        stats = CrawlStats(PROFILES[name])
+        await scrape_website_recursive(url, max_depth=max_depth, profile=PROFILES[name], stats=stats)
+        rows.append(stats.as_dict())
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=Config.VectorStore.BRAND_DATA[0]["url"])
+    parser.add_argument("--max-depth", type=int, default=1)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.url, args.max_depth, args.profiles))
+    print(f"{'profile':<8} {'pages':>6} {'http':>6} {'browser':>8} {'fallback':>9} {'blocked':>8} {'secs':>8} {'pages/s':>8}")
+    for row in rows:
+        print(
+            f"{row['profile']:<8} {row['pages']:>6} {row['pages_http']:>6} {row['pages_browser']:>8} "
+            f"{row['browser_fallbacks']:>9} {row['blocked_requests']:>8} {row['elapsed_seconds']:>8.1f} "
+            f"{row['pages_per_second']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Memory of a brand's docstores: LangChain's InMemoryDocstore of Document objects versus the
+columnar CompactDocstore.
+
+Each variant runs in a fresh subprocess that loads the brand's saved scraped data and, for
+`--brands` resident copies, builds the documents of the title, content and paragraph indices and
+moves them into docstores. It reports the RSS growth (Linux) and the Python heap (tracemalloc)
+held per brand afterwards, plus the time of a document lookup. No embeddings are computed.
+
+Usage (from the backend directory):
+    python benchmarks/bench_docstore_memory.py [--brand Ally]
+"""
+import gc
+import sys
+import ctypes
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+
+from config import Config
+from utils.compact_docstore import CompactDocstore
+from utils.vstore import VectorStoreManager
+
+VARIANTS = ["in_memory", "compact"]
+
+
+def rss_bytes():
+    # Hand freed heap pages back to the OS first so RSS reflects live memory
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except OSError:
+        pass
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def build_stores(scraped_data, brand, variant):
+    titles, (content_ids, contents), paragraphs = VectorStoreManager.brand_documents(scraped_data, brand)
+    stores = [
+        InMemoryDocstore({str(i): document for i, document in enumerate(titles)}),
+        InMemoryDocstore(dict(zip(content_ids, contents))),
+        InMemoryDocstore(dict(paragraphs)),
+    ]
+    del titles, contents, paragraphs
+    if variant == "compact":
+        stores = [CompactDocstore.from_docstore(store) for store in stores]
+    return stores
+
+
+def measure(brand, variant, brands):
+    scraped_data = list(VectorStoreManager().load_scraped_data(brand) or [])  # Built from once per brand
+    if not scraped_data:
+        sys.exit(f"No saved scraped data for {brand}")
+    gc.collect()
+    rss_before = rss_bytes()
+    tracemalloc.start()
+
+    # Stores of several brands stay resident, as in the API; each build reuses memory freed by the previous one
+    resident = [build_stores(scraped_data, f"{brand}{i}", variant) for i in range(brands)]
+    gc.collect()
+
+    heap, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_bytes()
+
+    paragraphs = resident[0][2]
+    ids = list(paragraphs._dict) if variant == "in_memory" else list(paragraphs._ids)
+    start = time.perf_counter()
+    for document_id in ids[:10000]:
+        paragraphs.search(document_id)
+    lookup_us = (time.perf_counter() - start) / max(1, min(len(ids), 10000)) * 1e6
+
+    return {
+        "documents": sum(len(store._dict) if variant == "in_memory" else len(store) for store in resident[0]),
+        "rss_mb": (rss_after - rss_before) / 2**20 / brands,
+        "heap_mb": heap / 2**20 / brands,
+        "lookup_us": lookup_us,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brand", default=Config.VectorStore.BRAND_DATA[0]["name"])
+    parser.add_argument("--brands", type=int, default=4, help="copies of the brand kept resident")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(measure(args.brand, args.variant, args.brands)))
+        return
+
+    print(f"brand: {args.brand}, resident copies: {args.brands} (memory reported per brand)")
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--brand", args.brand, "--brands", str(args.brands), "--variant", variant],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{variant:10s} documents: {result['documents']:7d}  RSS: {result['rss_mb']:8.1f} MB  "
+            f"heap: {result['heap_mb']:8.1f} MB  lookup: {result['lookup_us']:6.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
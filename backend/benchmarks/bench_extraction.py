@@ -0,0 +1,102 @@
+"""
+Per-page CPU benchmark for HTML extraction.
+
+Compares the previous extraction path (BeautifulSoup `html.parser` plus a Python port of the
+recursive structured-text traversal that used to run in the browser) with the single-pass
+lxml extractor in `utils.html_extraction`.
+
+Usage (from the backend directory):
+    python benchmarks/bench_extraction.py [--brand Ally] [--repeat 5]
+
+Pages are taken from the saved scraped data of the brand when available, otherwise a
+synthetic page is used.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+from config import Config
+from utils.html_extraction import extract_page, normalize_text
+
+
+def legacy_extract(page_source):
+    """
+    Reproduce the previous per-page work: a BeautifulSoup parse plus a recursive traversal
+    building the structured text through repeated string concatenation.
+    """
+    soup = BeautifulSoup(page_source, "html.parser")
+    title = soup.title.string if soup.title else "No title"
+    paragraphs = [normalize_text(p.text) for p in soup.find_all("p")]
+    content = " ".join(paragraphs)
+
+    def traverse(node, depth=0):
+        result = ""
+        for child in node.children:
+            if isinstance(child, NavigableString):
+                text = child.strip()
+                if text:
+                    result += "  " * depth + text + "\n"
+            elif isinstance(child, Tag):
+                result += traverse(child, depth + 1)
+        return result
+
+    structured_text = traverse(soup.body) if soup.body else ""
+    links = [a["href"] for a in soup.find_all("a", href=True)]
+    return title, content, paragraphs, structured_text, links
+
+
+def synthetic_page(sections=40):
+    blocks = []
+    for i in range(sections):
+        blocks.append(
+            f"<section><h2>Section {i}</h2><div class='row'><div class='col'>"
+            f"<p>Paragraph {i} about savings accounts, interest rates and <a href='/page/{i}'>offers</a>.</p>"
+            f"<ul><li>Item one</li><li>Item two</li><li><span>Nested <b>bold</b> text</span></li></ul>"
+            f"</div></div></section>"
+        )
+    return f"<html><head><title>Synthetic</title><script>var x = 1;</script></head><body>{''.join(blocks)}</body></html>"
+
+
+def load_pages(brand_name):
+    file_name = Config.Paths.SCRAPED_DATA_TEMPLATE.format(brand_name=brand_name)
+    if not os.path.exists(file_name):
+        return [("synthetic", synthetic_page())]
+    with open(file_name, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return [(page["url"], page["page_source"]) for page in data if page.get("page_source")]
+
+
+def measure(fn, pages, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        for url, page_source in pages:
+            fn(page_source, url)
+    elapsed = time.process_time() - start
+    return elapsed / (repeat * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brand", default=Config.VectorStore.BRAND_DATA[0]["name"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_pages(args.brand)
+    before = measure(lambda html, url: legacy_extract(html), pages, args.repeat)
+    after = measure(extract_page, pages, args.repeat)
+
+    print(f"pages: {len(pages)}  repeat: {args.repeat}")
+    print(f"before (bs4 html.parser + traversal): {before * 1000:8.2f} ms CPU/page")
+    print(f"after  (lxml single pass):            {after * 1000:8.2f} ms CPU/page")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
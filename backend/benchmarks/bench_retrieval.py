@@ -0,0 +1,72 @@
+"""
+Latency and recall of dense, hybrid and lexical topic retrieval on a brand's saved scraped data.
+
+Queries are the section headings found by the chunker: a query counts as recalled when a chunk
+from a section with that heading is among the top k results. Building the indices and the dense
+and hybrid queries call the OpenAI embeddings API; lexical queries are answered locally.
+
+Usage (from the backend directory):
+    python benchmarks/bench_retrieval.py [--brand Ally] [--k 5] [--queries 100]
+"""
+import time
+import random
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from config import Config
+from utils.vstore import VectorStoreManager
+
+MODES = ["dense", "hybrid", "lexical"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brand", default=Config.VectorStore.BRAND_DATA[0]["name"])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    manager = VectorStoreManager()
+    if not manager.load_scraped_data(args.brand):
+        sys.exit(f"No saved scraped data for {args.brand}")
+    brand_url = next(brand["url"] for brand in Config.VectorStore.BRAND_DATA if brand["name"] == args.brand)
+    manager.build_indices_for_brand(brand_url, args.brand)
+
+    # Each distinct leaf heading is one query; relevant chunks are those under that heading
+    relevant = {}
+    bm25_index = manager.vector_stores[args.brand]["bm25_index"]
+    for document in map(bm25_index.document, range(len(bm25_index))):
+        header_path = document.metadata.get("header_path")
+        if header_path:
+            relevant.setdefault(header_path.split(" > ")[-1], set()).add(document.metadata["chunk_id"])
+    queries = sorted(relevant)
+    random.Random(0).shuffle(queries)
+    queries = queries[:args.queries]
+    if not queries:
+        sys.exit(f"No section headings found in the chunks of {args.brand}")
+
+    print(f"brand: {args.brand}, queries: {len(queries)}, k: {args.k}")
+    for mode in MODES:
+        # Clear caches so every mode pays for its own embedding calls
+        manager.retrieval_cache.clear()
+        manager._query_embeddings.clear()
+        latencies = []
+        hits = 0
+        for query in queries:
+            start = time.perf_counter()
+            documents = manager.retrieve_documents_by_topics(args.brand, [query], k=args.k, mode=mode)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += any(document.metadata.get("chunk_id") in relevant[query] for document in documents)
+        p95 = sorted(latencies)[int(0.95 * (len(latencies) - 1))]
+        print(
+            f"{mode:8s} recall@{args.k}: {hits / len(queries):.3f}  "
+            f"median: {statistics.median(latencies):8.2f} ms  p95: {p95:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Serialization cost of every response model: FastAPI's `response_model` path versus `ModelResponse`,
+plus the size and cost of compressing each body.
+
+The `response_model` path is what FastAPI does with a returned model: dump it, validate it again
+against the response model, convert it to JSON-compatible Python and encode that with `json`.
+`ModelResponse` writes the already validated model straight to bytes. Instances are synthetic,
+with `--items` entries in every list and mapping; no network calls are made.
+
+Usage (from the backend directory):
+    python benchmarks/bench_serialization.py [--items 10] [--calls 2000]
+"""
+import sys
+import time
+import random
+import typing
+import asyncio
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from config import Config
+from models import output_models
+from utils.responses import ModelResponse, brotli, compress
+
+
+WORDS = (
+    "digital bank savings account high yield no monthly fees mobile app customer service checking "
+    "credit card rewards early direct deposit overdraft protection loans mortgage investing security"
+).split()
+rng = random.Random(0)
+
+
+def sample(annotation, items, depth=0):
+    """
+    A value of `annotation` with `items` entries in every list and mapping.
+    """
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return sample(next(arg for arg in args if arg is not type(None)), items, depth)
+    if origin is list:
+        return [sample(args[0], items, depth + 1) for _ in range(items)]
+    if origin is dict:
+        return {f"key {depth}.{i}": sample(args[1], items, depth + 1) for i in range(items)}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation(**{
+            name: sample(field.annotation, items, depth + 1) for name, field in annotation.model_fields.items()
+        })
+    if annotation is int:
+        return rng.randint(0, 100)
+    if annotation is float:
+        return round(rng.uniform(0, 100), 2)
+    if annotation is datetime:
+        return datetime.fromtimestamp(rng.randint(1_700_000_000, 1_800_000_000))
+    # Free text of a few words, like the phrases the chains return
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 10)))
+
+
+def response_models():
+    return [
+        model for _, model in vars(output_models).items()
+        if isinstance(model, type) and issubclass(model, BaseModel) and model.__module__ == output_models.__name__
+        and model.__name__.endswith("Response")
+    ]
+
+
+def timed(calls, function):
+    """
+    Median microseconds per call over batches of `calls // 10` calls.
+    """
+    batch = max(1, calls // 10)
+    timings = []
+    for _ in range(10):
+        start = time.perf_counter()
+        for _ in range(batch):
+            function()
+        timings.append((time.perf_counter() - start) / batch * 1e6)
+    return statistics.median(timings)
+
+
+async def timed_response_model_path(calls, field, response):
+    """
+    `timed` for FastAPI's coroutine, awaited inside one event loop run.
+    """
+    batch = max(1, calls // 10)
+    timings = []
+    for _ in range(10):
+        start = time.perf_counter()
+        for _ in range(batch):
+            JSONResponse(await serialize_response(field=field, response_content=response))
+        timings.append((time.perf_counter() - start) / batch * 1e6)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"items per list/mapping: {args.items}, brotli: {'installed' if brotli else 'not installed'}")
+    print(
+        f"{'model':40s} {'bytes':>8s} {'response_model':>15s} {'ModelResponse':>14s} {'speedup':>8s} "
+        f"{'gzip':>8s} {'gzip us':>8s} {'br':>8s} {'br us':>8s}"
+    )
+    for model in response_models():
+        response = sample(model, args.items)
+        field = create_model_field(name="Response", type_=model, mode="serialization")
+
+        previous = asyncio.run(timed_response_model_path(args.calls, field, response))
+        current = timed(args.calls, lambda: ModelResponse(response).body)
+        body = ModelResponse(response).body
+        gzipped = compress(body, "gzip", gzip_level=Config.Compression.GZIP_LEVEL)
+        gzip_us = timed(args.calls, lambda: compress(body, "gzip", gzip_level=Config.Compression.GZIP_LEVEL))
+        if brotli is not None:
+            brotli_size = str(len(compress(body, "br", brotli_quality=Config.Compression.BROTLI_QUALITY)))
+            brotli_us = f"{timed(args.calls, lambda: compress(body, 'br', brotli_quality=Config.Compression.BROTLI_QUALITY)):8.1f}"
+        else:
+            brotli_size = brotli_us = "-"
+        print(
+            f"{model.__name__:40s} {len(body):8d} {previous:12.1f} us {current:11.1f} us {previous / current:7.1f}x "
+            f"{len(gzipped):8d} {gzip_us:8.1f} {brotli_size:>8s} {brotli_us:>8s}"
+        )
+
+
+if __name__ == "__main__":
+    main()
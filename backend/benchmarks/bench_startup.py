@@ -0,0 +1,116 @@
+"""
+API startup cost: `-X importtime` breakdown of `import app` and time to first request.
+
+The API is imported in a fresh interpreter with an empty data directory, so no saved brand data is
+loaded and no network call is made. The slowest top-level imports are listed, modules that should
+only load on the code paths that need them are checked, and the time from process start until
+`GET /metrics/routing` answers is compared against a budget. Exits non-zero on a regression.
+
+Usage (from the backend directory):
+    python benchmarks/bench_startup.py [--runs 3] [--top 15] [--budget 2.5]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded only when an index is built, a chain is first called or a brand is scraped
+DEFERRED_MODULES = ("playwright", "bs4", "openai", "langchain_openai", "langchain_community", "langchain")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \| *(\S+)$")
+
+FIRST_REQUEST = f"""
+import sys
+import app
+from fastapi.testclient import TestClient
+
+loaded = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]
+with TestClient(app.app) as client:
+    status = client.get("/metrics/routing").status_code
+    print(status, ",".join(loaded), flush=True)
+"""
+
+
+def child_env(data_dir):
+    env = dict(os.environ, DATA_DIR=data_dir)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    return env
+
+
+def import_times(env):
+    """
+    Import time in seconds of each top-level package under `import app`, summing the self time of
+    its modules so that the packages partition the total.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            packages[match.group(2).split(".")[0]] += int(match.group(1)) / 1e6
+    return packages
+
+
+def time_to_first_request(env):
+    """
+    Seconds from process start until the first response, and the deferred modules loaded by then.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", FIRST_REQUEST], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    # Startup warm-up may still be running in the background; it is not part of the measurement
+    process.kill()
+    process.wait()
+    status, _, loaded = line.strip().partition(" ")
+    if status != "200":
+        sys.exit(f"First request failed: {line!r}")
+    return elapsed, [name for name in loaded.split(",") if name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, default=2.5, help="seconds allowed until the first response")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = child_env(data_dir)
+        packages = import_times(env)
+        first_requests = [time_to_first_request(env) for _ in range(args.runs)]
+
+    print(f"import app: {sum(packages.values()):.2f} s")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:30s} {seconds * 1000:8.1f} ms")
+
+    elapsed = statistics.median(seconds for seconds, _ in first_requests)
+    loaded = sorted({name for _, names in first_requests for name in names})
+    print(f"time to first request: {elapsed:.2f} s (median of {args.runs}, budget {args.budget:.2f} s)")
+    print(f"deferred modules loaded at import: {', '.join(loaded) or 'none'}")
+
+    failures = []
+    if elapsed > args.budget:
+        failures.append(f"time to first request {elapsed:.2f} s exceeds budget {args.budget:.2f} s")
+    if loaded:
+        failures.append(f"deferred modules imported at startup: {', '.join(loaded)}")
+    if failures:
+        sys.exit("; ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Memory, search latency and recall@k of the compressed vector storages against exact float32 search.
+
+Vectors are synthetic clustered 1536-dimensional embeddings by default (no network calls). With
+`--brand`, the content chunks of that brand's saved scraped data are embedded with the OpenAI
+embeddings API instead. Queries are held-out vectors perturbed with noise; recall@k is the share
+of the exact top k found in the top k of each storage.
+
+Usage (from the backend directory):
+    python benchmarks/bench_vector_compression.py [--vectors 20000] [--queries 200] [--k 5] [--rerank-factor 20] [--brand Ally]
+"""
+import time
+import argparse
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import faiss
+import numpy as np
+
+from config import Config
+from utils.vector_compression import VECTOR_STORAGES, RerankedIndex, compressed_index, index_bytes
+
+DIMENSION = 1536  # text-embedding-ada-002
+
+
+def synthetic_vectors(count, clusters=200, latent=64, seed=0):
+    # Like real embeddings, clustered points on a low-dimensional subspace plus a little isotropic noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, latent))
+    points = centers[rng.integers(clusters, size=count)] + 0.5 * rng.normal(size=(count, latent))
+    projection = rng.normal(size=(latent, DIMENSION)) / np.sqrt(latent)
+    vectors = (points @ projection + 0.01 * rng.normal(size=(count, DIMENSION))).astype("float32")
+    # Embeddings from the API are unit length
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def brand_vectors(brand):
+    from utils.vstore import VectorStoreManager, get_embedding_model
+
+    scraped_data = VectorStoreManager().load_scraped_data(brand)
+    if not scraped_data:
+        sys.exit(f"No saved scraped data for {brand}")
+    _, (_, documents), _ = VectorStoreManager.brand_documents(scraped_data, brand)
+    return np.array(get_embedding_model().embed_documents([document.page_content for document in documents]), dtype="float32")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rerank-factor", type=int, default=Config.VectorStore.RERANK_FACTOR)
+    parser.add_argument("--brand", help="embed this brand's saved content chunks instead of synthetic vectors")
+    args = parser.parse_args()
+
+    vectors = brand_vectors(args.brand) if args.brand else synthetic_vectors(args.vectors + args.queries)
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries = vectors[order[:args.queries]]
+    # Perturbations of norm ~0.2, about the distance between paraphrases of a topic
+    queries = queries + 0.2 / np.sqrt(queries.shape[1]) * rng.normal(size=queries.shape).astype("float32")
+    vectors = np.ascontiguousarray(vectors[order[args.queries:]])
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"vectors: {len(vectors)}, dimension: {vectors.shape[1]}, queries: {len(queries)}, k: {args.k}")
+    with tempfile.TemporaryDirectory() as directory:
+        vectors_path = str(Path(directory) / "vectors.npy")
+        np.save(vectors_path, vectors)
+        for storage in VECTOR_STORAGES:
+            start = time.perf_counter()
+            index = compressed_index(
+                vectors, storage, pq_subquantizers=Config.VectorStore.PQ_SUBQUANTIZERS, pq_bits=Config.VectorStore.PQ_BITS
+            )
+            build_s = time.perf_counter() - start
+            variants = [(storage, index)]
+            if storage != "float32":
+                reranked = RerankedIndex(index, np.load(vectors_path, mmap_mode="r"), args.rerank_factor)
+                variants.append((f"{storage}+rerank", reranked))
+            for name, variant in variants:
+                latencies = []
+                hits = 0
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    _, found = variant.search(query[None, :], args.k)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    hits += len(set(found[0]) & set(expected))
+                memory = index_bytes(variant)
+                print(
+                    f"{name:14s} memory: {memory / 2**20:8.1f} MB ({memory / len(vectors):6.0f} B/vector)  "
+                    f"recall@{args.k}: {hits / truth.size:.3f}  median: {statistics.median(latencies):7.3f} ms  "
+                    f"build: {build_s:6.2f} s"
+                )
+
+
+if __name__ == "__main__":
+    main()
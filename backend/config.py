@@ -18,6 +18,9 @@ class Config:
         """
         LEVEL = os.environ.get("LOGGING_LEVEL", "INFO")
         FORMAT = "%(asctime)s [%(levelname)s] [%(filename)s:%(lineno)d] %(message)s"
+        # Fraction of chain calls whose input and output are logged, and the per-value cap on logged characters
+        CHAIN_IO_SAMPLE_RATE = float(os.environ.get("LOGGING_CHAIN_IO_SAMPLE_RATE", 0.1))
+        CHAIN_IO_MAX_CHARS = int(os.environ.get("LOGGING_CHAIN_IO_MAX_CHARS", 500))
 
     class Paths:
         """
@@ -25,6 +28,14 @@ class Config:
         """
         DATA_DIR = os.environ.get("DATA_DIR", "data")
         SCRAPED_DATA_TEMPLATE = os.path.join(DATA_DIR, "{brand_name}_scraped_data.json")
+        SCRAPED_PAGES_TEMPLATE = os.path.join(DATA_DIR, "{brand_name}_scraped_pages.jsonl")
+        CRAWL_STATE_TEMPLATE = os.path.join(DATA_DIR, "{brand_name}_crawl_state.json")
+        VECTORS_TEMPLATE = os.path.join(DATA_DIR, "{brand_name}_{index_name}_vectors.npy")  # float32 vectors for re-ranking
+        SEMANTIC_CACHE_AUDIT_LOG = os.path.join(DATA_DIR, "semantic_cache_audit.jsonl")
+        RESULTS_DB = os.path.join(DATA_DIR, "analysis_results.sqlite3")
+        HISTORY_DB = os.path.join(DATA_DIR, "analysis_history.sqlite3")
+        JOBS_DB = os.path.join(DATA_DIR, "jobs.sqlite3")
+        USAGE_DB = os.path.join(DATA_DIR, "usage.sqlite3")
         PROMPT_BASE_PATH = os.environ.get("PROMPT_BASE_PATH", "prompt_templates")
         VISIBILITY_ANALYSIS = os.path.join(PROMPT_BASE_PATH, "visibility_analysis.yaml")
         COMPARISON_ANALYSIS = os.path.join(PROMPT_BASE_PATH, "comparison_analysis.yaml")
@@ -39,6 +50,7 @@ class Config:
         GPT_PERCEPTION = os.path.join(PROMPT_BASE_PATH, "gpt_perception.yaml")
         SELF_VS_GPT_COMPARISON = os.path.join(PROMPT_BASE_PATH, "self_vs_gpt_comparison.yaml")
         Brand_Ranking = os.path.join(PROMPT_BASE_PATH, "brand_ranking.yaml")
+        BRAND_DIFFERENTIATORS = os.path.join(PROMPT_BASE_PATH, "brand_differentiators.yaml")
 
     class OpenAI:
         """
@@ -49,21 +61,217 @@ class Config:
         TIMEOUT = int(os.environ.get("OPENAI_TIMEOUT", 30))
         TEMPERATURE = float(os.environ.get("OPENAI_TEMPERATURE", 0.3))
         EMBEDDING_MODEL = os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+        # "json_schema" (native response format), "function_calling" (forced tool call) or "prompt" (schema in prompt text)
+        OUTPUT_MODE = os.environ.get("OPENAI_OUTPUT_MODE", "json_schema")
+        MAX_PARSE_RETRIES = int(os.environ.get("OPENAI_MAX_PARSE_RETRIES", 1))
+
+    class ModelRouting:
+        """
+        Configuration for per-chain models and tiered model routing.
+        """
+        CHAINS = [
+            "visibility", "comparison", "trends", "emerging_competitors", "crisis_analysis", "audience_segmentation",
+            "competitive_benchmarking", "health_score", "regional_trends", "self_representation", "gpt_perception",
+            "self_vs_gpt", "rankings", "brand_differentiators",
+        ]
+        # Per-chain overrides of OPENAI_MODEL / OPENAI_TEMPERATURE, e.g. MODEL_ROUTING_MODEL_RANKINGS=gpt-4o
+        CHAIN_MODELS = {
+            chain: os.environ[f"MODEL_ROUTING_MODEL_{chain.upper()}"]
+            for chain in CHAINS if f"MODEL_ROUTING_MODEL_{chain.upper()}" in os.environ
+        }
+        CHAIN_TEMPERATURES = {
+            chain: float(os.environ[f"MODEL_ROUTING_TEMPERATURE_{chain.upper()}"])
+            for chain in CHAINS if f"MODEL_ROUTING_TEMPERATURE_{chain.upper()}" in os.environ
+        }
+        ENABLED = os.environ.get("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+        FAST_MODEL = os.environ.get("MODEL_ROUTING_FAST_MODEL", "gpt-4o-mini")
+        # Calls of these chains with at most FAST_MAX_INPUT_TOKENS (estimated) input tokens try FAST_MODEL first
+        # and escalate to the chain's model when its output fails validation
+        FAST_CHAINS = [
+            "visibility", "comparison", "trends", "emerging_competitors", "crisis_analysis", "audience_segmentation",
+            "health_score", "regional_trends", "self_representation", "gpt_perception", "self_vs_gpt",
+            "brand_differentiators",
+        ]
+        FAST_MAX_INPUT_TOKENS = int(os.environ.get("MODEL_ROUTING_FAST_MAX_INPUT_TOKENS", 2000))
+        # USD per million (input, output) tokens, for the cost estimates of /metrics/routing and /usage/summary
+        PRICES = {
+            "gpt-4o": (2.50, 10.00),
+            "gpt-4o-mini": (0.15, 0.60),
+            "text-embedding-ada-002": (0.10, 0.0),
+        }
+        LATENCY_WINDOW = int(os.environ.get("MODEL_ROUTING_LATENCY_WINDOW", 500))  # Latest calls per route for percentiles
 
     class Scraper:
         """
         Configuration for web scraping settings.
         """
         MAX_DEPTH = int(os.environ.get("SCRAPER_MAX_DEPTH", 2))
+        EXTRACTION_EXECUTOR = os.environ.get("SCRAPER_EXTRACTION_EXECUTOR", "thread")  # "thread" or "process"
+        EXTRACTION_WORKERS = int(os.environ.get("SCRAPER_EXTRACTION_WORKERS", 4))
+        PROFILE = os.environ.get("SCRAPER_PROFILE", "light")  # "full", "light" or "fast"
+        HTTP_TIMEOUT = float(os.environ.get("SCRAPER_HTTP_TIMEOUT", 15))
+        MIN_STATIC_TEXT_CHARS = int(os.environ.get("SCRAPER_MIN_STATIC_TEXT_CHARS", 500))
+        RESPECT_ROBOTS = os.environ.get("SCRAPER_RESPECT_ROBOTS", "true").lower() == "true"
+        ROBOTS_USER_AGENT = os.environ.get("SCRAPER_ROBOTS_USER_AGENT", "*")
+        USE_SITEMAP = os.environ.get("SCRAPER_USE_SITEMAP", "true").lower() == "true"
+        MAX_SITEMAP_URLS = int(os.environ.get("SCRAPER_MAX_SITEMAP_URLS", 200))
+        CHECKPOINT_EVERY = int(os.environ.get("SCRAPER_CHECKPOINT_EVERY", 10))
+        # Shared browser of the scrape command: pages a context serves before it is replaced, and open contexts
+        BROWSER_PAGES_PER_CONTEXT = int(os.environ.get("SCRAPER_BROWSER_PAGES_PER_CONTEXT", 50))
+        BROWSER_MAX_CONTEXTS = int(os.environ.get("SCRAPER_BROWSER_MAX_CONTEXTS", 4))
+        # Path/query patterns never crawled for any brand; brands add their own in BRAND_DATA
+        DEFAULT_EXCLUDE_PATTERNS = [
+            r"/(log-?in|log-?out|sign-?in|sign-?out|sign-?up|auth)(/|$)",
+            r"/search(/|\?|$)",
+            r"/(print|share)(/|\?|$)",
+        ]
+
 
+    class SemanticCache:
+        """
+        Configuration for the embedding-similarity caches of topic retrieval and chain results.
+        """
+        # ada-002 similarities run high: distinct topics of one brand often score above 0.95
+        RETRIEVAL_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_RETRIEVAL_THRESHOLD", 0.97))
+        CHAIN_RESULTS_ENABLED = os.environ.get("SEMANTIC_CACHE_CHAIN_RESULTS", "false").lower() == "true"
+        CHAIN_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_CHAIN_THRESHOLD", 0.98))
+        CHAIN_THRESHOLDS = {  # Per chain, by scope prefix; a cached answer served for the wrong topics is worse than a miss
+            "self_representation:": float(os.environ.get("SEMANTIC_CACHE_CHAIN_THRESHOLD_SELF_REPRESENTATION", CHAIN_THRESHOLD)),
+            "gpt_perception:": float(os.environ.get("SEMANTIC_CACHE_CHAIN_THRESHOLD_GPT_PERCEPTION", CHAIN_THRESHOLD)),
+            "self_vs_gpt:": float(os.environ.get("SEMANTIC_CACHE_CHAIN_THRESHOLD_SELF_VS_GPT", CHAIN_THRESHOLD)),
+        }
+        MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 1024))
+        TTL_SECONDS = int(os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", 6 * 3600))
+        AUDIT_MARGIN = float(os.environ.get("SEMANTIC_CACHE_AUDIT_MARGIN", 0.05))  # Near misses within this margin are audited too
+
+    class Admission:
+        """
+        Configuration for admission control and load shedding of the LLM-backed endpoints.
+        """
+        PATH_PREFIXES = ["/brand/"]  # POST requests under these prefixes are admission-controlled
+        DEFAULT_LIMIT = int(os.environ.get("ADMISSION_DEFAULT_LIMIT", 8))  # Concurrent requests per endpoint
+        LIMITS = {
+            "/brand/rankings": int(os.environ.get("ADMISSION_LIMIT_RANKINGS", 2)),
+            "/brand/self_representation_ranking": int(os.environ.get("ADMISSION_LIMIT_SELF_REPRESENTATION_RANKING", 2)),
+            "/brand/competitive_benchmarking": int(os.environ.get("ADMISSION_LIMIT_COMPETITIVE_BENCHMARKING", 4)),
+        }
+        QUEUE_SIZE = int(os.environ.get("ADMISSION_QUEUE_SIZE", 16))  # Waiting requests per endpoint before 429
+        MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", 10))  # Queue deadline before 503
+        RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", 5))
+
+    class Cancellation:
+        """
+        Configuration for request deadlines and cancellation of abandoned work.
+        """
+        PATH_PREFIXES = ["/brand/"]  # POST requests under these prefixes get a deadline
+        HEADER = "X-Request-Timeout"  # Seconds the client is willing to wait
+        DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("CANCELLATION_DEFAULT_TIMEOUT_SECONDS", 120))
+        MAX_TIMEOUT_SECONDS = float(os.environ.get("CANCELLATION_MAX_TIMEOUT_SECONDS", 600))
+
+    class Compression:
+        """
+        Configuration for compression of response bodies.
+        """
+        ENABLED = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+        MINIMUM_SIZE = int(os.environ.get("COMPRESSION_MINIMUM_SIZE", 1024))  # Smaller bodies are sent as is
+        GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+        # Brotli is used for clients accepting it when the brotli package is installed
+        BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", 5))
+
+    class Usage:
+        """
+        Configuration for token, latency and cost accounting of chat and embedding calls.
+        """
+        ENABLED = os.environ.get("USAGE_ENABLED", "true").lower() == "true"
+        FLUSH_INTERVAL_SECONDS = float(os.environ.get("USAGE_FLUSH_INTERVAL_SECONDS", 30))
+        # Per-request usage is kept this long; hourly rollups per endpoint, brand, chain and model are kept
+        REQUEST_RETENTION_SECONDS = int(os.environ.get("USAGE_REQUEST_RETENTION_SECONDS", 7 * 86400))
+        REQUEST_ID_HEADER = "X-Request-ID"  # Taken from the request when sent, generated otherwise
+        # Cached prompt tokens are billed at this fraction of the input price
+        CACHED_INPUT_PRICE_FACTOR = float(os.environ.get("USAGE_CACHED_INPUT_PRICE_FACTOR", 0.5))
+
+    class Jobs:
+        """
+        Configuration for the background job queue of heavy analyses.
+        """
+        WORKERS = int(os.environ.get("JOBS_WORKERS", 4))
+        # Jobs of one type running at the same time
+        CONCURRENCY = {
+            "rankings": int(os.environ.get("JOBS_CONCURRENCY_RANKINGS", 1)),
+            "self_representation_ranking": int(os.environ.get("JOBS_CONCURRENCY_SELF_REPRESENTATION_RANKING", 1)),
+            "competitive_benchmarking": int(os.environ.get("JOBS_CONCURRENCY_COMPETITIVE_BENCHMARKING", 2)),
+            "refresh_brand": int(os.environ.get("JOBS_CONCURRENCY_REFRESH_BRAND", 1)),
+        }
+        TIMEOUT_SECONDS = {
+            "rankings": int(os.environ.get("JOBS_TIMEOUT_RANKINGS", 600)),
+            "self_representation_ranking": int(os.environ.get("JOBS_TIMEOUT_SELF_REPRESENTATION_RANKING", 900)),
+            "competitive_benchmarking": int(os.environ.get("JOBS_TIMEOUT_COMPETITIVE_BENCHMARKING", 300)),
+            "refresh_brand": int(os.environ.get("JOBS_TIMEOUT_REFRESH_BRAND", 3600)),
+        }
+        STREAM_KEEPALIVE_SECONDS = int(os.environ.get("JOBS_STREAM_KEEPALIVE_SECONDS", 15))
+
+    class Comparison:
+        """
+        Configuration for brand comparison and competitive benchmarking.
+        """
+        # "direct": one LLM call re-deriving every brand's scores; "compositional": per-brand visibility results
+        # (stored or fetched concurrently) plus one differentiators call
+        MODE = os.environ.get("COMPARISON_MODE", "direct")
+
+    class Prewarm:
+        """
+        Configuration for the results store and off-peak pre-warming of the standard brand catalogue.
+        """
+        ENABLED = os.environ.get("PREWARM_ENABLED", "true").lower() == "true"
+        RESULT_TTL_SECONDS = int(os.environ.get("PREWARM_RESULT_TTL_SECONDS", 36 * 3600))
+        REFRESH_AFTER_SECONDS = int(os.environ.get("PREWARM_REFRESH_AFTER_SECONDS", 20 * 3600))
+        WINDOW_START_HOUR = int(os.environ.get("PREWARM_WINDOW_START_HOUR", 2))  # Local time
+        WINDOW_END_HOUR = int(os.environ.get("PREWARM_WINDOW_END_HOUR", 5))
+        MAX_CALLS_PER_WINDOW = int(os.environ.get("PREWARM_MAX_CALLS_PER_WINDOW", 200))
+        MAX_SECONDS_PER_WINDOW = int(os.environ.get("PREWARM_MAX_SECONDS_PER_WINDOW", 1800))
+        CONCURRENCY = int(os.environ.get("PREWARM_CONCURRENCY", 2))
+        CHECK_INTERVAL_SECONDS = int(os.environ.get("PREWARM_CHECK_INTERVAL_SECONDS", 300))
+        # Time periods offered by the frontend (keep in sync with frontend/config.py Config.Data.TIME_PERIODS)
+        TIME_PERIODS = ["Last 1 month", "Last 3 months", "Last 6 months", "Last 12 months"]
 
     class VectorStore:
         """
         Configuration for vector store management.
         """
+        CHUNK_SIZE = int(os.environ.get("VECTOR_STORE_CHUNK_SIZE", 1000))
+        CHUNK_OVERLAP = int(os.environ.get("VECTOR_STORE_CHUNK_OVERLAP", 100))  # Only within sections longer than CHUNK_SIZE
+        MIN_CHUNK_CHARS = int(os.environ.get("VECTOR_STORE_MIN_CHUNK_CHARS", 40))
+        COMPACT_DOCSTORE = os.environ.get("VECTOR_STORE_COMPACT_DOCSTORE", "true").lower() == "true"
+        # Vector storage of the brand indices: "float32" (exact), "float16", "int8" (scalar quantization) or "pq"
+        # (product quantization, PQ_SUBQUANTIZERS bytes per vector at 8 bits)
+        VECTOR_STORAGE = os.environ.get("VECTOR_STORE_VECTOR_STORAGE", "float32")
+        PQ_SUBQUANTIZERS = int(os.environ.get("VECTOR_STORE_PQ_SUBQUANTIZERS", 96))
+        PQ_BITS = int(os.environ.get("VECTOR_STORE_PQ_BITS", 8))
+        # Compressed indices re-rank RERANK_FACTOR * k candidates exactly from float32 vectors on disk; 0 disables.
+        # int8 needs little re-ranking, pq about 20x (see benchmarks/bench_vector_compression.py)
+        RERANK_FACTOR = int(os.environ.get("VECTOR_STORE_RERANK_FACTOR", 20))
+        # Topic retrieval: "dense" (FAISS), "hybrid" (FAISS + BM25 fused with reciprocal rank fusion) or "lexical" (BM25 only)
+        RETRIEVAL_MODE = os.environ.get("VECTOR_STORE_RETRIEVAL_MODE", "hybrid")
+        HYBRID_CANDIDATES_FACTOR = int(os.environ.get("VECTOR_STORE_HYBRID_CANDIDATES_FACTOR", 3))  # Candidates per retriever = k * factor
+        RRF_K = int(os.environ.get("VECTOR_STORE_RRF_K", 60))
+        EMBEDDING_TIMEOUT = float(os.environ.get("VECTOR_STORE_EMBEDDING_TIMEOUT", 5))  # Seconds before falling back to BM25
+        # Retry-After of the 503 answered by retrieval-backed endpoints while the indices are built at startup
+        WARM_UP_RETRY_AFTER_SECONDS = int(os.environ.get("VECTOR_STORE_WARM_UP_RETRY_AFTER_SECONDS", 15))
+
+        # Topics offered by the frontend (keep in sync with frontend/config.py Config.Data.TOPICS); their
+        # top MATRIX_TOP_K chunks are precomputed per brand when indices are built
+        STANDARD_TOPICS = [
+            "Customer Service", "Online Banking", "Mobile App Features", "Credit Card Rewards",
+            "Loan Options", "Interest Rates", "ATM Accessibility", "Fraud Protection",
+            "Sustainability", "Brand Reputation", "Investment Services"
+        ]
+        MATRIX_TOP_K = int(os.environ.get("VECTOR_STORE_MATRIX_TOP_K", 5))
+
+        # Optional per-brand crawl scope keys: "include" / "exclude" (regex lists matched against
+        # path and query) and "allow_subdomains" (bool).
         BRAND_DATA = [
-            {"name": "Ally", "url": "https://www.ally.com/"},
-            {"name": "Chime", "url": "https://www.chime.com/"},
-            {"name": "VaroMoney", "url": "https://www.varomoney.com/"},
-            {"name": "CapitalOne", "url": "https://www.capitalone.com/"},
+            {"name": "Ally", "url": "https://www.ally.com/", "include": [], "exclude": []},
+            {"name": "Chime", "url": "https://www.chime.com/", "include": [], "exclude": []},
+            {"name": "VaroMoney", "url": "https://www.varomoney.com/", "include": [], "exclude": []},
+            {"name": "CapitalOne", "url": "https://www.capitalone.com/", "include": [], "exclude": []},
         ]
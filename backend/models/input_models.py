@@ -1,5 +1,8 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+# "direct" asks the LLM for the whole comparison; "compositional" assembles it from per-brand visibility results
+ComparisonMode = Optional[Literal["direct", "compositional"]]
 
 
 class BrandRequest(BaseModel):
@@ -14,6 +17,7 @@ class BrandRequestWithIndustry(BaseModel):
 class BrandComparisonRequest(BaseModel):
     brand1: str
     brand2: str
+    mode: ComparisonMode = Field(None, description="Defaults to Config.Comparison.MODE.")
 
 
 class TrendRequest(BaseModel):
@@ -30,6 +34,7 @@ class CompetitiveBenchmarkingRequest(BaseModel):
     brand_name: str
     competitors: List[str]
     time_period: str
+    mode: ComparisonMode = Field(None, description="Defaults to Config.Comparison.MODE.")
 
 
 class MultiTopicRequest(BaseModel):
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from datetime import datetime
+from typing import Any, List, Dict, Optional
 
 
 class SentimentDistribution(BaseModel):
@@ -69,6 +70,15 @@ class CompetitiveBenchmarkingResponse(BaseModel):
     key_differentiators: Dict[str, List[str]] = Field(..., description="Key differentiators for each brand.")
 
 
+class BrandDifferentiators(BaseModel):
+    brand_name: str = Field(..., description="Name of the brand.")
+    differentiators: List[str] = Field(..., description="Areas where the brand stands out from the other brands.")
+
+
+class BrandDifferentiatorsResponse(BaseModel):
+    brands: List[BrandDifferentiators] = Field(..., description="Key differentiators for each brand.")
+
+
 class BrandHealthScoreResponse(BaseModel):
     brand_name: str = Field(..., description="Name of the brand being analyzed.")
     health_score: int = Field(..., description="Overall health score of the brand (0-100).")
@@ -140,4 +150,48 @@ class BrandRankingResponse(BaseModel):
     Response model for ranking brands based per topic and overall ranking.
     """
     rankings: List[AreaRanking]
-    overall_ranking: List[Dict[str, int]]
\ No newline at end of file
+    overall_ranking: List[Dict[str, int]]
+
+
+class HistoryRecord(BaseModel):
+    """
+    One stored analysis result.
+    """
+    recorded_at: datetime = Field(..., description="When the result was computed.")
+    time_period: Optional[str] = Field(None, description="Time period the analysis was requested for.")
+    region: Optional[str] = Field(None, description="Region the analysis was requested for.")
+    response: Dict[str, Any] = Field(..., description="The stored analysis response.")
+
+
+class HistoryWindowResponse(BaseModel):
+    """
+    Response model for stored results of a brand and analysis type within a time window.
+    """
+    brand_name: str
+    analysis_type: str
+    records: List[HistoryRecord] = Field(..., description="Stored results, newest first.")
+
+
+class HistoryDeltaResponse(BaseModel):
+    """
+    Response model for the changes between two stored results.
+    """
+    brand_name: str
+    analysis_type: str
+    previous_recorded_at: datetime
+    current_recorded_at: datetime
+    changes: Dict[str, Any] = Field(..., description="Changed fields: numeric changes, added/removed items, per-topic changes.")
+
+
+class JobStatusResponse(BaseModel):
+    """
+    Response model for the state of a background analysis job.
+    """
+    job_id: str
+    job_type: str
+    status: str = Field(..., description="queued, running, succeeded, failed, cancelled or timed_out.")
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = Field(None, description="Analysis result once the job has succeeded.")
+    error: Optional[str] = None
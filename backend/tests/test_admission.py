@@ -0,0 +1,64 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import httpx
+from fastapi import FastAPI
+
+from utils.admission import ADMITTED, QUEUE_FULL, TIMED_OUT, AdmissionControlMiddleware, AdmissionController, AdmissionGate
+
+
+def test_gate_queues_then_rejects():
+    async def run():
+        gate = AdmissionGate(limit=1, queue_size=1)
+        assert await gate.acquire(max_wait=1) == ADMITTED
+        waiting = asyncio.create_task(gate.acquire(max_wait=1))
+        await asyncio.sleep(0)
+        assert await gate.acquire(max_wait=1) == QUEUE_FULL
+        gate.release()  # Hands the slot to the waiter
+        assert await waiting == ADMITTED
+        assert gate.active == 1
+        assert await gate.acquire(max_wait=0.01) == TIMED_OUT
+        gate.release()
+        return gate.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0 and stats["waiting"] == 0
+    assert stats["rejected_queue_full"] == 1 and stats["rejected_timeout"] == 1
+
+def test_middleware_sheds_with_retry_after_and_serves_cached_results():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.post("/brand/slow")
+    async def slow(payload: dict):
+        await release.wait()
+        return {"fresh": True}
+
+    controller = AdmissionController(
+        limits={}, default_limit=1, path_prefixes=["/brand/"], queue_size=0, max_wait=0.01, retry_after=7
+    )
+    cached = {"brand_name": "Ally", "visibility_score": 80}
+    fallback = lambda path, body: cached if b"Ally" in body else None
+    app.add_middleware(AdmissionControlMiddleware, controller=controller, fallback=fallback)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.post("/brand/slow", json={"brand_name": "Chime"}))
+            while controller.stats().get("/brand/slow", {}).get("active") != 1:
+                await asyncio.sleep(0.01)
+            rejected = await client.post("/brand/slow", json={"brand_name": "Chime"})
+            served = await client.post("/brand/slow", json={"brand_name": "Ally"})
+            release.set()
+            return await first, rejected, served
+
+    first, rejected, served = asyncio.run(run())
+    assert first.json() == {"fresh": True}
+    assert rejected.status_code == 429 and rejected.headers["retry-after"] == "7"
+    assert served.status_code == 200 and served.json() == cached
+    assert served.headers["x-served-from"] == "cache"
+    assert controller.stats()["/brand/slow"]["served_from_cache"] == 1
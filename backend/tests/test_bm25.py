@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from langchain.docstore.document import Document as LangChainDocument
+
+from utils.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "High yield savings accounts with no monthly fees.",
+    "Auto loans and refinancing for new and used cars.",
+    "Checking accounts with early direct deposit.",
+    "Savings buckets help you organize your savings goals.",
+]
+
+def build_index():
+    documents = [LangChainDocument(page_content=text, metadata={"chunk_id": str(i)}) for i, text in enumerate(TEXTS)]
+    return BM25Index([str(i) for i in range(len(TEXTS))], documents)
+
+def test_tokenize_drops_stopwords_and_punctuation():
+    assert tokenize("The Savings, and the LOANS!") == ["savings", "loans"]
+
+def test_search_ranks_matching_documents_first():
+    results = build_index().search("savings goals", k=2)
+    assert [document_id for document_id, _, _ in results] == ["3", "0"]
+    assert results[0][2] > results[1][2] > 0
+
+def test_search_without_matches_returns_nothing():
+    assert build_index().search("mortgage", k=3) == []
+
+def test_reciprocal_rank_fusion_prefers_documents_ranked_by_both():
+    a, b, c = (LangChainDocument(page_content=name) for name in "abc")
+    fused = reciprocal_rank_fusion([[("a", a), ("b", b)], [("c", c), ("b", b)]], k=2)
+    assert fused[0][0] == "b" and fused[0][1] is b
+    assert fused[0][2] > fused[1][2]
+    assert len(fused) == 2
@@ -0,0 +1,154 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.browser_pool import BrowserPool, BrowserPoolService
+
+
+class FakeEmitter:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, value):
+        for handler in self.handlers.get(event, []):
+            handler(value)
+
+
+class FakePage(FakeEmitter):
+    url = "https://www.ally.com/"
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        if not self.browser.connected:
+            raise RuntimeError("Target page, context or browser has been closed")
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser(FakeEmitter):
+    def __init__(self):
+        super().__init__()
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = FakeContext(self)
+        self.contexts.append(context)
+        return context
+
+    def crash(self):
+        self.connected = False
+        self.emit("disconnected", self)
+
+    async def close(self):
+        self.connected = False
+        self.emit("disconnected", self)
+
+
+def fake_launcher(browsers):
+    async def launch():
+        browsers.append(FakeBrowser())
+        return browsers[-1]
+    return launch
+
+
+def test_contexts_are_recycled_after_pages_per_context():
+    browsers = []
+
+    async def crawl():
+        pool = BrowserPool(pages_per_context=2, launch=fake_launcher(browsers))
+        async with pool.lease() as lease:
+            for _ in range(5):
+                await lease.new_page()
+        await pool.close()
+        return pool
+
+    pool = asyncio.run(crawl())
+    assert len(browsers) == 1
+    assert len(browsers[0].contexts) == 3
+    assert all(context.closed for context in browsers[0].contexts)
+    stats = pool.stats()
+    assert (stats["pages"], stats["contexts_created"], stats["contexts_recycled"]) == (5, 3, 2)
+    assert stats["contexts_open"] == 0
+    assert stats["crashes"] == 0
+
+
+def test_browser_is_relaunched_after_crash():
+    browsers = []
+
+    async def crawl():
+        pool = BrowserPool(launch=fake_launcher(browsers))
+        first = pool.lease()
+        second = pool.lease()
+        await first.new_page()
+        await second.new_page()
+        browsers[0].crash()
+        await first.new_page()
+        await second.new_page()
+        await first.close()
+        await second.close()
+        return pool
+
+    pool = asyncio.run(crawl())
+    # Both leases continue on a single relaunched browser
+    assert len(browsers) == 2
+    assert len(browsers[1].contexts) == 2
+    stats = pool.stats()
+    assert (stats["launches"], stats["relaunches"], stats["crashes"]) == (2, 1, 1)
+    assert stats["browser_connected"]
+    assert stats["contexts_open"] == 0
+
+
+def test_open_contexts_are_capped():
+    browsers = []
+    peak = []
+
+    async def crawl(pool, index):
+        async with pool.lease() as lease:
+            await lease.new_page()
+            peak.append(pool.contexts_open)
+            await asyncio.sleep(0.01)
+
+    async def crawls():
+        pool = BrowserPool(max_contexts=2, launch=fake_launcher(browsers))
+        await asyncio.gather(*(crawl(pool, index) for index in range(5)))
+        return pool
+
+    pool = asyncio.run(crawls())
+    assert max(peak) == 2
+    assert pool.stats()["contexts_created"] == 5
+
+
+def test_service_shares_one_browser_across_crawls():
+    browsers = []
+    service = BrowserPoolService(launch=fake_launcher(browsers))
+
+    async def crawl(pool):
+        async with pool.lease() as lease:
+            await lease.new_page()
+        return asyncio.get_running_loop()
+
+    try:
+        loops = {service.run(crawl(service.pool)) for _ in range(3)}
+        assert len(loops) == 1
+        assert len(browsers) == 1
+        assert service.stats()["pages"] == 3
+    finally:
+        service.stop()
+    assert service.stats() == {"running": False}
@@ -0,0 +1,127 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.cancellation import (
+    DeadlineExceeded,
+    RequestCancellationMiddleware,
+    cancellation_stats,
+    request_deadline,
+    within_deadline,
+)
+
+def test_within_deadline_distinguishes_deadline_from_own_timeout():
+    async def run(deadline_in, timeout):
+        request_deadline.set(time.monotonic() + deadline_in)
+        return await within_deadline(asyncio.sleep(1), "embedding", timeout=timeout)
+
+    before = cancellation_stats.work["embedding"]
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run(0.02, timeout=5))
+    assert cancellation_stats.work["embedding"] == before + 1
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run(5, timeout=0.02))
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(run(-1, timeout=None))
+
+def build_app(events):
+    app = FastAPI()
+
+    @app.post("/brand/slow")
+    async def slow():
+        try:
+            await within_deadline(asyncio.sleep(1), "llm")
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        return {"ok": True}
+
+    @app.post("/brand/fast")
+    async def fast():
+        return {"remaining": request_deadline.get() - time.monotonic()}
+
+    app.add_middleware(RequestCancellationMiddleware, path_prefixes=["/brand/"], default_timeout=30, max_timeout=60)
+    return app
+
+def test_deadline_from_header_cancels_work_with_504():
+    events = []
+    client = TestClient(build_app(events))
+    response = client.post("/brand/slow", json={}, headers={"X-Request-Timeout": "0.05"})
+    assert response.status_code == 504
+    assert events == ["cancelled"]
+
+    response = client.post("/brand/fast", json={}, headers={"X-Request-Timeout": "1000"})
+    assert 59 < response.json()["remaining"] <= 60
+    assert 29 < client.post("/brand/fast", json={}).json()["remaining"] <= 30
+
+def test_client_disconnect_cancels_work():
+    events = []
+    sent = []
+    app = build_app(events)
+
+    async def run():
+        messages = [{"type": "http.request", "body": b"{}", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.05)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "method": "POST", "path": "/brand/slow", "headers": [], "query_string": b"",
+            "http_version": "1.1", "scheme": "http", "server": ("test", 80), "root_path": "",
+        }
+        await app(scope, receive, send)
+
+    before = cancellation_stats.requests["client_disconnect"]
+    asyncio.run(run())
+    assert events == ["cancelled"]
+    assert sent == []
+    assert cancellation_stats.requests["client_disconnect"] == before + 1
+
+def test_coalesced_call_outlives_the_first_callers_deadline(monkeypatch):
+    import utils.custom_chat_chains as chains
+    from utils.single_flight import SingleFlight
+
+    monkeypatch.setattr(chains, "chain_coalescer", SingleFlight())
+    chain = chains.custom_chat_chain(None, "unused.yaml", name="slow")
+    calls = []
+
+    async def slow_call(kwargs):
+        calls.append(request_deadline.get())
+        await asyncio.sleep(0.1)
+        return "result"
+
+    monkeypatch.setattr(chain, "_ainvoke", slow_call)
+
+    async def caller(deadline_in):
+        if deadline_in is not None:
+            request_deadline.set(time.monotonic() + deadline_in)
+        try:
+            return await chain.ainvoke(brand_name="Ally")
+        except DeadlineExceeded as e:
+            # Caught here: a task ending in a CancelledError subclass reports plain cancellation
+            return e
+
+    async def run():
+        leader = asyncio.create_task(caller(0.02))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(caller(None))
+        return await asyncio.gather(leader, follower)
+
+    leader, follower = asyncio.run(run())
+    assert isinstance(leader, DeadlineExceeded)
+    assert follower == "result"
+    assert calls == [None]
@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.chunking import StructuredChunker, chunk_id
+
+PAGE = {
+    "url": "https://www.example.com/savings",
+    "title": "Savings",
+    "page_source": """
+        <html><body>
+          <h1>Savings accounts</h1><p>Earn more with a high yield savings account today.</p>
+          <h2>Rates</h2><p>Our savings rate is 4.20% APY with no minimum balance required.</p>
+          <script>trackPage("savings accounts")</script>
+          <h2>Footer</h2><p>Member FDIC. Equal Housing Lender. Terms apply.</p>
+        </body></html>
+    """,
+}
+
+def test_chunks_carry_header_path_and_stable_ids():
+    ids, documents = StructuredChunker(min_chunk_chars=10).chunk_pages([PAGE], "Example")
+    paths = [document.metadata["header_path"] for document in documents]
+    assert paths == ["Savings accounts", "Savings accounts > Rates", "Savings accounts > Footer"]
+    assert ids == [chunk_id(document.page_content) for document in documents]
+    assert all("trackPage" not in document.page_content for document in documents)
+
+def test_duplicate_sections_across_pages_are_removed():
+    other_page = dict(PAGE, url="https://www.example.com/checking")
+    ids, documents = StructuredChunker(min_chunk_chars=10).chunk_pages([PAGE, other_page], "Example")
+    assert len(ids) == len(set(ids)) == 3
+    assert {document.metadata["url"] for document in documents} == {PAGE["url"]}
+
+def test_chunk_id_ignores_case_and_whitespace():
+    assert chunk_id("Member  FDIC.\n") == chunk_id("member fdic.")
+
+def test_falls_back_to_content_without_page_source():
+    page = {"url": "https://www.example.com/", "title": "Home", "content": "plain paragraph content " * 3}
+    _, documents = StructuredChunker(min_chunk_chars=10).chunk_pages([page], "Example")
+    assert len(documents) == 1
+    assert documents[0].metadata["header_path"] == ""
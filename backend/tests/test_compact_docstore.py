@@ -0,0 +1,42 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import numpy as np
+from langchain.docstore.document import Document as LangChainDocument
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+
+from utils.compact_docstore import CompactDocstore
+
+DOCUMENTS = {
+    "a1": LangChainDocument(page_content="Savings rates — 4.2% APY", metadata={"url": "https://ally.com/s", "title": None, "name": "Ally", "chunk_id": "a1"}),
+    "a2": LangChainDocument(page_content="Auto loans", metadata={"url": "https://ally.com/s", "name": "Ally", "depth": 2}),
+}
+
+def test_round_trips_documents_and_metadata():
+    store = CompactDocstore.from_docstore(InMemoryDocstore(dict(DOCUMENTS)))
+    for document_id, original in DOCUMENTS.items():
+        document = store.search(document_id)
+        assert document.page_content == original.page_content
+        assert document.metadata == original.metadata
+    assert store.search("missing") == "ID missing not found."
+    assert store.stats()["interned_values"]["url"] == 1
+
+def test_delete_and_add():
+    store = CompactDocstore(dict(DOCUMENTS))
+    store.delete(["a1"])
+    assert len(store) == 1
+    assert store.search("a1") == "ID a1 not found."
+    store.add({"a3": LangChainDocument(page_content="Checking", metadata={"header_path": "Bank > Checking"})})
+    assert store.search("a3").metadata == {"header_path": "Bank > Checking"}
+    assert "header_path" not in store.search("a2").metadata
+
+def test_faiss_search_with_filter_uses_compact_docstore():
+    index = FAISS.from_documents(list(DOCUMENTS.values()), FakeEmbeddings(size=8), ids=list(DOCUMENTS))
+    index.docstore = CompactDocstore.from_docstore(index.docstore)
+    results = index.similarity_search_by_vector(np.ones(8).tolist(), k=2, filter={"url": ["https://ally.com/s"]})
+    assert sorted(document.id for document in results) == ["a1", "a2"]
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from models.output_models import BrandDifferentiatorsResponse, BrandVisibilityResponse
+from utils.results_store import ResultsStore
+
+
+def visibility(score):
+    return BrandVisibilityResponse(
+        visibility_score=score,
+        key_sentiments={"positive": 60, "neutral": 30, "negative": 10},
+        top_topics=["savings"],
+        top_regions=["US"],
+    )
+
+def setup(tmp_path, monkeypatch):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), ttl=3600)
+    store.put("visibility", {"brand_name": "Ally"}, visibility(80), duration=1.0)
+    store.put("visibility", {"brand_name": "Chime"}, visibility(70), duration=1.0)
+    monkeypatch.setattr(app_module, "results_store", store)
+    monkeypatch.setattr(app_module, "record_history", lambda *args: None)
+
+    calls = []
+    async def visibility_ainvoke(brand_name):
+        calls.append(("visibility", brand_name))
+        return visibility(50)
+    async def differentiators_ainvoke(brand_profiles):
+        calls.append(("brand_differentiators", brand_profiles))
+        return BrandDifferentiatorsResponse(brands=[
+            {"brand_name": "ally", "differentiators": ["high yield savings"]},
+            {"brand_name": "Chime", "differentiators": ["no fees"]},
+        ])
+    monkeypatch.setattr(app_module.visibility_chain, "ainvoke", visibility_ainvoke)
+    monkeypatch.setattr(app_module.brand_differentiators_chain, "ainvoke", differentiators_ainvoke)
+    return calls
+
+def test_compositional_comparison_reuses_stored_visibility(tmp_path, monkeypatch):
+    calls = setup(tmp_path, monkeypatch)
+    client = TestClient(app_module.app)
+
+    response = client.post("/brand/comparison", json={"brand1": "Ally", "brand2": "Chime", "mode": "compositional"})
+    assert response.status_code == 200
+    assert response.json() == {
+        "brand1_visibility": 80,
+        "brand2_visibility": 70,
+        "differentiators": ["Ally: high yield savings", "Chime: no fees"],
+    }
+    assert [name for name, _ in calls] == ["brand_differentiators"]
+
+    # The differentiators are stored too, so repeating the comparison makes no LLM call
+    client.post("/brand/comparison", json={"brand1": "Ally", "brand2": "Chime", "mode": "compositional"})
+    assert len(calls) == 1
+
+def test_compositional_benchmark_only_analyzes_missing_brands(tmp_path, monkeypatch):
+    calls = setup(tmp_path, monkeypatch)
+    client = TestClient(app_module.app)
+
+    response = client.post("/brand/competitive_benchmarking", json={
+        "brand_name": "Ally", "competitors": ["Chime", "VaroMoney"], "time_period": "Last 3 months", "mode": "compositional",
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["visibility_scores"] == {"Ally": 80, "Chime": 70, "VaroMoney": 50}
+    assert data["sentiment_distributions"]["Chime"] == {"positive": 60, "neutral": 30, "negative": 10}
+    assert data["key_differentiators"] == {"Ally": ["high yield savings"], "Chime": ["no fees"], "VaroMoney": []}
+    assert [name for name, _ in calls] == ["visibility", "brand_differentiators"]
+    assert calls[0] == ("visibility", "VaroMoney")
+
+def test_invalid_mode_is_rejected():
+    client = TestClient(app_module.app)
+    response = client.post("/brand/comparison", json={"brand1": "Ally", "brand2": "Chime", "mode": "fast"})
+    assert response.status_code == 422
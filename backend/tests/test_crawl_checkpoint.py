@@ -0,0 +1,223 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import pytest
+
+from utils.crawl_checkpoint import CrawlCheckpoint
+
+def test_checkpoint_resume_returns_pages_after_last_save(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "pages.jsonl"), str(tmp_path / "state.json"), every=2)
+    assert checkpoint.resume() is None
+    checkpoint.append_page({"url": "https://a.com/1", "depth": 0})
+    checkpoint.append_page({"url": "https://a.com/2", "depth": 1})
+    checkpoint.maybe_save([("https://a.com/3", 1)], {"https://a.com/1", "https://a.com/2", "https://a.com/3"})
+    checkpoint.append_page({"url": "https://a.com/3", "depth": 1})
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(str(tmp_path / "pages.jsonl"), str(tmp_path / "state.json"))
+    state = resumed.resume()
+    resumed.close()
+    assert state["pages"] == 2
+    assert [page["url"] for page in state["pending_pages"]] == ["https://a.com/3"]
+    assert not resumed.complete
+
+def test_checkpoint_truncates_partial_trailing_record(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "pages.jsonl"), str(tmp_path / "state.json"))
+    checkpoint.resume()
+    checkpoint.append_page({"url": "https://a.com/1"})
+    checkpoint.save_state([], {"https://a.com/1"})
+    checkpoint.close()
+    with open(tmp_path / "pages.jsonl", "a", encoding="utf-8") as file:
+        file.write('{"url": "https://a.co')
+
+    resumed = CrawlCheckpoint(str(tmp_path / "pages.jsonl"), str(tmp_path / "state.json"))
+    state = resumed.resume()
+    resumed.save_state([], set(state["visited"]), complete=True)
+    resumed.close()
+    assert [page["url"] for page in resumed.iter_pages()] == ["https://a.com/1"]
+    assert resumed.complete
+
+def use_data_dir(monkeypatch, tmp_path):
+    from utils import vstore
+
+    monkeypatch.setattr(vstore.Config.Paths, "SCRAPED_DATA_TEMPLATE", str(tmp_path / "{brand_name}.json"))
+    monkeypatch.setattr(vstore.Config.Paths, "SCRAPED_PAGES_TEMPLATE", str(tmp_path / "{brand_name}.jsonl"))
+    monkeypatch.setattr(vstore.Config.Paths, "CRAWL_STATE_TEMPLATE", str(tmp_path / "{brand_name}.state.json"))
+
+def finished_crawl(brand_name, pages, checkpoint=None):
+    checkpoint = checkpoint or CrawlCheckpoint.for_brand(brand_name)
+    checkpoint.resume()
+    for page in pages:
+        checkpoint.append_page(page)
+    checkpoint.save_state([], {page["url"] for page in pages}, complete=True)
+    checkpoint.close()
+
+def site_pages(words):
+    return [
+        {"url": f"https://a.com/{i}", "title": f"Page {i}", "content": f"{words}. " * 20,
+         "paragraphs": ["Member FDIC.", f"Paragraph {i}"]}
+        for i in range(3)
+    ]
+
+def test_brand_documents_are_built_from_streamed_pages(tmp_path, monkeypatch):
+    from utils import vstore
+
+    use_data_dir(monkeypatch, tmp_path)
+    pages = site_pages("High yield savings account")
+    assert vstore.VectorStoreManager().load_scraped_data("Ally") is None
+    finished_crawl("Ally", pages)
+
+    scraped_data = vstore.VectorStoreManager().load_scraped_data("Ally")
+    assert not isinstance(scraped_data, list)
+    streamed = vstore.VectorStoreManager.brand_documents(scraped_data, "Ally")
+    loaded = vstore.VectorStoreManager.brand_documents(pages, "Ally")
+
+    def texts(documents):
+        titles, (content_ids, contents), paragraphs = documents
+        return [d.page_content for d in titles], content_ids, list(paragraphs)
+
+    assert texts(streamed) == texts(loaded)
+    assert len(streamed[0]) == 3
+    # The shared paragraph is embedded once
+    assert len(streamed[2]) == 4
+
+def test_refresh_keeps_serving_old_indices_until_new_ones_are_built(tmp_path, monkeypatch):
+    from langchain_community.embeddings import FakeEmbeddings
+    from utils import vstore
+
+    use_data_dir(monkeypatch, tmp_path)
+    manager = vstore.VectorStoreManager()
+    old = {"title_index": None}
+    manager.vector_stores["Ally"] = old
+    served_during_build = []
+
+    class Embeddings(FakeEmbeddings):
+        model: str = "fake"
+
+        def embed_documents(self, texts):
+            served_during_build.append(manager.vector_stores["Ally"] is old)
+            return super().embed_documents(texts)
+
+    monkeypatch.setattr(vstore, "get_embedding_model", lambda: Embeddings(size=8))
+    monkeypatch.setattr(vstore.Config.VectorStore, "RETRIEVAL_MODE", "lexical")
+    monkeypatch.setattr(
+        manager,
+        "scrape_website_sync",
+        lambda url, brand_name, checkpoint=None, stop=None: finished_crawl(brand_name, site_pages("Early direct deposit"), checkpoint),
+    )
+
+    assert manager.refresh_brand("https://a.com", "Ally")
+    assert served_during_build and all(served_during_build)
+    assert manager.vector_stores["Ally"] is not old
+    assert "Early direct deposit" in manager.retrieve_documents_by_topics("Ally", ["direct deposit"], k=1)[0].page_content
+
+def test_failed_or_empty_refresh_keeps_the_saved_crawl_and_indices(tmp_path, monkeypatch):
+    from langchain_community.embeddings import FakeEmbeddings
+    from utils import vstore
+
+    class Embeddings(FakeEmbeddings):
+        model: str = "fake"
+
+    use_data_dir(monkeypatch, tmp_path)
+    monkeypatch.setattr(vstore, "get_embedding_model", lambda: Embeddings(size=8))
+    finished_crawl("Ally", site_pages("High yield savings account"))
+    manager = vstore.VectorStoreManager()
+    old = {"title_index": None}
+    manager.vector_stores["Ally"] = old
+
+    def saved_pages():
+        return [page["content"] for page in manager.load_scraped_data("Ally")]
+
+    def unreachable(url, brand_name, checkpoint=None, stop=None):
+        checkpoint.resume()
+        checkpoint.append_page(site_pages("Partial crawl")[0])
+        raise RuntimeError("Site unreachable")
+
+    def empty(url, brand_name, checkpoint=None, stop=None):
+        finished_crawl(brand_name, [], checkpoint)
+
+    class RateLimitedEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            raise RuntimeError("Rate limit reached")
+
+    def unembeddable(url, brand_name, checkpoint=None, stop=None):
+        finished_crawl(brand_name, site_pages("Early direct deposit"), checkpoint)
+        monkeypatch.setattr(vstore, "get_embedding_model", lambda: RateLimitedEmbeddings(size=8))
+
+    kept = saved_pages()
+    for crawl, error in ((unreachable, "Site unreachable"), (empty, None), (unembeddable, "Rate limit")):
+        monkeypatch.setattr(manager, "scrape_website_sync", crawl)
+        if error:
+            with pytest.raises(RuntimeError, match=error):
+                manager.refresh_brand("https://a.com", "Ally")
+        else:
+            assert not manager.refresh_brand("https://a.com", "Ally")
+        assert manager.vector_stores["Ally"] is old
+        assert saved_pages() == kept
+        # The staged crawl is discarded
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["Ally.jsonl", "Ally.state.json"]
+
+def test_refresh_of_a_brand_runs_once_at_a_time(tmp_path, monkeypatch):
+    import threading
+    from utils import vstore
+
+    use_data_dir(monkeypatch, tmp_path)
+    manager = vstore.VectorStoreManager()
+    crawling = threading.Event()
+
+    def crawl_until_stopped(url, brand_name, checkpoint=None, stop=None):
+        checkpoint.resume()
+        crawling.set()
+        stop.wait(5)
+        checkpoint.save_state([("https://a.com/next", 1)], {"https://a.com/next"})
+        checkpoint.close()
+
+    monkeypatch.setattr(manager, "scrape_website_sync", crawl_until_stopped)
+    stop = threading.Event()
+    results = []
+    refresh = threading.Thread(target=lambda: results.append(manager.refresh_brand("https://a.com", "Ally", stop)))
+    refresh.start()
+    assert crawling.wait(5)
+    with pytest.raises(RuntimeError, match="already running"):
+        manager.refresh_brand("https://a.com", "Ally", threading.Event())
+    stop.set()
+    refresh.join(5)
+    # The stopped crawl is incomplete, so nothing was replaced, and the brand can be refreshed again
+    assert results == [False]
+    assert manager._refresh_locks["Ally"].acquire(blocking=False)
+
+def test_crawl_stops_between_pages_once_stop_is_set(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+    from utils import playwright_scraper
+
+    class Lease:
+        async def close(self):
+            pass
+
+    class BrowserPool:
+        def lease(self, context_options, setup):
+            return Lease()
+
+    stop = threading.Event()
+    fetched = []
+
+    async def fetch_static_page(client, url):
+        fetched.append(url)
+        stop.set()
+        return {"url": url, "title": url, "links": [f"https://a.com/{i}" for i in range(5)]}
+
+    monkeypatch.setattr(playwright_scraper, "fetch_static_page", fetch_static_page)
+    monkeypatch.setattr(playwright_scraper.Config.Scraper, "RESPECT_ROBOTS", False)
+    monkeypatch.setattr(playwright_scraper.Config.Scraper, "USE_SITEMAP", False)
+    checkpoint = CrawlCheckpoint(str(tmp_path / "pages.jsonl"), str(tmp_path / "state.json"))
+
+    pages = asyncio.run(playwright_scraper.scrape_website_recursive(
+        "https://a.com/", profile="fast", checkpoint=checkpoint, browser_pool=BrowserPool(), stop=stop,
+    ))
+    assert pages == 1 and fetched == ["https://a.com/"]
+    assert not checkpoint.complete
+    assert len(checkpoint.load_state()["frontier"]) == 5
@@ -0,0 +1,94 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.crawl_profiles import CrawlStats, get_profile, install_resource_blocking, is_tracker, needs_javascript
+from utils.html_extraction import extract_page
+
+STATIC_PAGE = (
+    "<html><head><title>Savings</title></head><body><h1>High Yield Savings</h1>"
+    + "<p>Earn more with no monthly maintenance fees and no minimum balance to open an account.</p>" * 10
+    + "</body></html>"
+)
+JS_SHELL_PAGE = (
+    "<html><head><title>Ally</title><script src='/app.js'></script></head><body>"
+    "<noscript>You need to enable JavaScript to run this app.</noscript><div id='root'></div></body></html>"
+)
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class FakeRoute:
+    def __init__(self, url, resource_type):
+        self.request = FakeRequest(url, resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+class FakeContext:
+    def __init__(self):
+        self.handler = None
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+
+def test_tracker_hosts_and_their_subdomains_match():
+    assert is_tracker("https://www.google-analytics.com/analytics.js")
+    assert is_tracker("https://googletagmanager.com/gtm.js?id=GTM-1")
+    assert is_tracker("https://static.hotjar.com/c/hotjar.js")
+    assert not is_tracker("https://www.ally.com/bank/savings")
+    # Only whole host labels match
+    assert not is_tracker("https://nothotjar.com/script.js")
+    assert not is_tracker("https://hotjar.com.ally.com/")
+    assert not is_tracker("not a url")
+
+
+def test_static_page_is_not_rendered_but_javascript_shell_is():
+    assert not needs_javascript(STATIC_PAGE, extract_page(STATIC_PAGE, "https://www.ally.com/bank"))
+    assert needs_javascript(JS_SHELL_PAGE, extract_page(JS_SHELL_PAGE, "https://www.ally.com/"))
+    # Too little static text is rendered too, even without a <noscript> hint
+    short = "<html><body><p>Loading...</p></body></html>"
+    assert needs_javascript(short, extract_page(short, "https://www.ally.com/"))
+
+
+def blocked(profile_name, url, resource_type):
+    async def run():
+        context = FakeContext()
+        stats = CrawlStats(get_profile(profile_name))
+        await install_resource_blocking(context, stats.profile, stats)
+        if context.handler is None:
+            return False, stats.blocked_requests
+        route = FakeRoute(url, resource_type)
+        await context.handler(route)
+        return route.outcome == "aborted", stats.blocked_requests
+
+    return asyncio.run(run())
+
+
+def test_profiles_block_their_resource_types_and_trackers():
+    page = "https://www.ally.com/bank"
+    # The full profile renders everything and installs no route at all
+    for resource_type in ("image", "stylesheet", "script", "document"):
+        assert blocked("full", page, resource_type) == (False, 0)
+    assert blocked("full", "https://www.google-analytics.com/collect", "xhr") == (False, 0)
+
+    for name in ("light", "fast"):
+        for resource_type in ("image", "media", "font", "stylesheet"):
+            assert blocked(name, page, resource_type) == (True, 1)
+        for resource_type in ("document", "script", "xhr"):
+            assert blocked(name, page, resource_type) == (False, 0)
+        assert blocked(name, "https://www.google-analytics.com/collect", "xhr") == (True, 1)
+    assert get_profile("fast").http_first and not get_profile("light").http_first
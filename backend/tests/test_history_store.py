@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+from models.output_models import BrandHealthScoreResponse, BrandTrendsResponse
+from utils.history_store import HistoryStore, diff_values
+
+
+def health(score, insights):
+    return BrandHealthScoreResponse(
+        brand_name="Ally", health_score=score, industry_benchmark=70, key_insights=insights, improvement_areas=[]
+    )
+
+def test_window_filters_by_brand_type_and_time(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append("health_score", "Ally", health(70, []), recorded_at=100.0)
+    store.append("health_score", "Ally", health(75, []), recorded_at=200.0)
+    store.append("health_score", "Chime", health(60, []), recorded_at=150.0)
+
+    records = store.window("health_score", "Ally")
+    assert [record["recorded_at"] for record in records] == [200.0, 100.0]
+    assert store.window("health_score", "Ally", since=150.0)[0]["response"]["health_score"] == 75
+    assert store.window("trends", "Ally") == []
+
+def test_delta_between_latest_records(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append("health_score", "Ally", health(70, ["fees"]), recorded_at=100.0)
+    assert store.delta("health_score", "Ally") is None
+    store.append("health_score", "Ally", health(76, ["fees", "app"]), recorded_at=200.0)
+
+    delta = store.delta("health_score", "Ally")
+    assert delta["current_recorded_at"] == 200.0
+    assert delta["changes"] == {
+        "health_score": {"previous": 70, "current": 76, "change": 6},
+        "key_insights": {"added": ["app"], "removed": []},
+    }
+
+def test_trend_topics_are_compared_per_topic():
+    previous = BrandTrendsResponse(trending_topics=[{"topic": "loans", "sentiment_score": 60}], emerging_regions=["US"])
+    current = BrandTrendsResponse(trending_topics=[{"topic": "loans", "sentiment_score": 55}, {"topic": "app", "sentiment_score": 80}], emerging_regions=["US"])
+    changes = diff_values(previous.model_dump(), current.model_dump())
+    assert changes["trending_topics"]["loans"] == {"sentiment_score": {"previous": 60, "current": 55, "change": -5}}
+    assert changes["trending_topics"]["app"] == {"previous": None, "current": {"topic": "app", "sentiment_score": 80}}
+    assert "emerging_regions" not in changes
+
+def test_history_endpoints_read_from_storage(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    store.append("health_score", "Ally", health(70, []), recorded_at=100.0)
+    store.append("health_score", "Ally", health(80, []), recorded_at=200.0)
+    monkeypatch.setattr(app_module, "history_store", store)
+    client = TestClient(app_module.app)
+
+    response = client.get("/history/health_score", params={"brand_name": "Ally"})
+    assert response.status_code == 200
+    assert len(response.json()["records"]) == 2
+
+    response = client.get("/history/health_score/delta", params={"brand_name": "Ally"})
+    assert response.json()["changes"]["health_score"]["change"] == 10
+
+    assert client.get("/history/visibility", params={"brand_name": "Ally"}).status_code == 404
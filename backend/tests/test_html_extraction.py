@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.html_extraction import extract_page
+
+PAGE = """
+<html>
+  <head><title>Savings</title><script>var tracking = 1;</script></head>
+  <body>
+    <h1>Open an account</h1>
+    <div>Intro<p>High <b>yield</b>   savings</p>tail<noscript>enable js</noscript></div>
+    <a href="/rates">Rates</a>
+  </body>
+</html>
+"""
+
+def test_extract_page_fields():
+    data = extract_page(PAGE, "https://www.example.com/savings/")
+    assert data["title"] == "Savings"
+    assert data["paragraphs"] == ["high yield savings"]
+    assert data["content"] == "high yield savings"
+    assert data["headings"] == [{"level": 1, "text": "Open an account"}]
+    assert data["links"] == ["https://www.example.com/rates"]
+
+def test_structured_text_skips_scripts_and_keeps_order():
+    data = extract_page(PAGE, "https://www.example.com/")
+    lines = [line.strip() for line in data["structured_text"].splitlines()]
+    assert lines == ["Open an account", "Intro", "High", "yield", "savings", "tail", "Rates"]
+    assert "enable js" not in data["structured_text"]
+
+def test_extract_page_empty_document():
+    data = extract_page("", "https://www.example.com/")
+    assert data["paragraphs"] == []
+    assert data["links"] == []
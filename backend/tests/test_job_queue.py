@@ -0,0 +1,111 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.job_queue import JobQueue, TERMINAL_STATUSES
+
+
+def make_queue(path, handlers, concurrency=None, timeouts=None, workers=2):
+    return JobQueue(str(path), handlers=handlers, concurrency=concurrency or {}, timeouts=timeouts or {}, workers=workers)
+
+async def wait_until_finished(queue, job_id):
+    while queue.get(job_id)["status"] not in TERMINAL_STATUSES:
+        await queue.wait_for_change(timeout=0.05)
+    return queue.get(job_id)
+
+def test_jobs_succeed_fail_and_time_out(tmp_path):
+    async def echo(payload):
+        return {"brands": payload["brands"]}
+
+    async def broken(payload):
+        raise ValueError("no documents")
+
+    async def slow(payload):
+        await asyncio.sleep(5)
+
+    async def run():
+        queue = make_queue(tmp_path / "jobs.sqlite3", {"echo": echo, "broken": broken, "slow": slow}, timeouts={"slow": 0.05})
+        await queue.start()
+        ids = [queue.submit("echo", {"brands": ["Ally"]}), queue.submit("broken", {}), queue.submit("slow", {})]
+        jobs = [await wait_until_finished(queue, job_id) for job_id in ids]
+        await queue.stop()
+        return jobs
+
+    succeeded, failed, timed_out = asyncio.run(run())
+    assert succeeded["status"] == "succeeded" and succeeded["result"] == {"brands": ["Ally"]}
+    assert failed["status"] == "failed" and failed["error"] == "no documents"
+    assert timed_out["status"] == "timed_out"
+
+def test_cancel_running_and_queued_jobs(tmp_path):
+    started = []
+
+    async def slow(payload):
+        started.append(payload["n"])
+        await asyncio.sleep(5)
+
+    async def run():
+        queue = make_queue(tmp_path / "jobs.sqlite3", {"slow": slow}, concurrency={"slow": 1})
+        await queue.start()
+        running = queue.submit("slow", {"n": 1})
+        waiting = queue.submit("slow", {"n": 2})
+        while not started:
+            await asyncio.sleep(0.01)
+        assert queue.get(waiting)["status"] == "queued"  # Held back by the per-type limit
+        assert queue.cancel(waiting) and queue.cancel(running)
+        results = [await wait_until_finished(queue, job_id) for job_id in (running, waiting)]
+        assert not queue.cancel(running)
+        await queue.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert [job["status"] for job in results] == ["cancelled", "cancelled"]
+    assert started == [1]
+
+def test_unfinished_jobs_are_resumed_after_restart(tmp_path):
+    async def echo(payload):
+        return payload
+
+    path = tmp_path / "jobs.sqlite3"
+    job_id = make_queue(path, {"echo": echo}).submit("echo", {"n": 1})  # Never started
+
+    async def run():
+        queue = make_queue(path, {"echo": echo})
+        await queue.start()
+        job = await wait_until_finished(queue, job_id)
+        await queue.stop()
+        return job
+
+    assert asyncio.run(run())["result"] == {"n": 1}
+
+def test_jobs_at_their_type_limit_do_not_hold_workers(tmp_path):
+    release = None
+
+    async def rankings(payload):
+        await release.wait()
+        return payload
+
+    async def echo(payload):
+        return payload
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        queue = make_queue(tmp_path / "jobs.sqlite3", {"rankings": rankings, "echo": echo}, concurrency={"rankings": 1}, workers=4)
+        await queue.start()
+        held = [queue.submit("rankings", {"n": n}) for n in range(4)]
+        quick = queue.submit("echo", {"n": 5})
+        # The echo job runs while the rankings jobs are still blocked
+        job = await asyncio.wait_for(wait_until_finished(queue, quick), timeout=1)
+        statuses = [queue.get(job_id)["status"] for job_id in held]
+        release.set()
+        finished = [await wait_until_finished(queue, job_id) for job_id in held]
+        await queue.stop()
+        return job, statuses, finished
+
+    job, statuses, finished = asyncio.run(run())
+    assert job["status"] == "succeeded"
+    assert statuses == ["running", "queued", "queued", "queued"]
+    assert [job["status"] for job in finished] == ["succeeded"] * 4
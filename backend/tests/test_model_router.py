@@ -0,0 +1,96 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+import utils.custom_chat_chains as chains
+from models.output_models import BrandVisibilityResponse
+from utils.model_router import ModelRouter, usage_of
+from utils.usage import UsageTracker
+
+VISIBILITY = (
+    '{"visibility_score": 80, "key_sentiments": {"positive": 60, "neutral": 30, "negative": 10}, '
+    '"top_topics": ["savings"], "top_regions": ["US"]}'
+)
+
+def router(max_fast_tokens=100, **kwargs):
+    return ModelRouter(fast_model="mini", fast_chains=["visibility"], max_fast_tokens=max_fast_tokens, prices={"mini": (1.0, 2.0)}, **kwargs)
+
+def test_small_inputs_of_fast_chains_try_the_fast_model_first():
+    model_router = router()
+    assert model_router.models_for("visibility", "big", 50) == ["mini", "big"]
+    assert model_router.models_for("visibility", "big", 500) == ["big"]
+    assert model_router.models_for("rankings", "big", 50) == ["big"]
+    assert model_router.models_for("visibility", "mini", 50) == ["mini"]
+    assert router(enabled=False).models_for("visibility", "big", 50) == ["big"]
+
+def test_stats_report_tokens_cost_and_latency():
+    model_router = router()
+    model_router.record("visibility", "mini", 0.2, {"input_tokens": 1000, "output_tokens": 500}, usable=True)
+    model_router.record("visibility", "mini", 0.4, {}, usable=False)
+    model_router.record_escalation("visibility", "mini")
+    route = model_router.stats()["routes"]["visibility:mini"]
+    assert route["calls"] == 2 and route["unusable_outputs"] == 1 and route["escalations"] == 1
+    assert route["cost_usd"] == 0.002
+    assert route["latency_p50_ms"] == 200.0
+    assert usage_of({"raw": AIMessage(content="", usage_metadata={"input_tokens": 3, "output_tokens": 1, "total_tokens": 4})})["input_tokens"] == 3
+
+def test_unusable_fast_output_escalates_to_the_chain_model(monkeypatch):
+    model_router = router(max_fast_tokens=2000)
+    monkeypatch.setattr(chains, "model_router", model_router)
+    chain = chains.custom_chat_chain(BrandVisibilityResponse, chains.visibility_prompt, name="visibility", output_mode="prompt")
+    chain.model_name = "big"
+    chain._routed_chains["mini"] = chain.prompt | FakeListChatModel(responses=["not json"])
+    chain.chain = chain.prompt | FakeListChatModel(responses=[VISIBILITY])
+
+    response = asyncio.run(chain.ainvoke(brand_name="Ally"))
+    assert response.visibility_score == 80
+    routes = model_router.stats()["routes"]
+    assert routes["visibility:mini"]["escalations"] == 1
+    assert routes["visibility:big"]["calls"] == 1
+
+def test_fast_model_error_escalates_to_the_chain_model(monkeypatch):
+    model_router = router(max_fast_tokens=2000)
+    monkeypatch.setattr(chains, "model_router", model_router)
+    chain = chains.custom_chat_chain(BrandVisibilityResponse, chains.visibility_prompt, name="visibility", output_mode="prompt")
+    chain.model_name = "big"
+
+    def rate_limited(prompt_value):
+        raise RuntimeError("Rate limit reached for mini")
+
+    chain._routed_chains["mini"] = chain.prompt | RunnableLambda(rate_limited)
+    chain.chain = chain.prompt | FakeListChatModel(responses=[VISIBILITY, VISIBILITY])
+
+    assert asyncio.run(chain.ainvoke(brand_name="Ally")).visibility_score == 80
+    assert chain.invoke(brand_name="Chime").visibility_score == 80
+    routes = model_router.stats()["routes"]
+    assert routes["visibility:mini"]["errors"] == 2
+    assert routes["visibility:mini"]["escalations"] == 2
+    assert routes["visibility:big"]["calls"] == 2
+
+def test_chain_model_errors_are_recorded_like_fast_model_errors(monkeypatch, tmp_path):
+    model_router = router()
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), {})
+    monkeypatch.setattr(chains, "model_router", model_router)
+    monkeypatch.setattr(chains, "usage_tracker", tracker)
+    chain = chains.custom_chat_chain(BrandVisibilityResponse, chains.visibility_prompt, name="visibility", output_mode="prompt")
+    chain.model_name = "big"
+
+    def unavailable(prompt_value):
+        raise RuntimeError("The model big is overloaded")
+
+    chain.chain = chain.prompt | RunnableLambda(unavailable)
+
+    assert asyncio.run(chain.ainvoke(brand_name="Ally")) is None
+    assert chain.invoke(brand_name="Chime") is None
+    route = model_router.stats()["routes"]["visibility:big"]
+    assert (route["calls"], route["errors"], route["escalations"]) == (2, 2, 0)
+    groups = tracker.summary(group_by=("model", "brand"))["groups"]
+    assert {(group["model"], group["brand"], group["calls"]) for group in groups} == {("big", "Ally", 1), ("big", "Chime", 1)}
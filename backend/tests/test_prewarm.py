@@ -0,0 +1,76 @@
+import sys
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from pydantic import BaseModel
+
+from utils.prewarm import PrewarmScheduler, catalogue_jobs
+from utils.results_store import ResultsStore
+
+
+class ScoreResponse(BaseModel):
+    score: int
+
+
+class FakeChain:
+    def __init__(self, name):
+        self.name = name
+        self.pydantic_object = ScoreResponse
+
+
+def make_scheduler(store, jobs, compute, **overrides):
+    settings = dict(
+        window_start_hour=2, window_end_hour=5, max_calls=100, max_seconds=60,
+        concurrency=2, refresh_after=3600, check_interval=60,
+    )
+    settings.update(overrides)
+    return PrewarmScheduler(jobs=jobs, compute=compute, store=store, **settings)
+
+def test_results_store_round_trip_and_expiry(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), ttl=60)
+    store.put("visibility", {"brand_name": "Ally"}, ScoreResponse(score=80), duration=12.5, source="prewarm")
+
+    stored = store.get("visibility", {"brand_name": " Ally "})
+    assert stored["response"] == {"score": 80}
+    assert stored["source"] == "prewarm"
+    assert store.get("visibility", {"brand_name": "Chime"}) is None
+
+    expired = ResultsStore(str(tmp_path / "expired.sqlite3"), ttl=-1)
+    expired.put("visibility", {"brand_name": "Ally"}, ScoreResponse(score=80), duration=1.0)
+    assert expired.get("visibility", {"brand_name": "Ally"}) is None
+    assert expired.computed_at("visibility", {"brand_name": "Ally"}) is not None
+
+def test_catalogue_jobs_expand_time_periods():
+    chains = {"visibility": FakeChain("visibility"), "trends": FakeChain("trends")}
+    jobs = catalogue_jobs(chains, ["Ally", "Chime"], ["Last 1 month", "Last 3 months"])
+    assert len(jobs) == 2 + 4
+    assert ({"brand_name": "Ally", "time_period": "Last 3 months"}) in [inputs for _, inputs in jobs]
+
+def test_window_spanning_midnight():
+    scheduler = make_scheduler(None, [], None, window_start_hour=22, window_end_hour=5)
+    assert scheduler.in_window(datetime(2024, 1, 1, 23))
+    assert scheduler.in_window(datetime(2024, 1, 1, 3))
+    assert not scheduler.in_window(datetime(2024, 1, 1, 12))
+
+def test_run_once_respects_budget_and_skips_fresh_results(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.sqlite3"), ttl=3600)
+    chain = FakeChain("visibility")
+    jobs = [(chain, {"brand_name": name}) for name in ["Ally", "Chime", "Varo"]]
+
+    async def compute(chain, inputs):
+        response = ScoreResponse(score=1)
+        store.put(chain.name, inputs, response, duration=0.0, source="prewarm")
+        return response
+
+    scheduler = make_scheduler(store, jobs, compute, max_calls=2)
+    now = datetime(2024, 1, 1, 3)
+    assert asyncio.run(scheduler.run_once(now)) == 2
+    # Budget of this window is spent
+    assert asyncio.run(scheduler.run_once(now)) == 0
+    # Next window only recomputes the remaining stale result
+    assert asyncio.run(scheduler.run_once(datetime(2024, 1, 2, 3))) == 1
+    assert scheduler.stale_jobs() == []
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import app as app_module
+from models.output_models import BrandRankingResponse
+from utils.responses import CompressionMiddleware, ModelResponse, accepted_encoding
+
+RANKING = BrandRankingResponse.model_validate({
+    "rankings": [{"topic": "savings", "rankings": [{"Ally": 1}, {"Chime": 2}]}],
+    "overall_ranking": [{"Ally": 1}, {"Chime": 2}],
+})
+
+
+def build_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/large")
+    async def large():
+        return ModelResponse({"items": ["savings account"] * 100})
+
+    @app.get("/small")
+    async def small():
+        return ModelResponse({"items": []})
+
+    @app.get("/stream")
+    async def stream():
+        async def events():
+            for _ in range(3):
+                yield "data: " + "x" * 200 + "\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def test_model_response_serializes_model_once():
+    assert ModelResponse(RANKING).body == RANKING.model_dump_json().encode()
+
+
+def test_compresses_large_json_bodies_only():
+    client = TestClient(build_app())
+
+    large = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.headers["vary"] == "Accept-Encoding"
+    assert int(large.headers["content-length"]) < len(large.content)
+    assert large.json() == {"items": ["savings account"] * 100}
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    # Streamed events are passed through as they are sent
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in streamed.headers
+    assert streamed.text.count("data: ") == 3
+
+
+def test_accepted_encoding():
+    assert accepted_encoding("gzip, deflate") == "gzip"
+    assert accepted_encoding("gzip;q=0, deflate") is None
+    assert accepted_encoding("") is None
+
+
+def test_rankings_endpoint_returns_model_without_revalidation(monkeypatch):
+    async def rank_brands(request):
+        return RANKING
+    monkeypatch.setattr(app_module, "rank_brands", rank_brands)
+    client = TestClient(app_module.app)
+
+    response = client.post("/brand/rankings", json={"brands": ["Ally", "Chime"], "topics": ["savings"]})
+    assert response.status_code == 200
+    assert response.content == RANKING.model_dump_json().encode()
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from langchain.docstore.document import Document as LangChainDocument
+
+from utils.retrieval_matrix import RetrievalMatrix
+
+IDS = ["c0", "c1", "c2"]
+DOCUMENTS = [LangChainDocument(page_content=f"chunk {i}") for i in range(3)]
+
+def build_matrix():
+    rankings = [
+        [("c2", DOCUMENTS[2], 0.9), ("c0", DOCUMENTS[0], 0.5)],
+        [("c1", DOCUMENTS[1], 0.7)],
+    ]
+    return RetrievalMatrix.build(
+        ["Online Banking", "Fraud Protection"], IDS, rankings, k=2, mode="hybrid", resolve=DOCUMENTS.__getitem__
+    )
+
+def test_lookup_returns_precomputed_documents_in_rank_order():
+    matrix = build_matrix()
+    assert matrix.lookup("online  banking", 2, "hybrid") == [DOCUMENTS[2], DOCUMENTS[0]]
+    assert matrix.lookup("Online Banking", 1, "hybrid") == [DOCUMENTS[2]]
+
+def test_short_rows_are_padded():
+    matrix = build_matrix()
+    assert matrix.lookup("Fraud Protection", 2, "hybrid") == [DOCUMENTS[1]]
+    assert matrix.positions[1, 1] == -1
+
+def test_uncovered_requests_fall_back_to_live_search():
+    matrix = build_matrix()
+    assert matrix.lookup("Mortgages", 2, "hybrid") is None
+    assert matrix.lookup("Online Banking", 3, "hybrid") is None
+    assert matrix.lookup("Online Banking", 2, "dense") is None
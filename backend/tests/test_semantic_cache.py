@@ -0,0 +1,80 @@
+import sys
+import json
+import math
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from config import Config
+from utils.semantic_cache import SemanticCache
+
+
+def at_similarity(similarity):
+    return [similarity, math.sqrt(1 - similarity ** 2), 0.0]
+
+def test_similar_query_hits_and_other_scope_misses(tmp_path):
+    cache = SemanticCache("test", threshold=0.95, audit_path=str(tmp_path / "audit.jsonl"))
+    cache.store("Ally:5", [1.0, 0.0, 0.0], "mobile app features", ["doc"])
+    assert cache.lookup("Ally:5", [0.99, 0.05, 0.0], "mobile app functionality") == ["doc"]
+    assert cache.lookup("Chime:5", [1.0, 0.0, 0.0], "mobile app features") is None
+    assert cache.lookup("Ally:5", [0.0, 1.0, 0.0], "interest rates") is None
+    assert cache.stats()["hits"] == 1
+    cache.close()
+    assert (tmp_path / "audit.jsonl").read_text().count('"hit": true') == 1
+
+def test_lru_and_ttl_eviction():
+    cache = SemanticCache("test", threshold=0.99, max_entries=2, audit_path="")
+    cache.store("s", [1.0, 0.0], "a", "A")
+    cache.store("s", [0.0, 1.0], "b", "B")
+    assert cache.lookup("s", [1.0, 0.0]) == "A"
+    cache.store("s", [-1.0, 0.0], "c", "C")
+    assert cache.lookup("s", [0.0, 1.0]) is None
+    assert cache.lookup("s", [1.0, 0.0]) == "A"
+
+    expired = SemanticCache("test", threshold=0.99, ttl=1, audit_path="")
+    expired.store("s", [1.0, 0.0], "a", "A")
+    expired._entries[0] = expired._entries[0][:3] + (0,)
+    assert expired.lookup("s", [1.0, 0.0]) is None
+
+def test_entries_of_other_scopes_do_not_hide_a_match():
+    cache = SemanticCache("test", threshold=0.95, audit_path="")
+    cache.store("Ally:5", [0.97, 0.243, 0.0], "mobile app features", "Ally")
+    for i in range(9):
+        cache.store(f"Brand{i}:5", [1.0, 0.0, 0.0], "mobile app features", f"Brand{i}")
+    assert cache.lookup("Ally:5", [1.0, 0.0, 0.0], "mobile app features") == "Ally"
+    assert cache.stats()["scopes"] == 10
+
+
+def test_distinct_topics_of_a_brand_do_not_share_an_answer():
+    retrieval = SemanticCache("retrieval", threshold=Config.SemanticCache.RETRIEVAL_THRESHOLD, audit_path="")
+    retrieval.store("Ally:5:dense", [1.0, 0.0, 0.0], "savings account interest rates", ["rates"])
+    # ada-002 scores different topics of one brand this close
+    assert retrieval.lookup("Ally:5:dense", at_similarity(0.955), "mobile app features") is None
+    assert retrieval.lookup("Ally:5:dense", at_similarity(0.99), "savings interest rates") == ["rates"]
+
+    chain_results = SemanticCache(
+        "chain_results",
+        threshold=Config.SemanticCache.CHAIN_THRESHOLD,
+        scope_thresholds=Config.SemanticCache.CHAIN_THRESHOLDS,
+        audit_path="",
+    )
+    chain_results.store("gpt_perception:Ally", [1.0, 0.0, 0.0], "customer service, fees", "service")
+    assert chain_results.lookup("gpt_perception:Ally", at_similarity(0.97), "customer service, loans") is None
+
+
+def test_scope_thresholds_override_by_longest_prefix(tmp_path):
+    cache = SemanticCache(
+        "test",
+        threshold=0.95,
+        scope_thresholds={"strict:": 0.99, "strict:Ally": 0.9},
+        audit_path=str(tmp_path / "audit.jsonl"),
+    )
+    for scope in ("loose:Ally", "strict:Chime", "strict:Ally"):
+        cache.store(scope, [1.0, 0.0, 0.0], "fees", scope)
+    assert cache.lookup("loose:Ally", at_similarity(0.96), "charges") == "loose:Ally"
+    assert cache.lookup("strict:Chime", at_similarity(0.96), "charges") is None
+    assert cache.lookup("strict:Ally", at_similarity(0.92), "charges") == "strict:Ally"
+    cache.close()
+    thresholds = [json.loads(line)["threshold"] for line in (tmp_path / "audit.jsonl").read_text().splitlines()]
+    assert thresholds == [0.95, 0.99, 0.9]
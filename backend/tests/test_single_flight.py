@@ -0,0 +1,58 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.single_flight import SingleFlight, payload_key
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"visibility_score": 80}
+
+    async def run():
+        return await asyncio.gather(*(
+            flight.do("visibility", {"brand_name": name}, work) for name in ["Ally", " Ally ", "Ally"]
+        ))
+
+    results = asyncio.run(run())
+    assert results == [{"visibility_score": 80}] * 3
+    assert len(calls) == 1
+    assert flight.stats()["by_name"]["visibility"]["coalesced"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+def test_different_payloads_are_not_coalesced():
+    assert payload_key("trends", {"brand_name": "Ally"}) != payload_key("trends", {"brand_name": "Chime"})
+    assert payload_key("trends", {"brand_name": "Ally"}) != payload_key("visibility", {"brand_name": "Ally"})
+
+def test_shared_work_is_cancelled_only_when_every_caller_is_gone():
+    flight = SingleFlight()
+    outcome = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.2)
+            outcome.append("finished")
+        except asyncio.CancelledError:
+            outcome.append("cancelled")
+            raise
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("rankings", {}, work))
+        second = asyncio.ensure_future(flight.do("rankings", {}, work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0.01)
+        assert outcome == []
+        second.cancel()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert outcome == ["cancelled"]
+    assert flight.stats()["totals"]["cancelled"] == 1
@@ -0,0 +1,62 @@
+import os
+import sys
+import asyncio
+import subprocess
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from fastapi.testclient import TestClient
+
+import app as app_module
+import utils.custom_chat_chains as chains
+from models.output_models import BrandVisibilityResponse
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_importing_app_defers_llm_clients_and_scraper(tmp_path):
+    code = (
+        "import sys, app; "
+        "print(','.join(name for name in ('playwright', 'openai', 'langchain_openai', 'langchain_community') "
+        "if name in sys.modules))"
+    )
+    env = dict(os.environ, DATA_DIR=str(tmp_path), OPENAI_API_KEY="sk-test")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+    # Stores are opened on first use and nothing is scraped, so the data directory stays empty
+    assert not list(tmp_path.iterdir())
+
+
+def test_chain_is_built_on_first_use():
+    chain = chains.custom_chat_chain(
+        BrandVisibilityResponse, chains.PROMPT_FILES["visibility_prompt"], name="visibility", output_mode="prompt"
+    )
+    assert "chain" not in vars(chain)
+
+    assert chain.prompt.input_variables
+    assert {"prompt", "parser", "model", "chain"} <= set(vars(chain))
+    assert chains.chain_registry["visibility"] is chains.visibility_chain
+
+
+def test_retrieval_endpoints_answer_503_until_indices_are_built(monkeypatch):
+    async def rank_brands(request):
+        return None
+    monkeypatch.setattr(app_module, "rank_brands", rank_brands)
+    client = TestClient(app_module.app)
+    body = {"brands": ["Ally", "Chime"], "topics": ["savings"]}
+
+    loop = asyncio.new_event_loop()
+    warm_up = loop.create_future()
+    monkeypatch.setattr(app_module.app.state, "warm_up", warm_up, raising=False)
+    response = client.post("/brand/rankings", json=body)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(app_module.Config.VectorStore.WARM_UP_RETRY_AFTER_SECONDS)
+
+    warm_up.set_result(None)
+    # Past warm-up the request reaches the analysis, which here returns nothing
+    assert client.post("/brand/rankings", json=body).status_code == 500
+    loop.close()
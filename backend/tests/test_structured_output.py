@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from langchain_core.messages import AIMessage
+
+from models.output_models import BrandVisibilityResponse, AudienceSegmentationResponse
+from utils.structured_output import repair_json, repair_structured_output, structured_output_method
+
+VISIBILITY = (
+    '{"visibility_score": 80, "key_sentiments": {"positive": 50, "neutral": 30, "negative": 20}, '
+    '"top_topics": ["loans"], "top_regions": ["US"]}'
+)
+
+def test_repair_json_handles_fences_prose_and_trailing_commas():
+    assert repair_json('```json\n{"a": 1,}\n```') == {"a": 1}
+    assert repair_json('Sure! Here it is: {"a": [1, 2,]} Hope this helps.') == {"a": [1, 2]}
+    assert repair_json("no json here") is None
+
+def test_repair_json_closes_truncated_output():
+    assert repair_json('{"a": 1, "b": ["x", "y"') == {"a": 1, "b": ["x", "y"]}
+
+def test_repair_structured_output_reads_tool_call_arguments():
+    message = AIMessage(
+        content="",
+        additional_kwargs={"tool_calls": [{"function": {"arguments": '{"properties": ' + VISIBILITY + "}"}}]},
+    )
+    response = repair_structured_output(message, BrandVisibilityResponse)
+    assert response.visibility_score == 80
+
+def test_repair_structured_output_rejects_schema_mismatch():
+    message = AIMessage(content='{"visibility_score": "high"}')
+    assert repair_structured_output(message, BrandVisibilityResponse) is None
+
+def test_free_form_mappings_fall_back_to_function_calling():
+    assert structured_output_method(BrandVisibilityResponse, "json_schema") == "json_schema"
+    assert structured_output_method(AudienceSegmentationResponse, "json_schema") == "function_calling"
+    assert structured_output_method(AudienceSegmentationResponse, "prompt") == "prompt"
@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+from utils.url_scope import CrawlScope, canonicalize_url, has_non_html_extension
+
+def test_canonicalize_strips_tracking_and_sorts_query():
+    url = "HTTP://WWW.Ally.com:80/bank//savings/?utm_source=x&b=2&gclid=1&a=1#rates"
+    assert canonicalize_url(url) == "https://www.ally.com/bank/savings?a=1&b=2"
+
+def test_canonicalize_rejects_non_http_links():
+    assert canonicalize_url("mailto:help@ally.com") is None
+    assert canonicalize_url("javascript:void(0)") is None
+
+def test_scope_maps_www_variants_onto_brand_host():
+    scope = CrawlScope("https://www.ally.com/")
+    assert scope.canonicalize("http://ally.com/bank/") == "https://www.ally.com/bank"
+    assert scope.canonicalize("https://www.chime.com/") is None
+
+def test_scope_filters_binaries_and_patterns():
+    scope = CrawlScope("https://www.ally.com/", include=[r"^/bank"], exclude=[r"/bank/archive"])
+    assert scope.canonicalize("/bank/rates.pdf") is None
+    assert scope.canonicalize("/invest") is None
+    assert scope.canonicalize("/bank/archive/2020") is None
+    assert scope.canonicalize("/bank/rates") == "https://www.ally.com/bank/rates"
+    assert has_non_html_extension("https://www.ally.com/files/terms.PDF")
+
+def test_scope_default_excludes_login_pages():
+    scope = CrawlScope("https://www.ally.com/")
+    assert scope.canonicalize("/login") is None
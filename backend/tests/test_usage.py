@@ -0,0 +1,108 @@
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.usage import UsageAttributionMiddleware, UsageTracker, count_tokens, usage_scope
+
+PRICES = {"gpt-4o": (2.50, 10.00), "text-embedding-ada-002": (0.10, 0.0)}
+
+
+def test_usage_is_aggregated_flushed_and_summarized(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES)
+    with usage_scope(endpoint="/brand/visibility", request_id="a"):
+        tracker.record_chat("gpt-4o", 1.0, {"input_tokens": 1000, "output_tokens": 100}, chain="visibility_analysis", brand="Ally")
+        tracker.record_chat("gpt-4o", 3.0, {"input_tokens": 1000, "output_tokens": 100}, chain="visibility_analysis", brand="Ally")
+        with usage_scope(brand="Chime"):
+            tracker.record("embedding", "text-embedding-ada-002", 0.1, input_tokens=500)
+    assert tracker.flush() == 2
+
+    # Calls recorded after a flush are added to the stored aggregates
+    with usage_scope(endpoint="/brand/visibility", request_id="a"):
+        tracker.record_chat("gpt-4o", 2.0, {"input_tokens": 1000, "output_tokens": 100}, chain="visibility_analysis", brand="Ally")
+
+    summary = tracker.summary(group_by=("brand", "kind"))
+    ally, chime = summary["groups"]
+    assert (ally["brand"], ally["kind"], ally["calls"]) == ("Ally", "chat", 3)
+    assert (ally["input_tokens"], ally["output_tokens"]) == (3000, 300)
+    assert ally["avg_latency_ms"] == 2000.0
+    assert ally["max_latency_ms"] == 3000.0
+    assert ally["cost_usd"] == pytest.approx(3 * (1000 * 2.50 + 100 * 10.00) / 1e6)
+    assert (chime["brand"], chime["kind"], chime["input_tokens"]) == ("Chime", "embedding", 500)
+    assert summary["total_calls"] == 4
+
+    # Stored aggregates outlive the tracker
+    totals = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES).summary(group_by=("request_id",))
+    assert totals["groups"][0]["request_id"] == "a"
+    assert totals["total_cost_usd"] == summary["total_cost_usd"]
+
+
+def test_requests_share_hourly_rollups_and_expire(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES, request_retention=60)
+    for request_id in range(5):
+        with usage_scope(endpoint="/brand/visibility", request_id=str(request_id)):
+            tracker.record_chat("gpt-4o", 1.0, {"input_tokens": 10, "output_tokens": 1}, brand="Ally")
+    assert tracker.flush() == 1
+    assert len(tracker.summary(group_by=("request_id",))["groups"]) == 5
+
+    # Per-request rows past the retention window are pruned on flush; the rollup keeps the totals
+    tracker._connect().execute("UPDATE usage_by_request SET recorded_at = recorded_at - 120")
+    tracker.flush()
+    assert tracker.summary(group_by=("request_id",))["groups"] == []
+    assert tracker.summary(group_by=("endpoint",))["total_calls"] == 5
+
+
+def test_summary_window_and_dimensions(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES)
+    tracker.record_chat("gpt-4o", 1.0, {"input_tokens": 10, "output_tokens": 1})
+    assert tracker.summary(since=time.time() + 7200)["groups"] == []
+    assert tracker.summary(until=time.time())["total_calls"] == 1
+    with pytest.raises(ValueError):
+        tracker.summary(group_by=("hour",))
+
+
+def test_cached_input_tokens_are_discounted(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES, cached_input_factor=0.5)
+    tracker.record_chat("gpt-4o", 1.0, {"input_tokens": 1000, "output_tokens": 0, "input_token_details": {"cache_read": 800}})
+    group = tracker.summary(group_by=("model",))["groups"][0]
+    assert group["cached_tokens"] == 800
+    assert group["cost_usd"] == pytest.approx((200 + 800 * 0.5) * 2.50 / 1e6)
+
+
+def test_disabled_tracker_records_nothing(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES, enabled=False)
+    tracker.record_embedding("text-embedding-ada-002", 0.1, ["savings account"])
+    assert tracker.flush() == 0
+
+
+def test_count_tokens():
+    assert count_tokens([], "text-embedding-ada-002") == 0
+    assert 0 < count_tokens(["high yield savings account"], "text-embedding-ada-002") < 10
+
+
+def test_middleware_attributes_calls_to_endpoint_and_request_id(tmp_path):
+    tracker = UsageTracker(str(tmp_path / "usage.sqlite3"), PRICES)
+    app = FastAPI()
+    app.add_middleware(UsageAttributionMiddleware, header="X-Request-ID")
+
+    @app.post("/brand/visibility")
+    async def visibility():
+        tracker.record_chat("gpt-4o", 1.0, {"input_tokens": 10, "output_tokens": 1}, brand="Ally")
+        return {}
+
+    client = TestClient(app)
+    response = client.post("/brand/visibility", headers={"X-Request-ID": "request-1"})
+    assert response.headers["x-request-id"] == "request-1"
+    generated = client.post("/brand/visibility").headers["x-request-id"]
+
+    groups = tracker.summary(group_by=("request_id", "endpoint"))["groups"]
+    assert {(group["request_id"], group["endpoint"]) for group in groups} == {
+        ("request-1", "/brand/visibility"),
+        (generated, "/brand/visibility"),
+    }
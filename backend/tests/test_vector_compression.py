@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+
+import numpy as np
+import pytest
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain.docstore.document import Document as LangChainDocument
+
+from utils.vector_compression import RerankedIndex, compress_vector_store, compressed_index, index_bytes
+
+VECTORS = np.random.default_rng(0).normal(size=(500, 32)).astype("float32")
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "pq"])
+def test_compressed_index_is_smaller(storage):
+    index = compressed_index(VECTORS, storage, pq_subquantizers=8, pq_bits=8)
+    assert index.ntotal == len(VECTORS)
+    assert index_bytes(index) < index_bytes(compressed_index(VECTORS, "float32"))
+
+def test_reranking_restores_exact_neighbours(tmp_path):
+    np.save(tmp_path / "vectors.npy", VECTORS)
+    index = RerankedIndex(compressed_index(VECTORS, "pq", pq_subquantizers=4, pq_bits=4), np.load(tmp_path / "vectors.npy", mmap_mode="r"), factor=50)
+    exact_distances, exact_ids = compressed_index(VECTORS, "float32").search(VECTORS[:10], 3)
+    distances, ids = index.search(VECTORS[:10], 3)
+    assert (ids == exact_ids).all()
+    assert np.allclose(distances, exact_distances, atol=1e-3)
+    assert np.array_equal(index.reconstruct(7), VECTORS[7])
+
+def test_compress_vector_store_keeps_langchain_search_working(tmp_path):
+    documents = [LangChainDocument(page_content=f"chunk {i}", metadata={"url": f"u{i % 3}"}) for i in range(50)]
+    store = FAISS.from_documents(documents, FakeEmbeddings(size=16))
+    vector = store.index.reconstruct(4).tolist()
+    stats = compress_vector_store(store, "int8", vectors_path=str(tmp_path / "v.npy"), rerank_factor=4)
+    assert stats["bytes_after"] < stats["bytes_before"]
+    assert store.similarity_search_by_vector(vector, k=1)[0].page_content == "chunk 4"
+    assert all(document.metadata["url"] == "u1" for document in store.similarity_search_by_vector(vector, k=3, filter={"url": "u1"}))
+    with pytest.raises(NotImplementedError):
+        store.add_texts(["new"])
@@ -0,0 +1,195 @@
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+
+ADMITTED = "admitted"
+QUEUE_FULL = "queue_full"
+TIMED_OUT = "timed_out"
+
+
+class AdmissionGate:
+    """
+    Concurrency cap with a bounded FIFO wait queue for one endpoint.
+
+    A released slot is handed directly to the oldest waiter, so queued requests are admitted in
+    arrival order and new arrivals cannot overtake them.
+    """
+
+    def __init__(self, limit, queue_size):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters = deque()
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "served_from_cache": 0,
+            "peak_waiting": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    async def acquire(self, max_wait):
+        """
+        Take a slot, waiting at most `max_wait` seconds in the queue.
+
+        Returns:
+            str: ADMITTED, QUEUE_FULL (queue at capacity) or TIMED_OUT (deadline passed while queued).
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.counters["admitted"] += 1
+            return ADMITTED
+        if len(self._waiters) >= self.queue_size:
+            self.counters["rejected_queue_full"] += 1
+            return QUEUE_FULL
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.counters["queued"] += 1
+        self.counters["peak_waiting"] = max(self.counters["peak_waiting"], len(self._waiters))
+        started = time.monotonic()
+        try:
+            await asyncio.wait({waiter}, timeout=max_wait)
+        except asyncio.CancelledError:
+            # The request went away while queued: give back a slot already handed over, or leave the queue
+            if waiter.done():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            self.counters["total_wait_seconds"] += time.monotonic() - started
+        if not waiter.done():
+            waiter.cancel()
+            self._waiters.remove(waiter)
+            self.counters["rejected_timeout"] += 1
+            return TIMED_OUT
+        self.counters["admitted"] += 1
+        return ADMITTED
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)  # The slot passes to the waiter; `active` is unchanged
+                return
+        self.active -= 1
+
+    def stats(self):
+        waited = self.counters["queued"]
+        stats = {key: value for key, value in self.counters.items() if key != "total_wait_seconds"}
+        stats.update({
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": len(self._waiters),
+            "avg_wait_ms": round(self.counters["total_wait_seconds"] / waited * 1000, 1) if waited else 0.0,
+        })
+        return stats
+
+
+class AdmissionController:
+    """
+    Per-endpoint admission gates for the LLM-backed routes.
+
+    Args:
+        limits (dict[str, int]): Concurrency cap per path; other controlled paths use `default_limit`.
+        path_prefixes (list[str]): POST requests under these prefixes are controlled.
+        queue_size (int): Requests allowed to wait per endpoint before new ones get 429.
+        max_wait (float): Seconds a request may wait before it gets 503.
+        retry_after (int): Value of the Retry-After header on rejections.
+    """
+
+    def __init__(self, limits, default_limit, path_prefixes, queue_size, max_wait, retry_after):
+        self.limits = limits
+        self.default_limit = default_limit
+        self.path_prefixes = tuple(path_prefixes)
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self._gates = {}
+
+    def gate_for(self, method, path):
+        """
+        The gate controlling a request, or None if the request is not admission-controlled.
+        """
+        if method != "POST" or not path.startswith(self.path_prefixes):
+            return None
+        gate = self._gates.get(path)
+        if gate is None:
+            gate = self._gates[path] = AdmissionGate(self.limits.get(path, self.default_limit), self.queue_size)
+        return gate
+
+    def stats(self):
+        return {path: gate.stats() for path, gate in sorted(self._gates.items())}
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware applying an `AdmissionController`.
+
+    Rejected requests get a fast 429 (queue full) or 503 (queue deadline passed) with Retry-After,
+    unless `fallback(path, body)` returns a stored result for the request, which is then served
+    with status 200 and an `X-Served-From: cache` header.
+    """
+
+    def __init__(self, app, controller, fallback=None):
+        self.app = app
+        self.controller = controller
+        self.fallback = fallback
+
+    async def __call__(self, scope, receive, send):
+        gate = self.controller.gate_for(scope.get("method"), scope.get("path", "")) if scope["type"] == "http" else None
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        outcome = await gate.acquire(self.controller.max_wait)
+        if outcome != ADMITTED:
+            await self._shed(scope, receive, send, gate, outcome)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+    async def _shed(self, scope, receive, send, gate, outcome):
+        if self.fallback is not None:
+            body = b""
+            while True:
+                message = await receive()
+                body += message.get("body", b"")
+                if not message.get("more_body"):
+                    break
+            try:
+                cached = self.fallback(scope["path"], body)
+            except Exception as e:
+                logging.warning(f"Admission fallback failed for {scope['path']}: {e}")
+                cached = None
+            if cached is not None:
+                gate.counters["served_from_cache"] += 1
+                await self._respond(send, 200, cached, [(b"x-served-from", b"cache")])
+                return
+
+        status = 429 if outcome == QUEUE_FULL else 503
+        logging.warning(f"Shedding {scope['path']} with {status} ({outcome})")
+        await self._respond(
+            send,
+            status,
+            {"detail": "Server is busy, retry later"},
+            [(b"retry-after", str(self.controller.retry_after).encode())],
+        )
+
+    @staticmethod
+    async def _respond(send, status, payload, headers):
+        body = json.dumps(payload).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,118 @@
+import re
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do for from has have how i if in into is it its of on or our so
+than that the their them then there these they this to was we what when which who will with you your
+""".split())
+
+
+def tokenize(text):
+    """
+    Lowercased alphanumeric tokens of `text` without common English stopwords.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 inverted index over a brand's content chunks.
+
+    Built from the same chunk IDs and documents as the FAISS content index, so results of both can
+    be fused by ID. Searching needs no network calls, which makes it usable when the embeddings API
+    is slow or unavailable. With a `docstore`, documents are not kept by the index but looked up
+    there for the returned hits.
+    """
+
+    def __init__(self, ids, documents, k1=1.5, b=0.75, docstore=None):
+        self.ids = list(ids)
+        self.k1 = k1
+        self.b = b
+        self.docstore = docstore
+        documents = list(documents)
+        self._documents = None if docstore is not None else documents
+
+        postings = defaultdict(list)
+        lengths = np.zeros(len(documents), dtype="float32")
+        for position, document in enumerate(documents):
+            counts = Counter(tokenize(document.page_content))
+            lengths[position] = sum(counts.values())
+            for term, frequency in counts.items():
+                postings[term].append((position, frequency))
+
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+        # Length normalization is per document, so it is folded into one factor at build time
+        self._length_norm = k1 * (1 - b + b * lengths / (self.average_length or 1.0))
+        self._postings = {
+            term: (np.array([p for p, _ in entries], dtype="int32"), np.array([f for _, f in entries], dtype="float32"))
+            for term, entries in postings.items()
+        }
+        total = len(documents)
+        self._idf = {
+            term: math.log(1 + (total - len(entries[0]) + 0.5) / (len(entries[0]) + 0.5))
+            for term, entries in self._postings.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def document(self, position):
+        """
+        The document at `position` in chunk order.
+        """
+        if self._documents is not None:
+            return self._documents[position]
+        return self.docstore.search(self.ids[position])
+
+    def scores(self, query):
+        """
+        BM25 score of every document for `query`.
+        """
+        scores = np.zeros(len(self.ids), dtype="float32")
+        for term in set(tokenize(query)):
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            positions, frequencies = entry
+            scores[positions] += self._idf[term] * frequencies * (self.k1 + 1) / (frequencies + self._length_norm[positions])
+        return scores
+
+    def search(self, query, k=5):
+        """
+        Return up to `k` (chunk_id, document, score) tuples with a positive score, best first.
+        """
+        scores = self.scores(query)
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.ids[i], self.document(i), float(scores[i])) for i in ranked]
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=60):
+    """
+    Fuse ranked lists of (chunk_id, document) pairs with reciprocal rank fusion.
+
+    Args:
+        rankings (list[list[tuple[str, Document]]]): One ranked list per retriever, best first.
+        k (int): Number of fused results to return.
+        rrf_k (int): Rank offset damping the weight of top positions.
+
+    Returns:
+        list[tuple[str, Document, float]]: The `k` (chunk_id, document, fused score) tuples with the highest score.
+    """
+    scores = defaultdict(float)
+    documents = {}
+    for ranking in rankings:
+        for rank, (document_id, document) in enumerate(ranking):
+            scores[document_id] += 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(document_id, document)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [(document_id, documents[document_id], scores[document_id]) for document_id in best]
@@ -0,0 +1,281 @@
+import time
+import atexit
+import asyncio
+import logging
+import threading
+from collections import Counter
+
+from config import Config
+
+
+class ContextLease:
+    """
+    A crawl's use of the pool: one browser context at a time, opened on the first page and replaced
+    after `pool.pages_per_context` pages or when the browser behind it has died.
+    """
+
+    def __init__(self, pool, context_options=None, setup=None):
+        self.pool = pool
+        self.context_options = context_options or {}
+        self.setup = setup
+        self._context = None
+        self._browser = None  # The browser the context was opened in
+        self._pages = 0
+
+    @property
+    def stale(self):
+        """
+        Whether the context's browser has died, even if the pool has relaunched it since.
+        """
+        return self._browser is not self.pool._browser or not self.pool.connected
+
+    async def _open_context(self):
+        await self.pool._context_slots.acquire()
+        try:
+            browser = await self.pool._connected_browser()
+            context = await browser.new_context(**self.context_options)
+        except BaseException:
+            self.pool._context_slots.release()
+            raise
+        self._context = context
+        self._browser = browser
+        self._pages = 0
+        self.pool.contexts_open += 1
+        self.pool.counters["contexts_created"] += 1
+        if self.setup is not None:
+            try:
+                await self.setup(context)
+            except BaseException:
+                await self._close_context()
+                raise
+
+    async def _close_context(self):
+        context, self._context = self._context, None
+        self.pool.contexts_open -= 1
+        try:
+            await context.close()
+        except Exception as e:
+            # Expected when the browser crashed; the context is gone with it
+            logging.debug(f"Closing browser context failed: {e}")
+        finally:
+            self.pool._context_slots.release()
+
+    async def new_page(self):
+        """
+        Open a page in the lease's context, recycling the context or relaunching the browser first when needed.
+        """
+        if self._context is not None and self.stale:
+            await self._close_context()
+        elif self._context is not None and self._pages >= self.pool.pages_per_context:
+            await self._close_context()
+            self.pool.counters["contexts_recycled"] += 1
+
+        for attempt in range(2):
+            if self._context is None:
+                await self._open_context()
+            try:
+                page = await self._context.new_page()
+                break
+            except Exception as e:
+                if attempt or not self.stale:
+                    raise
+                # The browser died under this context: relaunch and retry once
+                logging.warning(f"Opening a page failed after a browser crash, retrying: {e}")
+                await self._close_context()
+
+        self._pages += 1
+        self.pool.counters["pages"] += 1
+        page.on("crash", self.pool._on_page_crash)
+        return page
+
+    async def close(self):
+        if self._context is not None:
+            await self._close_context()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class BrowserPool:
+    """
+    A long-lived headless Chromium shared by crawls, with health counters.
+
+    Crawls take a `lease()`; every lease gets its own browser context (so profiles and their resource
+    blocking stay separate), at most `max_contexts` of which are open at once. The browser is
+    launched for the first context and relaunched for the next one after it crashes or disconnects.
+
+    A pool belongs to the event loop it is used on; `BrowserPoolService` hosts one on a background
+    loop for synchronous callers.
+
+    Args:
+        launch: Optional coroutine function returning a connected browser, in place of
+            launching Chromium with Playwright.
+    """
+
+    def __init__(self, pages_per_context=50, max_contexts=4, launch=None):
+        self.pages_per_context = pages_per_context
+        self.max_contexts = max_contexts
+        self._launch = launch or self._launch_chromium
+        self._context_slots = asyncio.Semaphore(max_contexts)
+        self._launch_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._closing = False
+        self.counters = Counter()
+        self.contexts_open = 0
+        self.launched_at = None
+
+    @property
+    def connected(self):
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _launch_chromium(self):
+        from playwright.async_api import async_playwright
+
+        for attempt in range(2):
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            try:
+                return await self._playwright.chromium.launch(headless=True)
+            except Exception:
+                if attempt:
+                    raise
+                # The Playwright driver may have died with the browser; start a new one
+                try:
+                    await self._playwright.stop()
+                except Exception:
+                    pass
+                self._playwright = None
+
+    async def _connected_browser(self):
+        async with self._launch_lock:
+            if self.connected:
+                return self._browser
+            if self._browser is not None:
+                self.counters["relaunches"] += 1
+                logging.warning("Browser disconnected, relaunching it.")
+            self._browser = await self._launch()
+            self._browser.on("disconnected", self._on_disconnected)
+            self.counters["launches"] += 1
+            self.launched_at = time.time()
+            return self._browser
+
+    def _on_disconnected(self, browser):
+        if not self._closing:
+            self.counters["crashes"] += 1
+            logging.error("Browser crashed or disconnected.")
+
+    def _on_page_crash(self, page):
+        self.counters["page_crashes"] += 1
+        logging.warning(f"Browser page crashed: {page.url}")
+
+    def lease(self, context_options=None, setup=None):
+        """
+        Args:
+            context_options (dict): Keyword arguments of `browser.new_context`.
+            setup: Optional coroutine function called with every new context, e.g. to install routes.
+        """
+        return ContextLease(self, context_options, setup)
+
+    async def close(self):
+        self._closing = True
+        try:
+            if self._browser is not None:
+                await self._browser.close()
+            if self._playwright is not None:
+                await self._playwright.stop()
+        finally:
+            self._browser = self._playwright = None
+            self._closing = False
+
+    def stats(self):
+        return {
+            "browser_connected": self.connected,
+            "browser_uptime_seconds": round(time.time() - self.launched_at, 1) if self.connected else None,
+            "contexts_open": self.contexts_open,
+            "max_contexts": self.max_contexts,
+            "pages_per_context": self.pages_per_context,
+            **{
+                name: self.counters[name]
+                for name in ("launches", "relaunches", "crashes", "page_crashes", "contexts_created", "contexts_recycled", "pages")
+            },
+        }
+
+
+class BrowserPoolService:
+    """
+    A BrowserPool on a background event loop thread, started on first use.
+
+    Synchronous callers (index builds, a single-brand refresh) submit crawl coroutines to the one
+    loop, so consecutive and concurrent crawls share a warm browser instead of each starting
+    Chromium inside its own `asyncio.run`.
+    """
+
+    def __init__(self, **pool_options):
+        self.pool_options = pool_options
+        self._pool = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+                self._thread.start()
+                self._pool = self.run(self._create_pool())
+                atexit.register(self.stop)
+        return self
+
+    async def _create_pool(self):
+        return BrowserPool(**self.pool_options)
+
+    @property
+    def pool(self):
+        """
+        The pool, for building coroutines to `submit`; only to be used on the service's loop.
+        """
+        return self.start()._pool
+
+    def submit(self, coroutine):
+        """
+        Schedule a coroutine on the pool's loop.
+
+        Returns:
+            concurrent.futures.Future: Its result.
+        """
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def stats(self):
+        if self._pool is None:
+            return {"running": False}
+        return {"running": True, **self._pool.stats()}
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return
+            try:
+                self.run(self._pool.close(), timeout=30)
+            except Exception as e:
+                logging.error(f"Closing the browser pool failed: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._pool = self._loop = self._thread = None
+            atexit.unregister(self.stop)
+
+
+# Shared by the crawls of the scrape command and single-brand refreshes
+browser_pool_service = BrowserPoolService(
+    pages_per_context=Config.Scraper.BROWSER_PAGES_PER_CONTEXT,
+    max_contexts=Config.Scraper.BROWSER_MAX_CONTEXTS,
+)
@@ -0,0 +1,180 @@
+import json
+import time
+import asyncio
+import logging
+import contextvars
+from collections import Counter
+
+# Monotonic time by which the current request must be answered; None when it has no deadline
+request_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.CancelledError):
+    """
+    The current request's deadline passed.
+
+    A cancellation rather than an error: the broad `except Exception` handlers of the endpoints and
+    chains let it through, so the remaining work of the request stops instead of being retried.
+    """
+
+
+class CancellationStats:
+    """
+    Counters of requests ended early and of the work stages (llm, embedding, retrieval) cut short.
+    """
+
+    def __init__(self):
+        self.requests = Counter()
+        self.work = Counter()
+
+    def stats(self):
+        return {"requests": dict(self.requests), "cancelled_work": dict(self.work)}
+
+
+cancellation_stats = CancellationStats()
+
+
+def remaining():
+    """
+    Seconds left until the current request's deadline, or None without a deadline.
+    """
+    deadline = request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(stage):
+    """
+    Raise DeadlineExceeded instead of starting more `stage` work once the deadline has passed.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        cancellation_stats.work[stage] += 1
+        raise DeadlineExceeded(f"Request deadline passed before {stage}")
+
+
+async def within_deadline(awaitable, stage, timeout=None):
+    """
+    Await `awaitable` bounded by the request deadline, counting it as cancelled `stage` work if the
+    deadline passes or the request is cancelled meanwhile.
+
+    Args:
+        timeout (float): Optional own timeout of the operation; when it expires before the deadline,
+            asyncio.TimeoutError is raised as with `asyncio.wait_for`.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        awaitable.close()
+        check_deadline(stage)
+    bounds = [value for value in (left, timeout) if value is not None]
+    bound = min(bounds) if bounds else None
+    try:
+        return await asyncio.wait_for(awaitable, bound)
+    except asyncio.TimeoutError:
+        if timeout is not None and (left is None or timeout < left):
+            raise
+        cancellation_stats.work[stage] += 1
+        raise DeadlineExceeded(f"Request deadline passed during {stage}") from None
+    except asyncio.CancelledError:
+        cancellation_stats.work[stage] += 1
+        raise
+
+
+class RequestCancellationMiddleware:
+    """
+    ASGI middleware giving controlled requests a deadline and cancelling them when it passes or the
+    client disconnects.
+
+    The deadline is `header` seconds from arrival (capped at `max_timeout`) or `default_timeout`,
+    and is visible to the request's work through `request_deadline`. The request body is read up
+    front so the connection can be watched for a disconnect while the endpoint runs. Requests past
+    their deadline get 504 if no response has started.
+    """
+
+    def __init__(self, app, path_prefixes, default_timeout, max_timeout, header="x-request-timeout"):
+        self.app = app
+        self.path_prefixes = tuple(path_prefixes)
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.header = header.lower().encode("latin-1")
+
+    def _timeout(self, scope):
+        for name, value in scope.get("headers", []):
+            if name == self.header:
+                try:
+                    timeout = float(value)
+                except ValueError:
+                    break
+                if timeout > 0:
+                    return min(timeout, self.max_timeout)
+        return self.default_timeout
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") != "POST" or not scope.get("path", "").startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        timeout = self._timeout(scope)
+        token = request_deadline.set(time.monotonic() + timeout)
+        try:
+            await self._run(scope, receive, send, timeout)
+        finally:
+            request_deadline.reset(token)
+
+    async def _run(self, scope, receive, send, timeout):
+        body = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                cancellation_stats.requests["client_disconnect"] += 1
+                return
+            body.append(message)
+            if not message.get("more_body"):
+                break
+
+        async def replay_receive():
+            if body:
+                return body.pop(0)
+            # Only a disconnect can follow the body; the endpoint never needs to wait for it
+            await asyncio.Event().wait()
+
+        response_started = False
+
+        async def tracking_send(message):
+            nonlocal response_started
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        # The request task copies the current context, deadline included
+        task = asyncio.ensure_future(self.app(scope, replay_receive, tracking_send))
+        disconnect = asyncio.ensure_future(receive())
+        try:
+            done, _ = await asyncio.wait({task, disconnect}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel()
+            disconnect.cancel()
+            raise
+
+        if task in done and not task.cancelled():
+            disconnect.cancel()
+            task.result()
+            return
+
+        if task in done:
+            reason = "deadline_exceeded"  # Cancelled from inside, e.g. by a deadline check
+        else:
+            reason = "client_disconnect" if disconnect in done else "deadline_exceeded"
+            task.cancel()
+            # Let the request's cleanup (slot releases, finally blocks) run before answering
+            await asyncio.gather(task, return_exceptions=True)
+        disconnect.cancel()
+        cancellation_stats.requests[reason] += 1
+        logging.warning(f"Cancelled {scope['path']} after {reason.replace('_', ' ')} ({timeout:g}s deadline)")
+
+        if reason == "deadline_exceeded" and not response_started:
+            payload = json.dumps({"detail": "Request deadline exceeded"}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+            })
+            await send({"type": "http.response.body", "body": payload})
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+
+import lxml.html
+from lxml import etree
+from langchain.docstore.document import Document as LangChainDocument
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_text_splitters import HTMLHeaderTextSplitter
+
+from config import Config
+from utils.html_extraction import SKIPPED_TAGS
+
+HEADERS_TO_SPLIT_ON = [("h1", "Header 1"), ("h2", "Header 2"), ("h3", "Header 3")]
+HEADER_KEYS = [key for _, key in HEADERS_TO_SPLIT_ON]
+
+
+def chunk_id(text):
+    """
+    Deterministic ID of a chunk, derived from its whitespace- and case-normalized text.
+
+    Identical text always gets the same ID, so repeated boilerplate collapses to one chunk and
+    incremental index updates can tell new chunks from ones already embedded.
+    """
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def _clean_text(text):
+    lines = (" ".join(line.split()) for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _strip_non_content(page_source):
+    """
+    Remove script-like elements before header splitting so their text never becomes a chunk.
+    """
+    document = lxml.html.document_fromstring(page_source)
+    etree.strip_elements(document, *SKIPPED_TAGS, with_tail=False)
+    return lxml.html.tostring(document, encoding="unicode")
+
+
+class StructuredChunker:
+    """
+    Splits scraped pages into section chunks that follow the page's heading hierarchy.
+
+    Pages are split on h1-h3 with `HTMLHeaderTextSplitter`; sections longer than
+    `Config.VectorStore.CHUNK_SIZE` are split again with a small overlap, fragments shorter than
+    `Config.VectorStore.MIN_CHUNK_CHARS` are dropped and duplicate chunks are removed by content
+    hash. Pages without a saved `page_source` fall back to splitting their paragraph content.
+    """
+
+    def __init__(self, chunk_size=None, chunk_overlap=None, min_chunk_chars=None):
+        self.min_chunk_chars = Config.VectorStore.MIN_CHUNK_CHARS if min_chunk_chars is None else min_chunk_chars
+        self.header_splitter = HTMLHeaderTextSplitter(headers_to_split_on=HEADERS_TO_SPLIT_ON)
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size or Config.VectorStore.CHUNK_SIZE,
+            chunk_overlap=Config.VectorStore.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
+        )
+
+    def _sections(self, data):
+        """
+        Yield (header_path, text) pairs for a scraped page.
+        """
+        page_source = data.get("page_source")
+        if page_source:
+            try:
+                for section in self.header_splitter.split_text(_strip_non_content(page_source)):
+                    headers = [section.metadata[key] for key in HEADER_KEYS if section.metadata.get(key)]
+                    yield " > ".join(headers), section.page_content
+                return
+            except (etree.LxmlError, ValueError) as e:
+                logging.warning(f"Header splitting failed for {data.get('url')}, using paragraph content: {e}")
+        if data.get("content"):
+            yield "", data["content"]
+
+    def chunk_page(self, data, brand_name):
+        """
+        Split one scraped page into chunk documents carrying url, title, brand, header path and chunk ID.
+        """
+        documents = []
+        for header_path, section_text in self._sections(data):
+            text = _clean_text(section_text)
+            if len(text) < self.min_chunk_chars:
+                continue
+            for chunk in self.text_splitter.split_text(text):
+                if len(chunk) < self.min_chunk_chars:
+                    continue
+                documents.append(LangChainDocument(
+                    page_content=chunk,
+                    metadata={
+                        "url": data["url"],
+                        "title": data.get("title"),
+                        "name": brand_name,
+                        "header_path": header_path,
+                        "chunk_id": chunk_id(chunk),
+                    },
+                ))
+        return documents
+
+    def chunk_pages(self, scraped_data, brand_name):
+        """
+        Chunk all pages of a brand, keeping the first occurrence of every chunk ID.
+
+        Returns:
+            tuple[list[str], list[Document]]: Chunk IDs and their documents, in crawl order.
+        """
+        ids = []
+        documents = []
+        seen = set()
+        duplicates = 0
+        for data in scraped_data:
+            for document in self.chunk_page(data, brand_name):
+                if document.metadata["chunk_id"] in seen:
+                    duplicates += 1
+                    continue
+                seen.add(document.metadata["chunk_id"])
+                ids.append(document.metadata["chunk_id"])
+                documents.append(document)
+
+        logging.info(
+            f"Chunked {brand_name} into {len(documents)} chunks "
+            f"({duplicates} duplicates removed, {sum(len(d.page_content) for d in documents)} chars to embed)"
+        )
+        return ids, documents
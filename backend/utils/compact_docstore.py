@@ -0,0 +1,129 @@
+from array import array
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain.docstore.document import Document as LangChainDocument
+
+MISSING = -1
+SAME_AS_ID = -2
+
+
+class _StringColumn:
+    """
+    Metadata column of interned strings: each distinct value is stored once and rows hold int codes.
+    """
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+        self.rows = array("i")
+
+    def append(self, value, document_id=None):
+        if value is not None and value == document_id:
+            # Values equal to the row's own ID (e.g. chunk_id) are not stored again
+            self.rows.append(SAME_AS_ID)
+            return
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        self.rows.append(code)
+
+    def has(self, row):
+        return row < len(self.rows) and self.rows[row] != MISSING
+
+    def get(self, row, document_id):
+        code = self.rows[row]
+        return document_id if code == SAME_AS_ID else self.values[code]
+
+
+class CompactDocstore(Docstore, AddableMixin):
+    """
+    Columnar replacement for LangChain's `InMemoryDocstore`.
+
+    Page contents live in one contiguous UTF-8 buffer addressed by offset and length arrays, and
+    metadata is stored column-wise with interned string tables, so a chunk costs a few array slots
+    instead of a `Document` with its own metadata dict. `Document`s are only materialized for the
+    IDs a search returns.
+    """
+
+    def __init__(self, documents=None):
+        self._rows = {}
+        self._ids = []
+        self._text = bytearray()
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._columns = {}
+        self._other = {}  # Non-string metadata values by row; rare for scraped chunks
+        if documents:
+            self.add(documents)
+
+    @classmethod
+    def from_docstore(cls, docstore):
+        """
+        Copy the documents of an `InMemoryDocstore`, e.g. the one a FAISS store was built with.
+        """
+        return cls(dict(docstore._dict))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, texts):
+        """
+        Add documents by ID.
+
+        Args:
+            texts (dict[str, Document]): Documents keyed by docstore ID.
+        """
+        overlapping = set(texts).intersection(self._rows)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+        for document_id, document in texts.items():
+            row = len(self._ids)
+            encoded = document.page_content.encode("utf-8")
+            self._ids.append(document_id)
+            self._rows[document_id] = row
+            self._offsets.append(len(self._text))
+            self._lengths.append(len(encoded))
+            self._text += encoded
+            for key, value in document.metadata.items():
+                if value is None or isinstance(value, str):
+                    column = self._columns.get(key)
+                    if column is None:
+                        column = self._columns[key] = _StringColumn()
+                    # Rows added before this key appeared have no value
+                    while len(column.rows) < row:
+                        column.rows.append(MISSING)
+                    column.append(value, document_id)
+                else:
+                    self._other.setdefault(row, {})[key] = value
+
+    def delete(self, ids):
+        """
+        Remove IDs from the store; their bytes stay in the buffer until it is rebuilt.
+        """
+        overlapping = set(ids).intersection(self._rows)
+        if not overlapping:
+            raise ValueError(f"Tried to delete ids that does not  exist: {ids}")
+        for document_id in ids:
+            self._rows.pop(document_id, None)
+
+    def search(self, search):
+        """
+        Materialize the document stored under an ID, or return an error message like `InMemoryDocstore`.
+        """
+        row = self._rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        offset = self._offsets[row]
+        text = self._text[offset:offset + self._lengths[row]].decode("utf-8")
+        metadata = {key: column.get(row, search) for key, column in self._columns.items() if column.has(row)}
+        if row in self._other:
+            metadata.update(self._other[row])
+        return LangChainDocument(id=search, page_content=text, metadata=metadata)
+
+    def stats(self):
+        return {
+            "documents": len(self._rows),
+            "text_bytes": len(self._text),
+            "interned_values": {key: len(column.values) for key, column in self._columns.items()},
+        }
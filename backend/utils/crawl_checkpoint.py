@@ -0,0 +1,182 @@
+import os
+import json
+import logging
+
+from config import Config
+
+
+class CrawlCheckpoint:
+    """
+    Durable storage for an in-progress crawl.
+
+    Every scraped page is appended to a JSON Lines file as soon as it completes, and the
+    frontier and visited set are written atomically to a state file every
+    `Config.Scraper.CHECKPOINT_EVERY` pages. Pages therefore never accumulate in memory,
+    and a crawl that dies midway resumes from the last state instead of starting over.
+    """
+
+    def __init__(self, pages_path, state_path, every=None):
+        self.pages_path = pages_path
+        self.state_path = state_path
+        self.every = every or Config.Scraper.CHECKPOINT_EVERY
+        self.page_count = 0
+        self._pages_file = None
+        self._since_save = 0
+
+    @classmethod
+    def for_brand(cls, brand_name):
+        return cls(
+            Config.Paths.SCRAPED_PAGES_TEMPLATE.format(brand_name=brand_name),
+            Config.Paths.CRAWL_STATE_TEMPLATE.format(brand_name=brand_name),
+        )
+
+    def staging(self):
+        """
+        A checkpoint beside this one, for a crawl that must not touch this one until it is kept.
+        """
+        return CrawlCheckpoint(self.pages_path + ".new", self.state_path + ".new", self.every)
+
+    def replace_with(self, staged):
+        """
+        Take over the pages and state of a finished staged crawl, replacing this crawl's files.
+        """
+        self.close()
+        staged.close()
+        os.replace(staged.pages_path, self.pages_path)
+        # The state marks the crawl complete, so it is moved last
+        os.replace(staged.state_path, self.state_path)
+
+    def load_state(self):
+        """
+        Load the last saved crawl state.
+
+        Returns:
+            dict | None: Saved state with `frontier`, `visited`, `pages` and `complete`, or None.
+        """
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    @property
+    def complete(self):
+        state = self.load_state()
+        return bool(state and state.get("complete"))
+
+    @property
+    def has_pages(self):
+        return os.path.exists(self.pages_path) and os.path.getsize(self.pages_path) > 0
+
+    def _repair_pages_file(self):
+        """
+        Drop a partially written trailing line left by a crash and count the stored pages.
+        """
+        if not os.path.exists(self.pages_path):
+            return 0
+        count = 0
+        good_offset = 0
+        with open(self.pages_path, "rb") as file:
+            for line in file:
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                good_offset += len(line)
+                count += 1
+        if good_offset != os.path.getsize(self.pages_path):
+            logging.warning(f"Truncating partial record at end of {self.pages_path}")
+            with open(self.pages_path, "r+b") as file:
+                file.truncate(good_offset)
+        return count
+
+    def resume(self):
+        """
+        Open the checkpoint for writing and return the state to resume from.
+
+        Pages stored after the last state save are returned as `pending_pages` so the caller
+        can re-queue their links, which were not yet part of the saved frontier.
+
+        Returns:
+            dict | None: State to resume from, or None when starting a fresh crawl.
+        """
+        self.page_count = self._repair_pages_file()
+        state = self.load_state()
+        os.makedirs(os.path.dirname(self.pages_path) or ".", exist_ok=True)
+        self._pages_file = open(self.pages_path, "a", encoding="utf-8")
+        if state is None:
+            if self.page_count:
+                # Pages without a state file cannot be resumed reliably; start over
+                self._pages_file.truncate(0)
+                self.page_count = 0
+            return None
+
+        saved_pages = state.get("pages", 0)
+        state["pending_pages"] = list(self.iter_pages(start=saved_pages)) if self.page_count > saved_pages else []
+        logging.info(
+            f"Resuming crawl from {self.state_path}: {self.page_count} pages stored, "
+            f"{len(state['frontier'])} URLs in frontier"
+        )
+        return state
+
+    def append_page(self, data):
+        """
+        Append one scraped page to the pages file and flush it.
+        """
+        self._pages_file.write(json.dumps(data, ensure_ascii=False) + "\n")
+        self._pages_file.flush()
+        self.page_count += 1
+        self._since_save += 1
+
+    def maybe_save(self, frontier, visited):
+        if self._since_save >= self.every:
+            self.save_state(frontier, visited)
+
+    def save_state(self, frontier, visited, complete=False):
+        """
+        Atomically persist the frontier and visited set, after making stored pages durable.
+        """
+        if self._pages_file is not None:
+            self._pages_file.flush()
+            os.fsync(self._pages_file.fileno())
+        state = {
+            "frontier": [list(item) for item in frontier],
+            "visited": sorted(visited),
+            "pages": self.page_count,
+            "complete": complete,
+        }
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.state_path)
+        self._since_save = 0
+
+    def close(self):
+        if self._pages_file is not None:
+            self._pages_file.close()
+            self._pages_file = None
+
+    def iter_pages(self, start=0):
+        """
+        Stream stored page records without loading the whole crawl into memory.
+        """
+        if not os.path.exists(self.pages_path):
+            return
+        with open(self.pages_path, "r", encoding="utf-8") as file:
+            for index, line in enumerate(file):
+                if index < start:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+
+    def reset(self):
+        """
+        Remove stored pages and state so the next crawl starts from scratch.
+        """
+        self.close()
+        for path in (self.pages_path, self.state_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,180 @@
+import re
+import time
+import logging
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from config import Config
+
+# Hosts of analytics, advertising and session-replay services we never need to render a page's text
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "optimizely.com",
+    "newrelic.com",
+    "nr-data.net",
+    "adobedtm.com",
+    "demdex.net",
+    "omtrdc.net",
+    "everesttech.net",
+    "snap.licdn.com",
+    "ads.linkedin.com",
+    "analytics.tiktok.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "fullstory.com",
+    "mouseflow.com",
+    "crazyegg.com",
+    "tealiumiq.com",
+    "tiqcdn.com",
+    "qualtrics.com",
+)
+
+NOSCRIPT_JS_REQUIRED = re.compile(r"<noscript[^>]*>[^<]*(enable|turn on|requires?)[^<]*javascript", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class CrawlProfile:
+    """
+    How pages are fetched during a crawl.
+
+    Attributes:
+        name: Profile name as used in `Config.Scraper.PROFILE`.
+        blocked_resource_types: Playwright resource types aborted before they hit the network.
+        block_trackers: Whether requests to `TRACKER_DOMAINS` are aborted.
+        viewport: Browser viewport for rendered pages.
+        http_first: Fetch pages with plain HTTP and only render them in the browser when needed.
+    """
+    name: str
+    blocked_resource_types: frozenset = frozenset()
+    block_trackers: bool = False
+    viewport: dict = field(default_factory=lambda: {"width": 1920, "height": 1080})
+    http_first: bool = False
+
+
+PROFILES = {
+    "full": CrawlProfile(name="full"),
+    "light": CrawlProfile(
+        name="light",
+        blocked_resource_types=frozenset({"image", "media", "font", "stylesheet"}),
+        block_trackers=True,
+        viewport={"width": 1280, "height": 720},
+    ),
+    "fast": CrawlProfile(
+        name="fast",
+        blocked_resource_types=frozenset({"image", "media", "font", "stylesheet"}),
+        block_trackers=True,
+        viewport={"width": 1280, "height": 720},
+        http_first=True,
+    ),
+}
+
+
+def get_profile(name=None):
+    """
+    Return the crawl profile with the given name, defaulting to `Config.Scraper.PROFILE`.
+    """
+    name = name or Config.Scraper.PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown crawl profile: {name}. Expected one of {sorted(PROFILES)}")
+    return PROFILES[name]
+
+
+def is_tracker(url):
+    """
+    Check whether a URL points to a known tracking or advertising host.
+    """
+    host = urlparse(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS)
+
+
+def needs_javascript(page_source, extracted):
+    """
+    Decide whether a statically fetched page must be rendered in the browser.
+
+    Args:
+        page_source (str): Raw HTML returned by the HTTP fetch.
+        extracted (dict): Output of `extract_page` for that HTML.
+
+    Returns:
+        bool: True when the static HTML does not carry the page's readable content.
+    """
+    if NOSCRIPT_JS_REQUIRED.search(page_source):
+        return True
+    return len(extracted.get("structured_text", "")) < Config.Scraper.MIN_STATIC_TEXT_CHARS
+
+
+class CrawlStats:
+    """
+    Counters for a single crawl, reported per profile when the crawl ends.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.started = time.perf_counter()
+        self.pages_http = 0
+        self.pages_browser = 0
+        self.browser_fallbacks = 0
+        self.blocked_requests = 0
+
+    @property
+    def pages(self):
+        return self.pages_http + self.pages_browser
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def pages_per_second(self):
+        elapsed = self.elapsed
+        return self.pages / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "profile": self.profile.name,
+            "pages": self.pages,
+            "pages_http": self.pages_http,
+            "pages_browser": self.pages_browser,
+            "browser_fallbacks": self.browser_fallbacks,
+            "blocked_requests": self.blocked_requests,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "pages_per_second": round(self.pages_per_second, 3),
+        }
+
+    def log(self):
+        logging.info(
+            f"Crawl finished with profile '{self.profile.name}': {self.pages} pages in {self.elapsed:.1f}s "
+            f"({self.pages_per_second:.2f} pages/sec; http={self.pages_http}, browser={self.pages_browser}, "
+            f"fallbacks={self.browser_fallbacks}, blocked requests={self.blocked_requests})"
+        )
+
+
+async def install_resource_blocking(context, profile, stats=None):
+    """
+    Abort requests for blocked resource types and tracker hosts on every page of a browser context.
+    """
+    if not profile.blocked_resource_types and not profile.block_trackers:
+        return
+
+    async def handle_route(route):
+        request = route.request
+        if request.resource_type in profile.blocked_resource_types or (
+            profile.block_trackers and is_tracker(request.url)
+        ):
+            if stats is not None:
+                stats.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", handle_route)
@@ -1,10 +1,15 @@
 import os
+import time
+import random
 import logging
 from config import Config
-from langchain.prompts import load_prompt
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_openai import ChatOpenAI
+from functools import lru_cache
 from dotenv import load_dotenv
+from utils.single_flight import SingleFlight
+from utils.model_router import ModelRouter, estimate_tokens, usage_of
+from utils.cancellation import check_deadline, request_deadline, within_deadline
+from utils.usage import usage_tracker
+from utils.structured_output import STRUCTURED_FORMAT_INSTRUCTIONS, repair_structured_output, structured_output_method
 from models.output_models import (
     BrandVisibilityResponse,
     BrandComparisonResponse,
@@ -18,14 +23,13 @@ from models.output_models import (
     SelfRepresentationResponse, 
     GPTPerceptionResponse, 
     SelfVsGPTResponse,
-    BrandRankingResponse
+    BrandRankingResponse,
+    BrandDifferentiatorsResponse,
 )
 
 # Load environment variables
 load_dotenv()
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("chains")
 
 # Load OpenAI API key from .env file
@@ -33,131 +37,396 @@ os.environ["OPENAI_API_KEY"] = Config.OpenAI.API_KEY
 model_name = Config.OpenAI.MODEL_NAME
 temperature = Config.OpenAI.TEMPERATURE
 
+# Shared by all chains so concurrent identical requests make a single LLM call
+chain_coalescer = SingleFlight()
+
+# Shared by all chains: fast-tier routing of small inputs and per-route latency, token and cost stats
+model_router = ModelRouter(
+    fast_model=Config.ModelRouting.FAST_MODEL,
+    fast_chains=Config.ModelRouting.FAST_CHAINS,
+    max_fast_tokens=Config.ModelRouting.FAST_MAX_INPUT_TOKENS,
+    prices=Config.ModelRouting.PRICES,
+    enabled=Config.ModelRouting.ENABLED,
+    latency_window=Config.ModelRouting.LATENCY_WINDOW,
+)
+
+class LogPreview:
+    """
+    Defers rendering a value for the log until a record is actually emitted, capped at `max_chars`.
+    """
+    __slots__ = ("value", "max_chars")
+
+    def __init__(self, value, max_chars=None):
+        self.value = value
+        self.max_chars = max_chars or Config.Logging.CHAIN_IO_MAX_CHARS
+
+    def __str__(self):
+        text = str(self.value)
+        if len(text) <= self.max_chars:
+            return text
+        return f"{text[:self.max_chars]}... [{len(text)} chars]"
+
+
+def sample_chain_io():
+    """
+    Whether to log the input and output of this chain call, per `Config.Logging.CHAIN_IO_SAMPLE_RATE`.
+    """
+    return logger.isEnabledFor(logging.INFO) and random.random() < Config.Logging.CHAIN_IO_SAMPLE_RATE
+
+
+@lru_cache(maxsize=None)
+def load_prompt_file(path):
+    """
+    Load a prompt file once; chains and benchmarks defined over the same file share the prompt.
+    """
+    from langchain.prompts import load_prompt
+
+    return load_prompt(path)
+
+
+def chat_model(model, temperature):
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(temperature=temperature, model=model, verbose=True)
+
+
 class custom_chat_chain:
-    def __init__(self, pydantic_object, prompt):
+    """
+    An LLM call returning a response model.
+
+    Only the chain's spec is kept at construction; the prompt file, output parser and client are
+    loaded on first use (or by `build()`), so defining all chains costs nothing at import.
+    """
+
+    # Attributes set by `build()`
+    _BUILT_ATTRIBUTES = ("prompt", "parser", "model", "chain", "output_mode", "_template_tokens")
+
+    def __init__(self, pydantic_object, prompt, name=None, output_mode=None):
+        self.name = name or pydantic_object.__name__
+        self.pydantic_object = pydantic_object
+        # A prompt object, or the path of its prompt file
+        self.prompt_source = prompt
+        self.model_name = Config.ModelRouting.CHAIN_MODELS.get(self.name, model_name)
+        self.temperature = Config.ModelRouting.CHAIN_TEMPERATURES.get(self.name, temperature)
+        self._output_mode = output_mode
+        # Chains of the other models the router sends this chain to, built on first use
+        self._routed_chains = {}
+
+    def __getattr__(self, attribute):
+        # Only reached for attributes not set yet
+        if attribute in custom_chat_chain._BUILT_ATTRIBUTES:
+            self.build()
+            return self.__dict__[attribute]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {attribute!r}")
+
+    def build(self):
+        """
+        Load the prompt and construct the parser, client and chain. Errors propagate to the first call.
+        """
+        from langchain_core.output_parsers import JsonOutputParser
+
         try:
-            self.prompt = prompt
-            self.pydantic_object = pydantic_object
-            self.parser = JsonOutputParser(pydantic_object=pydantic_object)
-            self.model = ChatOpenAI(
-                temperature=temperature,
-                model=model_name,
-                verbose=True
-            )
-            self.chain = self.prompt | self.model.bind() | self.parser
-            logger.info(f"CustomChatChain initialized successfully with {model_name}.")
+            prompt = self.prompt_source
+            if isinstance(prompt, str):
+                prompt = load_prompt_file(prompt)
+            self.output_mode = structured_output_method(self.pydantic_object, self._output_mode or Config.OpenAI.OUTPUT_MODE)
+            self.parser = JsonOutputParser(pydantic_object=self.pydantic_object)
+            # Format instructions only depend on the output model, so they are rendered into the prompt once
+            if self.output_mode == "prompt":
+                format_instructions = self.parser.get_format_instructions()
+            else:
+                format_instructions = STRUCTURED_FORMAT_INSTRUCTIONS
+            self.prompt = prompt.partial(format_instructions=format_instructions)
+            # Template size is counted once; only the inputs are estimated per call
+            self._template_tokens = estimate_tokens(getattr(prompt, "template", ""))
+            self.model = chat_model(self.model_name, self.temperature)
+            self.chain = self._build_chain(self.model)
+            logger.info(f"CustomChatChain {self.name} initialized successfully with {self.model_name} ({self.output_mode}).")
         except Exception as e:
-            logger.error(f"Error initializing CustomChatChain: {e}")
+            logger.error(f"Error initializing CustomChatChain {self.name}: {e}")
+            raise
+        return self
+
+    def _build_chain(self, model):
+        if self.output_mode == "prompt":
+            # Schema described in the prompt and parsed from free-form text
+            return self.prompt | model
+        # Schema bound once as a native response format / tool; the raw message is kept for repair
+        return self.prompt | model.with_structured_output(
+            self.pydantic_object, method=self.output_mode, include_raw=True
+        )
+
+    def _chain_for(self, model):
+        if model == self.model_name:
+            return self.chain
+        if model not in self._routed_chains:
+            self._routed_chains[model] = self._build_chain(chat_model(model, self.temperature))
+        return self._routed_chains[model]
+
+    def _route(self, kwargs):
+        """
+        (model, attempts) pairs for a call: a fast-tier model gets one attempt, after which the
+        call escalates to the chain's model with the usual parse retries.
+        """
+        models = model_router.models_for(self.name, self.model_name, self._template_tokens + estimate_tokens(*kwargs.values()))
+        return [(model, 1) for model in models[:-1]] + [(models[-1], Config.OpenAI.MAX_PARSE_RETRIES + 1)]
+
+    def _record(self, model, started, output, response, kwargs):
+        latency = time.perf_counter() - started
+        usage = usage_of(output)
+        model_router.record(self.name, model, latency, usage, usable=response is not None)
+        usage_tracker.record_chat(model, latency, usage, chain=self.name, brand=kwargs.get("brand_name"))
+        if response is None and model != self.model_name:
+            model_router.record_escalation(self.name, model)
+            logger.warning(f"Chain {self.name} escalating from {model} to {self.model_name} after unusable output.")
+
+    def _record_error(self, model, started, error, kwargs):
+        """
+        Record a failed call (rate limit, unavailable model, timeout). A fast-tier route escalates to
+        the chain's model; a failure of the chain's model ends the call.
+        """
+        latency = time.perf_counter() - started
+        model_router.record_error(self.name, model, latency)
+        usage_tracker.record_chat(model, latency, {}, chain=self.name, brand=kwargs.get("brand_name"))
+        if model == self.model_name:
+            return
+        model_router.record_escalation(self.name, model)
+        logger.warning(f"Chain {self.name} escalating from {model} to {self.model_name} after error: {error}")
+
+    def _to_response(self, output):
+        """
+        Turn the chain output into the response model, repairing malformed JSON locally.
+
+        Returns None when the output cannot be recovered, in which case the call is retried.
+        """
+        if isinstance(output, dict):
+            if output.get("parsed") is not None:
+                return output["parsed"]
+            message = output["raw"]
+            logger.warning(f"Structured output of chain {self.name} failed to parse: {output.get('parsing_error')}")
+        else:
+            message = output
+        response = repair_structured_output(message, self.pydantic_object)
+        if response is not None and isinstance(output, dict):
+            logger.info(f"Repaired structured output of chain {self.name} locally.")
+        return response
+
+    def _calls(self, kwargs):
+        """
+        Route one call: a generator yielding the chain of each attempt, to be sent the attempt's output
+        or thrown its error, and returning the response (None when every attempt was unusable).
+
+        `invoke` and `_ainvoke` drive it, so sync and async calls route, retry and record alike.
+        """
+        log_io = sample_chain_io()
+        if log_io:
+            logger.info("Invoking chain %s with input: %s", self.name, LogPreview(kwargs))
+        for model, attempts in self._route(kwargs):
+            chain = self._chain_for(model)
+            for attempt in range(attempts):
+                started = time.perf_counter()
+                try:
+                    output = yield chain
+                except Exception as e:
+                    self._record_error(model, started, e, kwargs)
+                    if model == self.model_name:
+                        raise
+                    break
+                response = self._to_response(output)
+                self._record(model, started, output, response, kwargs)
+                if response is not None:
+                    if log_io:
+                        logger.info("Chain %s output: %s", self.name, LogPreview(response))
+                    return response
+                logger.warning(f"Chain {self.name} returned unusable output from {model} (attempt {attempt + 1}).")
+        return None
 
     def invoke(self, **kwargs):
         """
-        Invoke the chain and log input/output.
+        Invoke the chain, logging a sample of inputs and outputs.
         """
         try:
-            # Generate format instructions dynamically
-            format_instructions = self.parser.get_format_instructions()
+            calls = self._calls(kwargs)
+            chain = next(calls)
+            while True:
+                check_deadline("llm")
+                try:
+                    output = chain.invoke(kwargs)
+                except Exception as e:
+                    chain = calls.throw(e)
+                else:
+                    chain = calls.send(output)
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            logger.error("Error invoking chain %s with input %s: %s", self.name, LogPreview(kwargs), e)
+            return None
 
-            # Inject format_instructions into kwargs
-            kwargs["format_instructions"] = format_instructions
-            
-            # Log the input to the chain
-            logger.info(f"Invoking chain with input: {kwargs}")
+    async def ainvoke(self, **kwargs):
+        """
+        Invoke the chain asynchronously. Concurrent calls with the same normalized input share one LLM call.
 
-            # Call the chain
-            response = self.chain.invoke(kwargs)
+        The caller's wait is bounded by its request deadline; DeadlineExceeded and cancellation propagate
+        to the caller. The shared call itself runs until its last caller has gone away.
+        """
+        return await within_deadline(chain_coalescer.do(self.name, kwargs, lambda: self._ainvoke_shared(kwargs)), "llm")
 
-            # Log the output of the chain
-            logger.info(f"Chain output: {response}")
-            
+    async def _ainvoke_shared(self, kwargs):
+        # Runs in the coalesced task's own copy of the context: the first caller's deadline must not
+        # cut the call short for the callers that joined it
+        request_deadline.set(None)
+        return await self._ainvoke(kwargs)
 
-            return self.pydantic_object(**response)
+    async def _ainvoke(self, kwargs):
+        try:
+            calls = self._calls(kwargs)
+            chain = next(calls)
+            while True:
+                try:
+                    output = await within_deadline(chain.ainvoke(kwargs), "llm")
+                except Exception as e:
+                    # Deadline and request cancellations are not Exceptions and end the call
+                    chain = calls.throw(e)
+                else:
+                    chain = calls.send(output)
+        except StopIteration as done:
+            return done.value
         except Exception as e:
-            logger.error(f"Error invoking chain with input {kwargs}: {e}")
+            logger.error("Error invoking chain %s with input %s: %s", self.name, LogPreview(kwargs), e)
             return None
 
 
-# Loading prompt files using file paths from the configuration class
-visibility_prompt = load_prompt(Config.Paths.VISIBILITY_ANALYSIS)
-comparison_prompt = load_prompt(Config.Paths.COMPARISON_ANALYSIS)
-trend_prompt = load_prompt(Config.Paths.TREND_ANALYSIS)
-emerging_competitors_prompt = load_prompt(Config.Paths.EMERGING_COMPETITORS)
-crisis_analysis_prompt = load_prompt(Config.Paths.CRISIS_ANALYSIS)
-audience_segmentation_prompt = load_prompt(Config.Paths.AUDIENCE_SEGMENTATION)
-competitive_benchmarking_prompt = load_prompt(Config.Paths.COMPETITIVE_BENCHMARKING)
-brand_health_score_prompt = load_prompt(Config.Paths.BRAND_HEALTH_SCORE)
-regional_trends_prompt = load_prompt(Config.Paths.REGIONAL_TRENDS)
-self_representation_prompt = load_prompt(Config.Paths.SELF_REPRESENTATION)
-gpt_perception_prompt = load_prompt(Config.Paths.GPT_PERCEPTION)
-self_vs_gpt_comparison_prompt = load_prompt(Config.Paths.SELF_VS_GPT_COMPARISON)
-brand_ranking_prompt = load_prompt(Config.Paths.Brand_Ranking)
+# Prompt files by the module attribute they are loaded under on first access
+PROMPT_FILES = {
+    "visibility_prompt": Config.Paths.VISIBILITY_ANALYSIS,
+    "comparison_prompt": Config.Paths.COMPARISON_ANALYSIS,
+    "trend_prompt": Config.Paths.TREND_ANALYSIS,
+    "emerging_competitors_prompt": Config.Paths.EMERGING_COMPETITORS,
+    "crisis_analysis_prompt": Config.Paths.CRISIS_ANALYSIS,
+    "audience_segmentation_prompt": Config.Paths.AUDIENCE_SEGMENTATION,
+    "competitive_benchmarking_prompt": Config.Paths.COMPETITIVE_BENCHMARKING,
+    "brand_health_score_prompt": Config.Paths.BRAND_HEALTH_SCORE,
+    "regional_trends_prompt": Config.Paths.REGIONAL_TRENDS,
+    "self_representation_prompt": Config.Paths.SELF_REPRESENTATION,
+    "gpt_perception_prompt": Config.Paths.GPT_PERCEPTION,
+    "self_vs_gpt_comparison_prompt": Config.Paths.SELF_VS_GPT_COMPARISON,
+    "brand_ranking_prompt": Config.Paths.Brand_Ranking,
+    "brand_differentiators_prompt": Config.Paths.BRAND_DIFFERENTIATORS,
+}
+
+
+def __getattr__(name):
+    if name in PROMPT_FILES:
+        return load_prompt_file(PROMPT_FILES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Chains for various functionalities
 # Define chains
 visibility_chain = custom_chat_chain(
     pydantic_object=BrandVisibilityResponse,
-    prompt=visibility_prompt
+    prompt=PROMPT_FILES["visibility_prompt"],
+    name="visibility"
 )
 
 comparison_chain = custom_chat_chain(
     pydantic_object=BrandComparisonResponse,
-    prompt=comparison_prompt
+    prompt=PROMPT_FILES["comparison_prompt"],
+    name="comparison"
 )
 
 trend_chain = custom_chat_chain(
     pydantic_object=BrandTrendsResponse,
-    prompt=trend_prompt
+    prompt=PROMPT_FILES["trend_prompt"],
+    name="trends"
 )
 
 
 emerging_competitors_chain = custom_chat_chain(
     pydantic_object=EmergingCompetitorsResponse,
-    prompt=emerging_competitors_prompt
+    prompt=PROMPT_FILES["emerging_competitors_prompt"],
+    name="emerging_competitors"
 )
 
 crisis_analysis_chain = custom_chat_chain(
     pydantic_object=CrisisAnalysisResponse,
-    prompt=crisis_analysis_prompt
+    prompt=PROMPT_FILES["crisis_analysis_prompt"],
+    name="crisis_analysis"
 )
 
 audience_segmentation_chain = custom_chat_chain(
     pydantic_object=AudienceSegmentationResponse,
-    prompt=audience_segmentation_prompt
+    prompt=PROMPT_FILES["audience_segmentation_prompt"],
+    name="audience_segmentation"
 )
 
 
 competitive_benchmarking_chain = custom_chat_chain(
     pydantic_object=CompetitiveBenchmarkingResponse,
-    prompt=competitive_benchmarking_prompt
+    prompt=PROMPT_FILES["competitive_benchmarking_prompt"],
+    name="competitive_benchmarking"
 )
 
 brand_health_score_chain = custom_chat_chain(
     pydantic_object=BrandHealthScoreResponse,
-    prompt=brand_health_score_prompt
+    prompt=PROMPT_FILES["brand_health_score_prompt"],
+    name="health_score"
 )
 
 regional_trends_chain = custom_chat_chain(
     pydantic_object=RegionalTrendsResponse,
-    prompt=regional_trends_prompt
+    prompt=PROMPT_FILES["regional_trends_prompt"],
+    name="regional_trends"
 )
 
 
 self_representation_chain = custom_chat_chain(
     pydantic_object=SelfRepresentationResponse,
-    prompt=self_representation_prompt
+    prompt=PROMPT_FILES["self_representation_prompt"],
+    name="self_representation"
 )
 
 gpt_perception_chain = custom_chat_chain(
     pydantic_object=GPTPerceptionResponse,
-    prompt=gpt_perception_prompt
+    prompt=PROMPT_FILES["gpt_perception_prompt"],
+    name="gpt_perception"
 )
 
 self_vs_gpt_comparison_chain = custom_chat_chain(
     pydantic_object=SelfVsGPTResponse,
-    prompt=self_vs_gpt_comparison_prompt
+    prompt=PROMPT_FILES["self_vs_gpt_comparison_prompt"],
+    name="self_vs_gpt"
 )
 
 brand_ranking_chain = custom_chat_chain(
     pydantic_object=BrandRankingResponse,
-    prompt=brand_ranking_prompt
-)
\ No newline at end of file
+    prompt=PROMPT_FILES["brand_ranking_prompt"],
+    name="rankings"
+)
+
+brand_differentiators_chain = custom_chat_chain(
+    pydantic_object=BrandDifferentiatorsResponse,
+    prompt=PROMPT_FILES["brand_differentiators_prompt"],
+    name="brand_differentiators"
+)
+
+# All chains by name, for code that warms or inspects them without naming each one
+chain_registry = {
+    chain.name: chain
+    for chain in (
+        visibility_chain,
+        comparison_chain,
+        trend_chain,
+        emerging_competitors_chain,
+        crisis_analysis_chain,
+        audience_segmentation_chain,
+        competitive_benchmarking_chain,
+        brand_health_score_chain,
+        regional_trends_chain,
+        self_representation_chain,
+        gpt_perception_chain,
+        self_vs_gpt_comparison_chain,
+        brand_ranking_chain,
+        brand_differentiators_chain,
+    )
+}
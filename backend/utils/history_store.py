@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# Analyses whose results are recorded, by chain name
+HISTORY_ANALYSES = ("trends", "crisis_analysis", "health_score", "regional_trends")
+
+
+def diff_values(previous, current):
+    """
+    Describe how a response value changed between two records.
+
+    Numbers report their change, lists of strings the items added and removed, lists of objects
+    with a "topic" key are compared per topic and nested objects field by field. Unchanged values
+    are left out, so an empty result means nothing changed.
+    """
+    if isinstance(previous, (int, float)) and isinstance(current, (int, float)):
+        if previous == current:
+            return None
+        return {"previous": previous, "current": current, "change": current - previous}
+
+    if isinstance(previous, dict) and isinstance(current, dict):
+        changes = {}
+        for key in dict.fromkeys([*previous, *current]):
+            change = diff_values(previous.get(key), current.get(key))
+            if change is not None:
+                changes[key] = change
+        return changes or None
+
+    if isinstance(previous, list) and isinstance(current, list):
+        if all(isinstance(item, dict) and "topic" in item for item in previous + current):
+            return diff_values(
+                {item["topic"]: item for item in previous},
+                {item["topic"]: item for item in current},
+            )
+        previous_items = [json.dumps(item, sort_keys=True) if not isinstance(item, str) else item for item in previous]
+        current_items = [json.dumps(item, sort_keys=True) if not isinstance(item, str) else item for item in current]
+        added = [item for item in current_items if item not in previous_items]
+        removed = [item for item in previous_items if item not in current_items]
+        if not added and not removed:
+            return None
+        return {"added": added, "removed": removed}
+
+    if previous == current:
+        return None
+    return {"previous": previous, "current": current}
+
+
+class HistoryStore:
+    """
+    Append-only SQLite time series of analysis results, indexed by brand, analysis type and time.
+
+    Every computed result is recorded once; records are never updated, so windows and deltas can
+    be answered from storage alone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _connection(self):
+        # Opened on first use, so that creating the store (e.g. importing the app) touches no files
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    self._db = self._open()
+        return self._db
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                brand_name TEXT NOT NULL,
+                analysis_type TEXT NOT NULL,
+                time_period TEXT,
+                region TEXT,
+                recorded_at REAL NOT NULL,
+                response TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_lookup ON history (brand_name, analysis_type, recorded_at);
+            """
+        )
+        connection.commit()
+        return connection
+
+    def append(self, analysis_type, brand_name, response, time_period=None, region=None, recorded_at=None):
+        """
+        Record one result model.
+        """
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO history (brand_name, analysis_type, time_period, region, recorded_at, response) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (brand_name, analysis_type, time_period, region, recorded_at or time.time(), response.model_dump_json()),
+            )
+            self._connection.commit()
+
+    def window(self, analysis_type, brand_name, since=None, until=None, time_period=None, region=None, limit=100):
+        """
+        Records of a brand and analysis type recorded in [since, until], newest first.
+
+        Args:
+            since (float): Epoch seconds, inclusive lower bound.
+            until (float): Epoch seconds, inclusive upper bound.
+            time_period (str): Only records made for this time period.
+            region (str): Only records made for this region.
+
+        Returns:
+            list[dict]: Records with `recorded_at`, `time_period`, `region` and the parsed `response`.
+        """
+        query = "SELECT recorded_at, time_period, region, response FROM history WHERE brand_name = ? AND analysis_type = ?"
+        parameters = [brand_name, analysis_type]
+        for clause, value in (
+            ("recorded_at >= ?", since),
+            ("recorded_at <= ?", until),
+            ("time_period = ?", time_period),
+            ("region = ?", region),
+        ):
+            if value is not None:
+                query += f" AND {clause}"
+                parameters.append(value)
+        query += " ORDER BY recorded_at DESC, id DESC LIMIT ?"
+        parameters.append(limit)
+
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        return [
+            {"recorded_at": recorded_at, "time_period": period, "region": row_region, "response": json.loads(response)}
+            for recorded_at, period, row_region, response in rows
+        ]
+
+    def delta(self, analysis_type, brand_name, since=None, time_period=None, region=None):
+        """
+        Changes between the latest record and the one before it, or the oldest record since `since`.
+
+        Returns:
+            dict | None: `previous_recorded_at`, `current_recorded_at` and `changes`; None with fewer than two records.
+        """
+        if since is None:
+            records = self.window(analysis_type, brand_name, time_period=time_period, region=region, limit=2)
+            if len(records) < 2:
+                return None
+            current, previous = records
+        else:
+            records = self.window(analysis_type, brand_name, since=since, time_period=time_period, region=region, limit=-1)
+            if len(records) < 2:
+                return None
+            current, previous = records[0], records[-1]
+        return {
+            "previous_recorded_at": previous["recorded_at"],
+            "current_recorded_at": current["recorded_at"],
+            "changes": diff_values(previous["response"], current["response"]) or {},
+        }
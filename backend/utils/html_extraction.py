@@ -0,0 +1,132 @@
+import asyncio
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+from config import Config
+
+# Elements whose text never reaches the reader and must not leak into extracted content
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+_executor = None
+
+
+def normalize_text(text):
+    """
+    Normalize text by applying a series of preprocessing steps.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: Normalized text.
+    """
+    if not isinstance(text, str):
+        return text  # Return as is if not a string
+    text = unicodedata.normalize("NFKC", text)  # Unicode normalization
+    text = text.replace("\xa0", " ")  # Replace non-breaking spaces
+    text = text.lower()  # Convert to lowercase
+    text = " ".join(text.split())  # Remove extra whitespace
+    return text
+
+
+def extract_page(page_source, url):
+    """
+    Extract title, paragraphs, headings, links and structured text from a page in a single DOM walk.
+
+    Args:
+        page_source (str): Raw HTML of the page.
+        url (str): URL the page was loaded from, used to resolve relative links.
+
+    Returns:
+        dict: Extracted fields, ready to be merged into the scraped page record.
+    """
+    try:
+        document = lxml.html.document_fromstring(page_source)
+    except (etree.ParserError, ValueError):
+        return {"title": "No title", "content": "", "paragraphs": [], "headings": [], "links": [], "structured_text": ""}
+
+    title = "No title"
+    title_element = document.find(".//title")
+    if title_element is not None and title_element.text:
+        title = title_element.text
+
+    body = document.find("body")
+    if body is None:
+        body = document
+
+    paragraphs = []
+    headings = []
+    links = []
+    lines = []
+
+    # Iterative depth-first walk; each entry is (node, depth) or a pending tail string
+    stack = [(body, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, str):
+            text = node.strip()
+            if text:
+                lines.append("  " * depth + text)
+            continue
+        tag = node.tag if isinstance(node.tag, str) else None
+        if tag is None or tag in SKIPPED_TAGS:
+            continue
+
+        if tag == "p":
+            paragraphs.append(normalize_text(node.text_content()))
+        elif tag in HEADING_TAGS:
+            heading = " ".join(node.text_content().split())
+            if heading:
+                headings.append({"level": int(tag[1]), "text": heading})
+        elif tag == "a":
+            href = node.get("href")
+            if href:
+                links.append(urljoin(url, href.strip()))
+
+        if node.text:
+            text = node.text.strip()
+            if text:
+                lines.append("  " * depth + text)
+        for child in reversed(node):
+            # The tail belongs to the parent node, so it keeps the parent's depth
+            if child.tail:
+                stack.append((child.tail, depth))
+            stack.append((child, depth + 1))
+
+    return {
+        "title": title,
+        "content": " ".join(paragraphs),
+        "paragraphs": paragraphs,
+        "headings": headings,
+        "links": links,
+        "structured_text": "\n".join(lines) + ("\n" if lines else ""),
+    }
+
+
+def _get_executor():
+    """
+    Lazily create the shared executor used to keep HTML parsing off the event loop.
+    """
+    global _executor
+    if _executor is None:
+        if Config.Scraper.EXTRACTION_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=Config.Scraper.EXTRACTION_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=Config.Scraper.EXTRACTION_WORKERS,
+                thread_name_prefix="html-extraction",
+            )
+    return _executor
+
+
+async def extract_page_async(page_source, url):
+    """
+    Run `extract_page` in the extraction pool so the crawler's event loop is never blocked by parsing.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), extract_page, page_source, url)
@@ -1,23 +1,20 @@
 import logging
+import argparse
 from config import Config
 from utils.vstore import VectorStoreManager
+from utils.browser_pool import browser_pool_service
 
-def initialize_vector_store():
+def initialize_vector_store(manager=None, scrape=False):
     """
-    Initialize the Vector Store Manager by scraping websites and building indices for each brand.
-    """
-
-    # Set up logging using the configuration
-    logging.basicConfig(
-        level=getattr(logging, Config.Logging.LEVEL.upper(), logging.INFO),
-        format=Config.Logging.FORMAT,
-        handlers=[
-            logging.StreamHandler(),
-        ]
-    )
+    Build the indices of each configured brand into a Vector Store Manager.
 
+    Args:
+        manager (VectorStoreManager): Manager to fill; a new one by default.
+        scrape (bool): Crawl brands without saved scraped data. Off for the API, which only
+            loads saved data so that the scraper stack never enters its process.
+    """
     logging.info("Initializing Vector Store...")
-    manager = VectorStoreManager()
+    manager = manager if manager is not None else VectorStoreManager()
 
     # List of brand data with name and website URL
     brand_data = Config.VectorStore.BRAND_DATA
@@ -26,12 +23,54 @@ def initialize_vector_store():
     for brand in brand_data:
         logging.info(f"Processing brand: {brand['name']}")
         try:
-            manager.build_indices_for_brand(brand["url"], brand["name"])
+            manager.build_indices_for_brand(brand["url"], brand["name"], scrape=scrape)
             logging.info(f"Indices built for brand: {brand['name']}")
         except Exception as e:
             logging.error(f"Failed to process brand {brand['name']}: {e}")
             
     return manager
 
-# if __name__ == "__main__":
-#     initialize_vector_store()
+
+def main():
+    """
+    Scrape the configured brands that have no saved data, in a process of its own so that the API
+    never loads the scraper stack. The API builds indices from the saved data at startup.
+
+    Usage (from the backend directory):
+        python -m utils.init_vector_store [--brand Ally] [--refresh]
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--brand", action="append", help="only this brand; may be repeated")
+    parser.add_argument("--refresh", action="store_true", help="re-scrape brands even if saved data exists")
+    args = parser.parse_args()
+
+    # Set up logging using the configuration
+    logging.basicConfig(
+        level=getattr(logging, Config.Logging.LEVEL.upper(), logging.INFO),
+        format=Config.Logging.FORMAT,
+        handlers=[
+            logging.StreamHandler(),
+        ]
+    )
+
+    manager = VectorStoreManager()
+    for brand in Config.VectorStore.BRAND_DATA:
+        if args.brand is not None and brand["name"] not in args.brand:
+            continue
+        if not args.refresh and manager.load_scraped_data(brand["name"]):
+            logging.info(f"Saved data found for {brand['name']}. Skipping scraping.")
+            continue
+        try:
+            if args.refresh:
+                # A new crawl without pages keeps the saved data
+                manager.rescrape_brand(brand["url"], brand["name"])
+            else:
+                # Resumes an interrupted crawl; the finished checkpoint is the saved data
+                manager.scrape_website_sync(brand["url"], brand["name"])
+        except Exception as e:
+            logging.error(f"Failed to scrape brand {brand['name']}: {e}")
+    browser_pool_service.stop()
+
+
+if __name__ == "__main__":
+    main()
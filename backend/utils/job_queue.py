@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+TERMINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED, TIMED_OUT)
+
+
+class JobQueue:
+    """
+    SQLite-persisted job queue executed by a pool of asyncio worker tasks.
+
+    Each job type has a handler `async fn(payload) -> dict`, a concurrency limit and a timeout.
+    Jobs wait in one queue per type, and an idle worker takes the oldest job among the types that
+    are below their limit, so a backlog of one type never holds workers that other types could use.
+    Jobs survive restarts: jobs still queued or running when the process stopped are queued again
+    on `start()`. Status changes are persisted immediately and announced to `wait_for_change`
+    callers, which is what status streams block on.
+    """
+
+    def __init__(self, path, handlers, concurrency, timeouts, workers):
+        self.path = path
+        self.handlers = handlers
+        self.timeouts = timeouts
+        self.workers = workers
+        self._limits = {job_type: concurrency.get(job_type, 1) for job_type in handlers}
+        self._lock = threading.Lock()
+        self._queues = {job_type: deque() for job_type in handlers}  # (sequence, job ID) per type
+        self._sequence = 0
+        self._active = Counter()  # Jobs taken by workers per type
+        self._wakeup = None
+        self._worker_tasks = []
+        self._running = {}
+        self._changed = None
+        self._db = None
+        self._open_lock = threading.Lock()
+
+    @property
+    def _connection(self):
+        # Opened on first use, so that creating the queue (e.g. importing the app) touches no files
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    self._db = self._open()
+        return self._db
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+            """
+        )
+        connection.commit()
+        return connection
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{field} = ?" for field in fields)
+        with self._lock:
+            self._connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+            self._connection.commit()
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = asyncio.Event()
+
+    def get(self, job_id):
+        """
+        Current state of a job as a dict, or None if the ID is unknown.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, job_type, status, result, error, created_at, started_at, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, job_type, status, result, error, created_at, started_at, finished_at = row
+        return {
+            "job_id": job_id,
+            "job_type": job_type,
+            "status": status,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    async def start(self):
+        """
+        Start the workers and re-queue jobs left unfinished by a previous process.
+        """
+        self._wakeup = asyncio.Event()
+        self._changed = asyncio.Event()
+        with self._lock:
+            self._connection.execute("UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING))
+            self._connection.commit()
+            pending = self._connection.execute(
+                "SELECT id, job_type FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        for job_id, job_type in pending:
+            if job_type in self._queues:
+                self._enqueue(job_type, job_id)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logging.info(f"Job queue started with {self.workers} workers, {len(pending)} jobs re-queued")
+
+    async def stop(self):
+        for task in [*self._worker_tasks, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for queue in self._queues.values():
+            queue.clear()
+        self._active.clear()
+        self._wakeup = None
+
+    def submit(self, job_type, payload):
+        """
+        Persist a new job and queue it.
+
+        Returns:
+            str: The job ID.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO jobs (id, job_type, payload, status, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(payload), QUEUED, time.time()),
+            )
+            self._connection.commit()
+        if self._wakeup is not None:
+            self._enqueue(job_type, job_id)
+        return job_id
+
+    def _enqueue(self, job_type, job_id):
+        self._queues[job_type].append((self._sequence, job_id))
+        self._sequence += 1
+        self._notify_workers()
+
+    def _notify_workers(self):
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    def _take(self):
+        """
+        Dequeue the oldest job of a type below its concurrency limit, reserving a slot for it.
+        """
+        ready = [
+            (queue[0][0], job_type) for job_type, queue in self._queues.items()
+            if queue and self._active[job_type] < self._limits[job_type]
+        ]
+        if not ready:
+            return None
+        _, job_type = min(ready)
+        self._active[job_type] += 1
+        return job_type, self._queues[job_type].popleft()[1]
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job.
+
+        Returns:
+            bool: False if the job is unknown or already finished.
+        """
+        job = self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATUSES:
+            return False
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        self._update(job_id, status=CANCELLED, finished_at=time.time())
+        return True
+
+    async def wait_for_change(self, timeout):
+        """
+        Block until any job changes state or `timeout` seconds pass.
+        """
+        changed = self._changed or asyncio.Event()
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self):
+        while True:
+            wakeup = self._wakeup
+            job = self._take()
+            if job is None:
+                await wakeup.wait()
+                continue
+            job_type, job_id = job
+            try:
+                await self._execute(job_id)
+            except Exception as e:
+                logging.error(f"Job worker failed on {job_id}: {e}")
+            finally:
+                self._active[job_type] -= 1
+                self._notify_workers()
+
+    async def _execute(self, job_id):
+        with self._lock:
+            row = self._connection.execute("SELECT job_type, payload, status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row[2] != QUEUED:
+            return  # Cancelled while queued
+        job_type, payload, _ = row
+
+        self._update(job_id, status=RUNNING, started_at=time.time())
+        task = asyncio.create_task(self.handlers[job_type](json.loads(payload)))
+        self._running[job_id] = task
+        try:
+            result = await asyncio.wait_for(task, timeout=self.timeouts.get(job_type))
+            self._update(job_id, status=SUCCEEDED, result=json.dumps(result), finished_at=time.time())
+        except asyncio.TimeoutError:
+            logging.warning(f"Job {job_id} ({job_type}) timed out")
+            self._update(job_id, status=TIMED_OUT, error="Job exceeded its timeout", finished_at=time.time())
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise  # Shutting down: the job stays running and is re-queued on the next start
+            self._update(job_id, status=CANCELLED, finished_at=time.time())
+        except Exception as e:
+            logging.error(f"Job {job_id} ({job_type}) failed: {e}")
+            self._update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            self._running.pop(job_id, None)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": len(self._worker_tasks),
+            "running": len(self._running),
+            "queued_by_type": {job_type: len(queue) for job_type, queue in self._queues.items()},
+            "by_status": counts,
+        }
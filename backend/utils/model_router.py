@@ -0,0 +1,105 @@
+from collections import defaultdict, deque
+
+
+def estimate_tokens(*values):
+    """
+    Rough token count of prompt inputs (about four characters per token), cheap enough for every call.
+    """
+    return sum(len(str(value)) for value in values) // 4
+
+
+def usage_of(output):
+    """
+    Token usage reported with a chain output: the raw message of a structured output, or the message itself.
+    """
+    message = output.get("raw") if isinstance(output, dict) else output
+    return getattr(message, "usage_metadata", None) or {}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[int(fraction * (len(ordered) - 1))] if ordered else None
+
+
+class ModelRouter:
+    """
+    Picks the models a chain call tries, and keeps latency, token and cost statistics per route.
+
+    A route is a (chain, model) pair. Calls of `fast_chains` whose estimated input is at most
+    `max_fast_tokens` try `fast_model` once before escalating to the chain's own model; all other
+    calls go straight to the chain's model.
+    """
+
+    def __init__(self, fast_model, fast_chains, max_fast_tokens, prices, enabled=True, latency_window=500):
+        self.fast_model = fast_model
+        self.fast_chains = set(fast_chains)
+        self.max_fast_tokens = max_fast_tokens
+        self.prices = prices
+        self.enabled = enabled
+        self._latencies = defaultdict(lambda: deque(maxlen=latency_window))
+        self._stats = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "unusable_outputs": 0, "escalations": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0,
+        })
+
+    def models_for(self, chain_name, model, input_tokens):
+        """
+        Models to try for a call, in order.
+        """
+        if (
+            self.enabled
+            and chain_name in self.fast_chains
+            and input_tokens <= self.max_fast_tokens
+            and self.fast_model != model
+        ):
+            return [self.fast_model, model]
+        return [model]
+
+    def record(self, chain_name, model, latency, usage, usable):
+        """
+        Record one LLM call of a route.
+
+        Args:
+            latency (float): Seconds.
+            usage (dict): `usage_metadata` of the response message; may be empty.
+            usable (bool): Whether the output validated against the chain's response model.
+        """
+        stats = self._stats[(chain_name, model)]
+        stats["calls"] += 1
+        stats["unusable_outputs"] += not usable
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        stats["input_tokens"] += input_tokens
+        stats["output_tokens"] += output_tokens
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        stats["cost_usd"] += (input_tokens * input_price + output_tokens * output_price) / 1e6
+        self._latencies[(chain_name, model)].append(latency)
+
+    def record_error(self, chain_name, model, latency):
+        """
+        Record one LLM call of a route that raised instead of returning output.
+        """
+        stats = self._stats[(chain_name, model)]
+        stats["calls"] += 1
+        stats["errors"] += 1
+        self._latencies[(chain_name, model)].append(latency)
+
+    def record_escalation(self, chain_name, model):
+        self._stats[(chain_name, model)]["escalations"] += 1
+
+    def stats(self):
+        routes = {}
+        for (chain_name, model), stats in sorted(self._stats.items()):
+            latencies = self._latencies[(chain_name, model)]
+            routes[f"{chain_name}:{model}"] = {
+                **stats,
+                "cost_usd": round(stats["cost_usd"], 6),
+                "latency_p50_ms": round(percentile(latencies, 0.5) * 1000, 1) if latencies else None,
+                "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+            }
+        return {
+            "enabled": self.enabled,
+            "fast_model": self.fast_model,
+            "fast_max_input_tokens": self.max_fast_tokens,
+            "routes": routes,
+            "total_cost_usd": round(sum(stats["cost_usd"] for stats in self._stats.values()), 6),
+        }
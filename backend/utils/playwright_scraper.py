@@ -1,157 +1,209 @@
-import asyncio
 import logging
-from playwright.async_api import async_playwright, TimeoutError
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import json
+from collections import deque
+from playwright.async_api import TimeoutError
+import httpx
 
 from config import Config
+from utils.browser_pool import BrowserPool
+from utils.crawl_profiles import CrawlProfile, CrawlStats, get_profile, install_resource_blocking, needs_javascript
+from utils.html_extraction import extract_page_async
+from utils.url_scope import CrawlScope, is_html_content_type
 
-# Set up logging using the configuration
-logging.basicConfig(
-    level=getattr(logging, Config.Logging.LEVEL.upper(), logging.INFO),
-    format=Config.Logging.FORMAT,
-    handlers=[
-        logging.StreamHandler(),
-    ]
-)
-import unicodedata
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
 
 
-def normalize_text(text):
+def is_valid_url(url, scope):
     """
-    Normalize text by applying a series of preprocessing steps.
+    Check if a URL is valid and belongs to the crawl's scope.
 
     Args:
-        text (str): The text to normalize.
-
-    Returns:
-        str: Normalized text.
-    """
-    if not isinstance(text, str):
-        return text  # Return as is if not a string
-    text = unicodedata.normalize("NFKC", text)  # Unicode normalization
-    text = text.replace("\xa0", " ")  # Replace non-breaking spaces
-    text = text.lower()  # Convert to lowercase
-    text = " ".join(text.split())  # Remove extra whitespace
-    return text
-
-def is_valid_url(url, base_url):
+        scope (CrawlScope): Scope of the crawl, built once per crawl rather than per link.
     """
-    Check if a URL is valid and belongs to the same domain as the base URL.
-    """
-    parsed_url = urlparse(url)
-    parsed_base = urlparse(base_url)
-    return parsed_url.netloc == parsed_base.netloc and not parsed_url.fragment
+    return scope.in_scope(url)
 
 
 async def scrape_page(page, url):
     """
-    Scrape a single page for title, paragraphs, and structured text.
+    Scrape a single page for title, paragraphs, headings, links and structured text.
+
+    The rendered HTML is fetched once and parsed in a single pass off the event loop.
     """
     try:
         logging.info(f"Scraping: {url}")
-        await page.goto(url, wait_until="domcontentloaded")
+        response = await page.goto(url, wait_until="domcontentloaded")
+        if response is not None and not is_html_content_type(response.headers.get("content-type")):
+            logging.info(f"Skipping non-HTML response for {url}")
+            return None
         await page.wait_for_selector("body", timeout=10000)
         page_source = await page.content()
 
-        # Parse the page source with BeautifulSoup
-        soup = BeautifulSoup(page_source, "html.parser")
-        title = soup.title.string if soup.title else "No title"
-        paragraphs = [normalize_text(p.text) for p in soup.find_all("p")]
-        content = ' '.join(paragraphs)
-
-        # Extract structured text
-        structured_text = await page.evaluate("""
-            () => {
-                const traverse = (node, depth = 0) => {
-                    if (!node || !node.childNodes) return "";
-                    let result = "";
-                    for (let child of node.childNodes) {
-                        if (child.nodeType === Node.TEXT_NODE) {
-                            const text = child.textContent.trim();
-                            if (text) {
-                                result += "  ".repeat(depth) + text + "\\n";
-                            }
-                        } else if (child.nodeType === Node.ELEMENT_NODE) {
-                            result += traverse(child, depth + 1);
-                        }
-                    }
-                    return result;
-                };
-                return traverse(document.body);
-            }
-        """)
+        extracted = await extract_page_async(page_source, page.url or url)
 
         return {
             "url": url,
-            "title": title,
-            "content": content,
-            "paragraphs": paragraphs,
-            "structured_text": structured_text,
+            **extracted,
             "page_source": page_source,
         }
     except TimeoutError:
         logging.warning(f"Timeout occurred while loading {url}")
-        return {"url": url, "title": "Timeout", "content": "", "paragraphs": "", "page_source": ""}
+        return {"url": url, "title": "Timeout", "content": "", "paragraphs": "", "links": [], "page_source": ""}
     except Exception as e:
         logging.error(f"Error scraping {url}: {e}")
-        return {"url": url, "title": "Error", "content": "", "paragraphs": "", "page_source": ""}
+        return {"url": url, "title": "Error", "content": "", "paragraphs": "", "links": [], "page_source": ""}
 
 
-async def scrape_website_recursive(base_url, max_depth=2):
+async def fetch_static_page(client, url):
     """
-    Recursively scrape pages starting from the base URL using a shared browser context.
+    Fetch a page over plain HTTP and extract it without a browser.
+
+    Returns:
+        dict | None: The scraped page record, or None when the page needs JavaScript rendering
+        or could not be fetched statically.
     """
-    scraped_data = []
-    visited = set()
+    try:
+        response = await client.get(url)
+    except httpx.HTTPError as e:
+        logging.info(f"Static fetch failed for {url}, falling back to browser: {e}")
+        return None
+    if response.status_code != 200 or not is_html_content_type(response.headers.get("content-type")):
+        return None
+
+    page_source = response.text
+    extracted = await extract_page_async(page_source, str(response.url))
+    if needs_javascript(page_source, extracted):
+        return None
+
+    logging.info(f"Scraped (http): {url}")
+    return {
+        "url": url,
+        **extracted,
+        "page_source": page_source,
+    }
+
+
+async def scrape_website_recursive(
+    base_url, max_depth=2, profile=None, stats=None, scope=None, checkpoint=None, browser_pool=None, stop=None
+):
+    """
+    Crawl pages breadth-first starting from the base URL, rendering pages in a leased browser context.
 
-    async def scrape_recursive(url, depth, context):
-        if depth > max_depth or url in visited:
-            return
-        visited.add(url)
+    URLs are canonicalized and filtered by the crawl scope before they are queued, so each page
+    is fetched once. When robots.txt or sitemap support is enabled, the scope is loaded first and
+    sitemap URLs are seeded at depth 1.
 
-        page = await context.new_page()
-        data = await scrape_page(page, url)
-        if data:
-            scraped_data.append(data)
+    Args:
+        base_url (str): URL the crawl starts from.
+        max_depth (int): Maximum link depth followed from the base URL.
+        profile (CrawlProfile | str | None): Crawl profile, defaults to `Config.Scraper.PROFILE`.
+        stats (CrawlStats | None): Optional counters to fill in, e.g. for benchmarking profiles.
+        scope (CrawlScope | None): URL scope rules, defaults to the plain scope of the base URL.
+        checkpoint (CrawlCheckpoint | None): When given, pages are streamed to it instead of being
+            collected in memory, the frontier is persisted periodically and an interrupted crawl
+            resumes from its last saved state.
+        browser_pool (BrowserPool | None): Shared browser to render pages with, on the pool's event
+            loop. Without one, a browser is launched for this crawl and closed at its end.
+        stop (threading.Event | None): Checked between pages; once set, the crawl ends without being
+            marked complete, e.g. when the job that started it timed out.
 
+    Returns:
+        list | int: The scraped page records, or the number of stored pages when a checkpoint is used.
+    """
+    if not isinstance(profile, CrawlProfile):
+        profile = get_profile(profile)
+    if stats is None:
+        stats = CrawlStats(profile)
+    if scope is None:
+        scope = CrawlScope(base_url)
+    scraped_data = []
+    own_pool = browser_pool is None
+    if own_pool:
+        browser_pool = BrowserPool(pages_per_context=Config.Scraper.BROWSER_PAGES_PER_CONTEXT, max_contexts=1)
+    # The context is only opened, and the browser launched, once a page actually needs it
+    lease = browser_pool.lease(
+        context_options={"user_agent": USER_AGENT, "viewport": profile.viewport, "ignore_https_errors": True},
+        setup=lambda context: install_resource_blocking(context, profile, stats),
+    )
+
+    async def fetch(url):
+        if profile.http_first:
+            data = await fetch_static_page(client, url)
+            if data is not None:
+                stats.pages_http += 1
+                return data
+            stats.browser_fallbacks += 1
+
+        page = await lease.new_page()
         try:
-            links = await page.evaluate("""
-                () => Array.from(document.querySelectorAll('a[href]'))
-                          .map(a => a.href)
-            """)
-            for link in links:
-                full_url = urljoin(base_url, link)
-                if is_valid_url(full_url, base_url) and full_url not in visited:
-                    await scrape_recursive(full_url, depth + 1, context)
-        except Exception as e:
-            logging.error(f"Error extracting links on {url}: {e}")
-
-        await page.close()
-
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            ignore_https_errors=True,
-        )
-        await scrape_recursive(base_url, depth=0, context=context)
-        await context.close()
-        await browser.close()
-
+            data = await scrape_page(page, url)
+        finally:
+            await page.close()
+        stats.pages_browser += 1
+        return data
+
+    client = httpx.AsyncClient(
+        headers={"User-Agent": USER_AGENT},
+        timeout=Config.Scraper.HTTP_TIMEOUT,
+        follow_redirects=True,
+        verify=False,
+    )
+    try:
+        if Config.Scraper.RESPECT_ROBOTS:
+            await scope.load_robots(client)
+
+        def enqueue_links(data, url, depth):
+            if depth >= max_depth:
+                return
+            for link in data.get("links", []):
+                full_url = scope.canonicalize(link, url)
+                if full_url and full_url not in visited:
+                    visited.add(full_url)
+                    frontier.append((full_url, depth + 1))
+
+        state = checkpoint.resume() if checkpoint is not None else None
+        if state is not None:
+            # Pages stored after the last state save are still in the saved frontier and
+            # their links are not, so drop the former and queue the latter
+            fetched = {data["url"] for data in state["pending_pages"]}
+            frontier = deque(tuple(item) for item in state["frontier"] if item[0] not in fetched)
+            visited = set(state["visited"])
+            for data in state["pending_pages"]:
+                enqueue_links(data, data["url"], data.get("depth", max_depth))
+        else:
+            start_url = scope.canonicalize(base_url) or scope.base_url
+            frontier = deque([(start_url, 0)])
+            visited = {start_url}
+            if Config.Scraper.USE_SITEMAP and max_depth >= 1:
+                for url in await scope.sitemap_urls(client):
+                    if url not in visited:
+                        visited.add(url)
+                        frontier.append((url, 1))
+
+        while frontier:
+            if stop is not None and stop.is_set():
+                logging.info(f"Crawl of {base_url} stopped with {len(frontier)} URLs left")
+                break
+            url, depth = frontier.popleft()
+            data = await fetch(url)
+            if not data:
+                continue
+            enqueue_links(data, url, depth)
+            if checkpoint is not None:
+                checkpoint.append_page({**data, "depth": depth})
+                checkpoint.maybe_save(frontier, visited)
+            else:
+                scraped_data.append(data)
+
+        if checkpoint is not None:
+            checkpoint.save_state(frontier, visited, complete=not frontier)
+    finally:
+        if checkpoint is not None:
+            checkpoint.close()
+        await client.aclose()
+        await lease.close()
+        if own_pool:
+            await browser_pool.close()
+        stats.log()
+
+    if checkpoint is not None:
+        return checkpoint.page_count
     return scraped_data
-
-
-async def main():
-    url = "https://www.ally.com/"
-    data = await scrape_website_recursive(url, max_depth=2)
-    file_name = "scraped_data.json"
-    with open(file_name, "w", encoding="utf-8") as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
-    logging.info(f"Scraped data saved to {file_name}")
-
-
-# if __name__ == "__main__":
-#     asyncio.run(main())
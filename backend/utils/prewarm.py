@@ -0,0 +1,174 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+# Catalogue analyses and the request fields each one takes
+CATALOGUE_ANALYSES = {
+    "visibility": ("brand_name",),
+    "health_score": ("brand_name",),
+    "trends": ("brand_name", "time_period"),
+    "crisis_analysis": ("brand_name", "time_period"),
+    "audience_segmentation": ("brand_name", "time_period"),
+}
+
+
+def catalogue_jobs(chains, brands, time_periods):
+    """
+    Expand the catalogue into (chain, inputs) jobs for every brand and, where the analysis takes
+    one, every time period.
+
+    Args:
+        chains (dict[str, custom_chat_chain]): Chains by name; analyses without a chain are skipped.
+    """
+    jobs = []
+    for name, fields in CATALOGUE_ANALYSES.items():
+        chain = chains.get(name)
+        if chain is None:
+            continue
+        for brand in brands:
+            if "time_period" in fields:
+                jobs.extend((chain, {"brand_name": brand, "time_period": period}) for period in time_periods)
+            else:
+                jobs.append((chain, {"brand_name": brand}))
+    return jobs
+
+
+class PrewarmScheduler:
+    """
+    Background task recomputing catalogue analyses during an off-peak window.
+
+    Every `check_interval` seconds inside the window, results older than `refresh_after` seconds
+    are recomputed stalest first, at most `concurrency` at a time. Each window gets a budget of
+    `max_calls` computations and `max_seconds` of wall time; work left over waits for the next window.
+    """
+
+    def __init__(self, jobs, compute, store, window_start_hour, window_end_hour, max_calls, max_seconds,
+                 concurrency, refresh_after, check_interval):
+        self.jobs = jobs
+        self.compute = compute
+        self.store = store
+        self.window_start_hour = window_start_hour
+        self.window_end_hour = window_end_hour
+        self.max_calls = max_calls
+        self.max_seconds = max_seconds
+        self.concurrency = concurrency
+        self.refresh_after = refresh_after
+        self.check_interval = check_interval
+        self._task = None
+        self._window_key = None
+        self._window_calls = 0
+        self._window_seconds = 0.0
+        self.runs = 0
+        self.computed = 0
+        self.failed = 0
+        self.last_run_at = None
+
+    def in_window(self, now=None):
+        hour = (now or datetime.now()).hour
+        if self.window_start_hour <= self.window_end_hour:
+            return self.window_start_hour <= hour < self.window_end_hour
+        # Window spanning midnight, e.g. 22-5
+        return hour >= self.window_start_hour or hour < self.window_end_hour
+
+    def _current_window(self, now):
+        """
+        Date the current window started on; budgets are tracked per window.
+        """
+        return (now - timedelta(hours=self.window_start_hour)).date()
+
+    def stale_jobs(self):
+        """
+        Jobs whose stored result is missing or older than `refresh_after`, stalest first.
+        """
+        cutoff = time.time() - self.refresh_after
+        aged = [(self.store.computed_at(chain.name, inputs), chain, inputs) for chain, inputs in self.jobs]
+        stale = [job for job in aged if job[0] is None or job[0] < cutoff]
+        stale.sort(key=lambda job: job[0] or 0.0)
+        return [(chain, inputs) for _, chain, inputs in stale]
+
+    async def run_once(self, now=None):
+        """
+        Recompute stale jobs within the remaining budget of the current window.
+
+        Returns:
+            int: Number of results recomputed.
+        """
+        now = now or datetime.now()
+        window = self._current_window(now)
+        if window != self._window_key:
+            self._window_key, self._window_calls, self._window_seconds = window, 0, 0.0
+
+        calls_left = self.max_calls - self._window_calls
+        if calls_left <= 0 or self._window_seconds >= self.max_seconds:
+            return 0
+        jobs = self.stale_jobs()[:calls_left]
+        if not jobs:
+            return 0
+
+        started = time.monotonic()
+        deadline = started + self.max_seconds - self._window_seconds
+        semaphore = asyncio.Semaphore(self.concurrency)
+        computed = 0
+
+        async def run(chain, inputs):
+            nonlocal computed
+            async with semaphore:
+                if time.monotonic() >= deadline:
+                    return
+                self._window_calls += 1
+                try:
+                    if await self.compute(chain, inputs) is not None:
+                        computed += 1
+                    else:
+                        self.failed += 1
+                except Exception as e:
+                    self.failed += 1
+                    logging.error(f"Pre-warming {chain.name} for {inputs} failed: {e}")
+
+        await asyncio.gather(*(run(chain, inputs) for chain, inputs in jobs))
+        self._window_seconds += time.monotonic() - started
+        self.runs += 1
+        self.computed += computed
+        self.last_run_at = time.time()
+        logging.info(f"Pre-warmed {computed}/{len(jobs)} catalogue results in {time.monotonic() - started:.1f}s")
+        return computed
+
+    async def run_forever(self):
+        while True:
+            if self.in_window():
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    logging.error(f"Pre-warm run failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+            logging.info(
+                f"Pre-warm scheduler started for {len(self.jobs)} catalogue results, "
+                f"window {self.window_start_hour}:00-{self.window_end_hour}:00"
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            "running": self._task is not None,
+            "in_window": self.in_window(),
+            "catalogue_size": len(self.jobs),
+            "window_calls": self._window_calls,
+            "window_budget": self.max_calls,
+            "runs": self.runs,
+            "computed": self.computed,
+            "failed": self.failed,
+            "last_run_at": self.last_run_at,
+        }
@@ -0,0 +1,111 @@
+import gzip
+
+from pydantic_core import to_json
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional; responses are gzipped only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class ModelResponse(Response):
+    """
+    JSON response serialized once, straight from an already validated response model.
+
+    Endpoints return it instead of the model itself: FastAPI then neither re-validates the model
+    against `response_model` (which still documents the endpoint) nor converts it through
+    `jsonable_encoder`. Models, and dicts or lists of them, are written to bytes by pydantic's
+    Rust serializer.
+    """
+    media_type = "application/json"
+
+    def render(self, content):
+        return to_json(content)
+
+
+def accepted_encoding(accept_encoding):
+    """
+    Preferred content coding offered by the client: "br" if the brotli package is installed, else "gzip".
+    """
+    offered = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        try:
+            weight = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            weight = 1.0
+        if weight > 0:
+            offered.add(coding.strip().lower())
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered or "*" in offered:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON and text response bodies of at least `minimum_size` bytes.
+
+    Only responses sent as a single body message are compressed; streamed responses (server-sent
+    events) pass through untouched so that every event still reaches the client as it is sent.
+    """
+
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def compressing_send(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether the response is compressed
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body")
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(start)
+            else:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                await send(start)
+                message = {**message, "body": body}
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, compressing_send)
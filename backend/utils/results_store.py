@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+from utils.single_flight import normalize_payload, payload_key
+
+
+class ResultsStore:
+    """
+    SQLite store of analysis results keyed by chain name and normalized inputs.
+
+    Every result carries freshness metadata: when it was computed, how long the computation took,
+    whether it came from pre-warming or an interactive request, and when it expires. Reads return
+    only unexpired results, so a lookup is a single indexed query instead of an LLM call.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = None
+        self._open_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def _connection(self):
+        # Opened on first use, so that creating the store (e.g. importing the app) touches no files
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    self._db = self._open()
+        return self._db
+
+    def _open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                chain TEXT NOT NULL,
+                key TEXT NOT NULL,
+                inputs TEXT NOT NULL,
+                response TEXT NOT NULL,
+                source TEXT NOT NULL,
+                computed_at REAL NOT NULL,
+                duration REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (chain, key)
+            )
+            """
+        )
+        connection.commit()
+        return connection
+
+    def get(self, chain_name, inputs, include_expired=False):
+        """
+        Return the fresh result for (chain_name, inputs) as a dict with `response` and its
+        freshness metadata, or None if there is no unexpired result.
+
+        Args:
+            include_expired (bool): Also return an expired result, e.g. while shedding load.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, source, computed_at, duration, expires_at FROM results "
+                "WHERE chain = ? AND key = ? AND expires_at > ?",
+                (chain_name, payload_key(chain_name, inputs), 0 if include_expired else time.time()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        response, source, computed_at, duration, expires_at = row
+        return {
+            "response": json.loads(response),
+            "source": source,
+            "computed_at": computed_at,
+            "duration": duration,
+            "expires_at": expires_at,
+        }
+
+    def put(self, chain_name, inputs, response, duration, source="interactive"):
+        """
+        Store a result model for (chain_name, inputs), replacing any previous one.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    chain_name,
+                    payload_key(chain_name, inputs),
+                    json.dumps(normalize_payload(inputs), sort_keys=True, default=str),
+                    response.model_dump_json(),
+                    source,
+                    now,
+                    duration,
+                    now + self.ttl,
+                ),
+            )
+            self._connection.commit()
+
+    def computed_at(self, chain_name, inputs):
+        """
+        When the stored result for (chain_name, inputs) was computed, expired or not; None if absent.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT computed_at FROM results WHERE chain = ? AND key = ?",
+                (chain_name, payload_key(chain_name, inputs)),
+            ).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        with self._lock:
+            total, fresh, oldest, newest = self._connection.execute(
+                "SELECT COUNT(*), SUM(expires_at > ?), MIN(computed_at), MAX(computed_at) FROM results",
+                (time.time(),),
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": total,
+            "fresh": fresh or 0,
+            "oldest_computed_at": oldest,
+            "newest_computed_at": newest,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+        logging.info(f"Closed results store {self.path}")
@@ -0,0 +1,60 @@
+import logging
+
+import numpy as np
+
+
+def normalize_topic(topic):
+    return " ".join(topic.casefold().split())
+
+
+class RetrievalMatrix:
+    """
+    Precomputed top-k retrieval results of one brand for a fixed list of topics.
+
+    Results are stored as a (topics x k) table of positions into the brand's chunk list plus the
+    matching retriever scores, so answering a known topic is a dictionary lookup with no embedding
+    call or index search. Rows shorter than k are padded with -1.
+    """
+
+    def __init__(self, topics, positions, scores, mode, resolve):
+        self.topics = {normalize_topic(topic): row for row, topic in enumerate(topics)}
+        self.resolve = resolve
+        self.positions = positions
+        self.scores = scores
+        self.mode = mode
+
+    @property
+    def k(self):
+        return self.positions.shape[1]
+
+    @classmethod
+    def build(cls, topics, ids, rankings, k, mode, resolve):
+        """
+        Materialize ranked topic results into the lookup table.
+
+        Args:
+            topics (list[str]): Topics, one per ranking.
+            ids (list[str]): Chunk IDs of the brand in chunk order.
+            rankings (list[list[tuple[str, Document, float]]]): Ranked (chunk_id, document, score) results per topic.
+            k (int): Columns of the table.
+            mode (str): Retrieval mode the rankings were produced with.
+            resolve (Callable[[int], Document]): Returns the document at a position of `ids`.
+        """
+        position_of = {chunk_id: position for position, chunk_id in enumerate(ids)}
+        positions = np.full((len(topics), k), -1, dtype="int32")
+        scores = np.zeros((len(topics), k), dtype="float32")
+        for row, ranking in enumerate(rankings):
+            for column, (chunk_id, _, score) in enumerate(ranking[:k]):
+                positions[row, column] = position_of[chunk_id]
+                scores[row, column] = score
+        logging.info(f"Built retrieval matrix for {len(topics)} topics x {k} ({positions.nbytes + scores.nbytes} bytes)")
+        return cls(topics, positions, scores, mode, resolve)
+
+    def lookup(self, topic, k, mode):
+        """
+        Return the precomputed documents for `topic`, or None if the topic, k or mode is not covered.
+        """
+        row = self.topics.get(normalize_topic(topic))
+        if row is None or k > self.k or mode != self.mode:
+            return None
+        return [self.resolve(int(position)) for position in self.positions[row, :k] if position >= 0]
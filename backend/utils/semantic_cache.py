@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import logging
+import threading
+from queue import SimpleQueue
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+
+import faiss
+import numpy as np
+
+from config import Config
+
+
+class SemanticCache:
+    """
+    Cache keyed by query embeddings instead of exact strings.
+
+    Query vectors are L2-normalized and kept in a small FAISS inner-product index per scope, so a lookup
+    returns the value stored for the most similar earlier query of the same scope when its cosine
+    similarity reaches the threshold of that scope: the one of the longest matching prefix in
+    `scope_thresholds`, or the cache's threshold. Entries expire after `ttl` seconds and the least
+    recently used entry is evicted once `max_entries` is reached. Hits and near misses are
+    appended to an audit log so thresholds can be tuned against real traffic; the records are
+    queued and written by a listener thread, so lookups on the event loop never wait on the file.
+    """
+
+    def __init__(self, name, threshold, max_entries=None, ttl=None, audit_path=None, scope_thresholds=None):
+        self.name = name
+        self.threshold = threshold
+        self.scope_thresholds = dict(scope_thresholds or {})
+        self.max_entries = max_entries or Config.SemanticCache.MAX_ENTRIES
+        self.ttl = ttl or Config.SemanticCache.TTL_SECONDS
+        self.audit_path = audit_path if audit_path is not None else Config.Paths.SEMANTIC_CACHE_AUDIT_LOG
+        self._indices = {}  # scope -> index of its entries
+        self._entries = OrderedDict()  # id -> (scope, query, value, created_at), in LRU order
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._audit_handler = None
+        self._audit_listener = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype="float32").reshape(1, -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id):
+        scope = self._entries.pop(entry_id)[0]
+        index = self._indices[scope]
+        index.remove_ids(np.array([entry_id], dtype="int64"))
+        if index.ntotal == 0:
+            del self._indices[scope]
+
+    def threshold_for(self, scope):
+        prefixes = [prefix for prefix in self.scope_thresholds if scope.startswith(prefix)]
+        return self.scope_thresholds[max(prefixes, key=len)] if prefixes else self.threshold
+
+    def _start_audit(self):
+        try:
+            os.makedirs(os.path.dirname(self.audit_path) or ".", exist_ok=True)
+            file_handler = logging.FileHandler(self.audit_path, encoding="utf-8", delay=True)
+        except OSError as e:
+            logging.warning(f"Could not open semantic cache audit log: {e}")
+            self.audit_path = None
+            return
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        queue = SimpleQueue()
+        self._audit_listener = QueueListener(queue, file_handler)
+        self._audit_listener.start()
+        self._audit_handler = QueueHandler(queue)
+
+    def _audit(self, scope, query, matched_query, similarity, threshold, hit):
+        if not self.audit_path:
+            return
+        if self._audit_handler is None:
+            with self._lock:
+                if self._audit_handler is None:
+                    self._start_audit()
+                if self._audit_handler is None:
+                    return
+        record = {
+            "ts": time.time(),
+            "cache": self.name,
+            "scope": scope,
+            "query": query,
+            "matched_query": matched_query,
+            "similarity": round(similarity, 4),
+            "threshold": threshold,
+            "hit": hit,
+        }
+        self._audit_handler.handle(logging.makeLogRecord({"msg": json.dumps(record, ensure_ascii=False)}))
+
+    def close(self):
+        """
+        Write the queued audit records and stop the audit listener.
+        """
+        with self._lock:
+            listener, self._audit_listener, self._audit_handler = self._audit_listener, None, None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def lookup(self, scope, vector, query=None):
+        """
+        Return the cached value for the closest query of `scope`, or None on a miss.
+
+        Args:
+            scope (str): Namespace the entry must belong to, e.g. brand name and k.
+            vector (list[float]): Embedding of the query.
+            query (str): Original query text, recorded in the audit log.
+        """
+        threshold = self.threshold_for(scope)
+        with self._lock:
+            index = self._indices.get(scope)
+            if index is None:
+                self.misses += 1
+                return None
+            # Every entry of the scope is ranked, so expired ones cannot hide a live match
+            scores, ids = index.search(self._normalize(vector), index.ntotal)
+            now = time.time()
+            best = None
+            for score, entry_id in zip(scores[0], ids[0]):
+                if entry_id == -1 or entry_id not in self._entries:
+                    continue
+                _, entry_query, value, created_at = self._entries[entry_id]
+                if now - created_at > self.ttl:
+                    self._remove(entry_id)
+                    self.evictions += 1
+                    continue
+                best = (float(score), entry_id, entry_query, value)
+                break
+
+            if best is not None and best[0] >= threshold:
+                similarity, entry_id, entry_query, value = best
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+                value = None
+
+        if best is not None and best[0] >= threshold - Config.SemanticCache.AUDIT_MARGIN:
+            self._audit(scope, query, best[2], best[0], threshold, value is not None)
+        return value
+
+    def store(self, scope, vector, query, value):
+        """
+        Add a value for a query embedding, evicting expired and least recently used entries first.
+        """
+        vector = self._normalize(vector)
+        with self._lock:
+            now = time.time()
+            for entry_id in [i for i, entry in self._entries.items() if now - entry[3] > self.ttl]:
+                self._remove(entry_id)
+                self.evictions += 1
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+            entry_id = self._next_id
+            self._next_id += 1
+            if scope not in self._indices:
+                self._indices[scope] = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            self._indices[scope].add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (scope, query, value, now)
+
+    def clear(self):
+        """
+        Drop all entries, e.g. after the indices the cached values came from were rebuilt.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._indices.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "scopes": len(self._indices),
+            "threshold": self.threshold,
+            "scope_thresholds": self.scope_thresholds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
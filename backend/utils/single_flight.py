@@ -0,0 +1,96 @@
+import json
+import asyncio
+import hashlib
+from collections import defaultdict
+
+
+def normalize_payload(value):
+    """
+    Reduce a chain input to a canonical JSON-compatible form.
+
+    Strings are whitespace-collapsed, documents are reduced to their text and pydantic models
+    to their fields, so requests that only differ cosmetically map to the same key.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(key): normalize_payload(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(item) for item in value]
+    if hasattr(value, "page_content"):
+        return normalize_payload(value.page_content)
+    if hasattr(value, "model_dump"):
+        return normalize_payload(value.model_dump())
+    return value
+
+
+def payload_key(name, payload):
+    """
+    Stable hash of a named operation and its normalized payload.
+    """
+    serialized = json.dumps([name, normalize_payload(payload)], sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key.
+
+    The first caller for a key starts the work; callers arriving while it is in flight await the
+    same task and receive its result (or exception). Waiters are shielded, so one caller going away
+    does not cancel the work the others are waiting for; the work is cancelled once every caller
+    has gone away.
+    """
+
+    def __init__(self):
+        self._in_flight = {}
+        self._stats = defaultdict(lambda: {"requests": 0, "executions": 0, "coalesced": 0, "cancelled": 0, "peak_waiters": 0})
+        self._waiters = defaultdict(int)
+
+    async def do(self, name, payload, fn):
+        """
+        Run `fn()` for (name, payload) unless an identical call is already in flight.
+
+        Args:
+            name (str): Operation name, e.g. the chain name; used for the key and the stats.
+            payload: Inputs of the operation, normalized with `normalize_payload`.
+            fn (Callable[[], Awaitable]): Starts the actual work.
+        """
+        key = payload_key(name, payload)
+        stats = self._stats[name]
+        stats["requests"] += 1
+
+        task = self._in_flight.get(key)
+        if task is None:
+            stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            stats["coalesced"] += 1
+
+        self._waiters[key] += 1
+        stats["peak_waiters"] = max(stats["peak_waiters"], self._waiters[key])
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                if not task.done():
+                    # Nobody is waiting for the result any more
+                    task.cancel()
+                    stats["cancelled"] += 1
+
+    def stats(self):
+        """
+        Per-operation counters; `coalesced` is the number of calls saved.
+        """
+        per_name = {name: dict(values) for name, values in self._stats.items()}
+        totals = {
+            "requests": sum(values["requests"] for values in per_name.values()),
+            "executions": sum(values["executions"] for values in per_name.values()),
+            "coalesced": sum(values["coalesced"] for values in per_name.values()),
+            "cancelled": sum(values["cancelled"] for values in per_name.values()),
+        }
+        return {"in_flight": len(self._in_flight), "totals": totals, "by_name": per_name}
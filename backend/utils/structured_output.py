@@ -0,0 +1,116 @@
+import re
+import json
+import logging
+
+from pydantic import ValidationError
+
+logger = logging.getLogger("chains")
+
+# Sent in place of the full JSON schema text when the model is given the schema natively
+STRUCTURED_FORMAT_INSTRUCTIONS = "Respond only with a JSON object that follows the provided response schema."
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _has_open_objects(schema):
+    if isinstance(schema, dict):
+        if schema.get("additionalProperties") not in (None, False):
+            return True
+        return any(_has_open_objects(value) for value in schema.values())
+    if isinstance(schema, list):
+        return any(_has_open_objects(value) for value in schema)
+    return False
+
+
+def structured_output_method(pydantic_object, preferred):
+    """
+    Pick the structured-output method for a response model.
+
+    Strict JSON-schema mode cannot describe free-form mappings (`Dict[str, ...]` fields), so models
+    containing them fall back to a forced function call, which accepts any JSON schema.
+    """
+    if preferred == "json_schema" and _has_open_objects(pydantic_object.model_json_schema()):
+        return "function_calling"
+    return preferred
+
+
+def raw_output_text(message):
+    """
+    Return the JSON text a model produced, from tool-call arguments or from the message content.
+    """
+    for tool_call in (message.additional_kwargs or {}).get("tool_calls") or []:
+        arguments = (tool_call.get("function") or {}).get("arguments")
+        if arguments:
+            return arguments
+    for tool_call in getattr(message, "invalid_tool_calls", None) or []:
+        if tool_call.get("args"):
+            return tool_call["args"]
+    content = message.content
+    if isinstance(content, list):
+        content = "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+
+def repair_json(text):
+    """
+    Best-effort local repair of almost-valid JSON: strips code fences and surrounding prose,
+    removes trailing commas and closes structures cut off by the token limit.
+
+    Returns:
+        dict | None: The parsed object, or None when nothing usable could be recovered.
+    """
+    from langchain_core.utils.json import parse_partial_json
+
+    text = _CODE_FENCE.sub("", text.strip())
+    start = text.find("{")
+    if start == -1:
+        return None
+    end = text.rfind("}")
+    enclosed = _TRAILING_COMMA.sub(r"\1", text[start:end + 1]) if end > start else None
+    tail = _TRAILING_COMMA.sub(r"\1", text[start:])
+
+    # Complete object surrounded by prose first, then a truncated object closed as late as possible
+    attempts = [(json.loads, enclosed), (parse_partial_json, tail), (parse_partial_json, enclosed)]
+    for parse, candidate in attempts:
+        if candidate is None:
+            continue
+        try:
+            parsed = parse(candidate)
+        except ValueError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def validate_output(data, pydantic_object):
+    """
+    Validate a parsed object against the response model, unwrapping the `{"properties": {...}}`
+    envelope models sometimes echo back from the schema.
+    """
+    try:
+        return pydantic_object.model_validate(data)
+    except ValidationError:
+        inner = data.get("properties") if isinstance(data, dict) else None
+        if isinstance(inner, dict):
+            return pydantic_object.model_validate(inner)
+        raise
+
+
+def repair_structured_output(message, pydantic_object):
+    """
+    Recover a response model instance from a model message that failed to parse.
+
+    Returns:
+        BaseModel | None: The validated response, or None if the output cannot be repaired.
+    """
+    text = raw_output_text(message)
+    data = repair_json(text)
+    if data is None:
+        return None
+    try:
+        return validate_output(data, pydantic_object)
+    except ValidationError as e:
+        logger.warning(f"Repaired output does not match {pydantic_object.__name__}: {e.error_count()} errors")
+        return None
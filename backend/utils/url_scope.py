@@ -0,0 +1,229 @@
+import re
+import logging
+from urllib import robotparser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+import httpx
+from lxml import etree
+
+from config import Config
+
+# Query parameters that only track campaigns or sessions and never change page content
+STRIPPED_QUERY_PREFIXES = ("utm_", "mc_", "pk_", "hsa_")
+STRIPPED_QUERY_PARAMS = {
+    "gclid", "gclsrc", "dclid", "fbclid", "msclkid", "yclid", "twclid", "ttclid", "li_fat_id",
+    "_ga", "_gl", "_hsenc", "_hsmi", "ref", "referrer", "cmpid", "campaign", "s_kwcid", "ef_id",
+    "sessionid", "session_id", "sid", "jsessionid", "phpsessid", "aspsessionid", "cfid", "cftoken",
+}
+
+# Links to these files are never HTML and are not worth a page fetch
+NON_HTML_EXTENSIONS = {
+    ".pdf", ".zip", ".gz", ".tar", ".rar", ".7z", ".exe", ".dmg", ".apk", ".msi",
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".bmp", ".tif", ".tiff",
+    ".mp3", ".mp4", ".m4a", ".mov", ".avi", ".wmv", ".webm", ".wav",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".csv", ".txt", ".rtf",
+    ".css", ".js", ".json", ".xml", ".rss", ".ics", ".vcf", ".woff", ".woff2", ".ttf", ".eot",
+}
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def _bare_host(host):
+    return host[4:] if host.startswith("www.") else host
+
+
+def canonicalize_url(url, base_url=None):
+    """
+    Normalize a URL so that variants of the same page share one key.
+
+    Lowercases scheme and host, upgrades http to https, drops default ports, fragments,
+    path parameters such as `;jsessionid=`, tracking/session query parameters and trailing
+    slashes, and sorts the remaining query parameters.
+
+    Args:
+        url (str): URL to normalize, possibly relative.
+        base_url (str): URL relative links are resolved against.
+
+    Returns:
+        str | None: Canonical URL, or None for non-HTTP links (mailto:, tel:, javascript:, ...).
+    """
+    if base_url:
+        url = urljoin(base_url, url)
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    if scheme not in ("http", "https") or not parsed.hostname:
+        return None
+
+    host = parsed.hostname.lower().rstrip(".")
+    port = parsed.port
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parsed.path) or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in STRIPPED_QUERY_PARAMS and not key.lower().startswith(STRIPPED_QUERY_PREFIXES)
+    )
+
+    return urlunparse(("https", netloc, path, "", urlencode(query), ""))
+
+
+def has_non_html_extension(url):
+    """
+    Check whether a URL points to a file type that is never an HTML page.
+    """
+    path = urlparse(url).path.lower()
+    dot = path.rfind(".")
+    return dot > path.rfind("/") and path[dot:] in NON_HTML_EXTENSIONS
+
+
+def is_html_content_type(content_type):
+    """
+    Check whether a Content-Type header describes an HTML document. Missing headers are accepted.
+    """
+    if not content_type:
+        return True
+    return content_type.split(";")[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+class CrawlScope:
+    """
+    Decides which URLs belong to a brand crawl and maps them to canonical form.
+
+    A URL is in scope when it is an HTTP(S) link on the brand's host (with or without `www.`,
+    plus any subdomain when `allow_subdomains` is set), does not point to a non-HTML file,
+    matches at least one include pattern (when any are given), matches no exclude pattern and
+    is allowed by robots.txt (once loaded).
+    """
+
+    def __init__(self, base_url, include=None, exclude=None, allow_subdomains=False):
+        # http and https variants share one key, fetched with the scheme the brand's URL uses
+        self.scheme = urlparse(base_url).scheme.lower() or "https"
+        self.base_url = urlunparse(urlparse(canonicalize_url(base_url))._replace(scheme=self.scheme))
+        self.host = urlparse(self.base_url).netloc
+        self.bare_host = _bare_host(self.host)
+        self.allow_subdomains = allow_subdomains
+        self.include = [re.compile(pattern) for pattern in include or []]
+        self.exclude = [re.compile(pattern) for pattern in list(Config.Scraper.DEFAULT_EXCLUDE_PATTERNS) + list(exclude or [])]
+        self.robots = None
+        self.sitemaps = []
+
+    @classmethod
+    def for_brand(cls, brand_base_url, brand_name):
+        """
+        Build the scope for a brand from its entry in `Config.VectorStore.BRAND_DATA`.
+        """
+        brand = next((b for b in Config.VectorStore.BRAND_DATA if b["name"] == brand_name), {})
+        return cls(
+            brand_base_url,
+            include=brand.get("include"),
+            exclude=brand.get("exclude"),
+            allow_subdomains=brand.get("allow_subdomains", False),
+        )
+
+    def _same_site(self, host):
+        if host == self.host or _bare_host(host) == self.bare_host:
+            return True
+        return self.allow_subdomains and host.endswith("." + self.bare_host)
+
+    def canonicalize(self, url, source_url=None):
+        """
+        Return the canonical form of an in-scope URL, or None if the URL is out of scope.
+
+        `www.` and bare-host variants of the brand's host are mapped onto the base URL's host and scheme.
+        """
+        canonical = canonicalize_url(url, source_url or self.base_url)
+        if canonical is None:
+            return None
+        parsed = urlparse(canonical)
+        if not self._same_site(parsed.netloc):
+            return None
+        if _bare_host(parsed.netloc) == self.bare_host:
+            parsed = parsed._replace(scheme=self.scheme, netloc=self.host)
+            canonical = urlunparse(parsed)
+        if has_non_html_extension(canonical):
+            return None
+
+        target = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        if self.include and not any(pattern.search(target) for pattern in self.include):
+            return None
+        if any(pattern.search(target) for pattern in self.exclude):
+            return None
+        if self.robots is not None and not self.robots.can_fetch(Config.Scraper.ROBOTS_USER_AGENT, canonical):
+            return None
+        return canonical
+
+    def in_scope(self, url):
+        return self.canonicalize(url) is not None
+
+    async def load_robots(self, client):
+        """
+        Fetch and parse robots.txt; sitemap locations it lists are kept for seeding.
+        """
+        robots_url = urljoin(self.base_url, "/robots.txt")
+        try:
+            response = await client.get(robots_url)
+        except httpx.HTTPError as e:
+            logging.info(f"Could not fetch {robots_url}: {e}")
+            return
+        if response.status_code != 200:
+            return
+        parser = robotparser.RobotFileParser(robots_url)
+        parser.parse(response.text.splitlines())
+        self.robots = parser
+        self.sitemaps = list(parser.site_maps() or [])
+
+    async def sitemap_urls(self, client, limit=None):
+        """
+        Collect in-scope page URLs from the site's sitemaps, following sitemap indexes.
+
+        Args:
+            client (httpx.AsyncClient): Client used to fetch the sitemaps.
+            limit (int): Maximum number of URLs returned, defaults to `Config.Scraper.MAX_SITEMAP_URLS`.
+
+        Returns:
+            list[str]: Canonical URLs in sitemap order, without duplicates.
+        """
+        limit = Config.Scraper.MAX_SITEMAP_URLS if limit is None else limit
+        pending = self.sitemaps or [urljoin(self.base_url, "/sitemap.xml")]
+        seen_sitemaps = set()
+        urls = []
+        seen_urls = set()
+
+        while pending and len(urls) < limit:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in seen_sitemaps:
+                continue
+            seen_sitemaps.add(sitemap_url)
+            try:
+                response = await client.get(sitemap_url)
+                if response.status_code != 200:
+                    continue
+                root = etree.fromstring(response.content, parser=etree.XMLParser(recover=True, resolve_entities=False))
+            except (httpx.HTTPError, etree.XMLSyntaxError) as e:
+                logging.info(f"Could not read sitemap {sitemap_url}: {e}")
+                continue
+            if root is None:
+                continue
+
+            for loc in root.iter(f"{SITEMAP_NS}loc", "loc"):
+                location = (loc.text or "").strip()
+                if not location:
+                    continue
+                if root.tag in (f"{SITEMAP_NS}sitemapindex", "sitemapindex"):
+                    pending.append(location)
+                    continue
+                canonical = self.canonicalize(location)
+                if canonical and canonical not in seen_urls:
+                    seen_urls.add(canonical)
+                    urls.append(canonical)
+                    if len(urls) >= limit:
+                        break
+
+        logging.info(f"Seeded {len(urls)} URLs from sitemaps of {self.base_url}")
+        return urls
@@ -0,0 +1,354 @@
+import os
+import time
+import uuid
+import asyncio
+import sqlite3
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+
+from config import Config
+
+# Who a chat or embedding call is made for: endpoint, brand and request ID of the current work
+usage_attribution = contextvars.ContextVar("usage_attribution", default={})
+
+# Columns a usage record is aggregated by, and that summaries can be grouped by
+DIMENSIONS = ("request_id", "endpoint", "brand", "chain", "kind", "model")
+# The hourly rollups leave out the request ID, which is kept per request for `request_retention` only
+ROLLUP_DIMENSIONS = DIMENSIONS[1:]
+METRICS = ("calls", "input_tokens", "cached_tokens", "output_tokens", "latency_seconds", "max_latency_seconds", "cost_usd")
+
+
+@contextmanager
+def usage_scope(**attribution):
+    """
+    Attribute the calls made inside the block to `endpoint`, `brand` and/or `request_id`, on top of
+    the attribution already in place.
+    """
+    token = usage_attribution.set({**usage_attribution.get(), **attribution})
+    try:
+        yield
+    finally:
+        usage_attribution.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # The encoding files are downloaded on first use
+        logging.warning(f"Token encoding for {model} unavailable, estimating embedding tokens: {e}")
+        return None
+
+
+def count_tokens(texts, model):
+    """
+    Tokens in `texts` as the embeddings API counts them, which reports no usage itself.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        # About four characters per token
+        return sum(len(text) for text in texts) // 4
+    return sum(len(tokens) for tokens in encoding.encode_batch(list(texts), disallowed_special=()))
+
+
+class UsageTracker:
+    """
+    Token, latency and cost accounting of every chat and embedding call.
+
+    Calls are aggregated in memory per hour and per (endpoint, brand, chain, kind, model), and
+    separately per request, and the aggregates are flushed to SQLite every `flush_interval` seconds
+    by `start()`, or on `flush()`. Hourly rollups are kept; per-request rows older than
+    `request_retention` seconds are pruned on flush. Summaries read the store, so they cover
+    earlier processes too.
+
+    Args:
+        prices (dict): USD per million (input, output) tokens per model.
+        cached_input_factor (float): Fraction of the input price billed for cached prompt tokens.
+    """
+
+    def __init__(self, path, prices, cached_input_factor=0.5, flush_interval=30.0, request_retention=7 * 86400, enabled=True):
+        self.path = path
+        self.prices = prices
+        self.cached_input_factor = cached_input_factor
+        self.flush_interval = flush_interval
+        self.request_retention = request_retention
+        self.enabled = enabled
+        self._lock = threading.Lock()  # Guards the in-memory aggregates
+        self._db_lock = threading.Lock()
+        self._pending = {}  # (hour, *ROLLUP_DIMENSIONS) -> totals
+        self._pending_requests = {}  # DIMENSIONS -> totals and time of the latest call
+        self._connection = None
+        self._task = None
+
+    def _connect(self):
+        # Opened on first flush, so that importing the tracker touches no files
+        if self._connection is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            metrics = """
+                calls INTEGER NOT NULL,
+                input_tokens INTEGER NOT NULL,
+                cached_tokens INTEGER NOT NULL,
+                output_tokens INTEGER NOT NULL,
+                latency_seconds REAL NOT NULL,
+                max_latency_seconds REAL NOT NULL,
+                cost_usd REAL NOT NULL,
+            """
+            self._connection.executescript(
+                f"""
+                CREATE TABLE IF NOT EXISTS usage_hourly (
+                    hour REAL NOT NULL,
+                    {", ".join(f"{dimension} TEXT NOT NULL" for dimension in ROLLUP_DIMENSIONS)},
+                    {metrics}
+                    PRIMARY KEY (hour, {", ".join(ROLLUP_DIMENSIONS)})
+                );
+                CREATE TABLE IF NOT EXISTS usage_by_request (
+                    {", ".join(f"{dimension} TEXT NOT NULL" for dimension in DIMENSIONS)},
+                    {metrics}
+                    recorded_at REAL NOT NULL,
+                    PRIMARY KEY ({", ".join(DIMENSIONS)})
+                );
+                CREATE INDEX IF NOT EXISTS usage_by_request_time ON usage_by_request (recorded_at);
+                """
+            )
+            self._connection.commit()
+        return self._connection
+
+    def cost(self, model, input_tokens, cached_tokens, output_tokens):
+        input_price, output_price = self.prices.get(model, (0.0, 0.0))
+        billed_input = input_tokens - cached_tokens + cached_tokens * self.cached_input_factor
+        return (billed_input * input_price + output_tokens * output_price) / 1e6
+
+    def record(self, kind, model, latency, input_tokens=0, output_tokens=0, cached_tokens=0, chain=None, brand=None):
+        """
+        Record one call, attributed to the current `usage_scope`.
+
+        Args:
+            kind (str): "chat" or "embedding".
+            latency (float): Seconds.
+            brand (str): Overrides the brand of the scope, e.g. the `brand_name` input of a chain call.
+        """
+        if not self.enabled:
+            return
+        attribution = usage_attribution.get()
+        dimensions = {
+            "request_id": attribution.get("request_id"),
+            "endpoint": attribution.get("endpoint"),
+            "brand": brand or attribution.get("brand"),
+            "chain": chain,
+            "kind": kind,
+            "model": model,
+        }
+        now = time.time()
+        values = {dimension: dimensions[dimension] or "" for dimension in DIMENSIONS}
+        cost = self.cost(model, input_tokens, cached_tokens, output_tokens)
+        with self._lock:
+            aggregates = [self._pending.setdefault(
+                (now // 3600 * 3600, *(values[dimension] for dimension in ROLLUP_DIMENSIONS)), dict.fromkeys(METRICS, 0)
+            )]
+            if values["request_id"]:
+                aggregates.append(self._pending_requests.setdefault(
+                    tuple(values[dimension] for dimension in DIMENSIONS), dict.fromkeys(METRICS, 0)
+                ))
+                aggregates[-1]["recorded_at"] = now
+            for totals in aggregates:
+                totals["calls"] += 1
+                totals["input_tokens"] += input_tokens
+                totals["cached_tokens"] += cached_tokens
+                totals["output_tokens"] += output_tokens
+                totals["latency_seconds"] += latency
+                totals["max_latency_seconds"] = max(totals["max_latency_seconds"], latency)
+                totals["cost_usd"] += cost
+
+    def record_chat(self, model, latency, usage, chain=None, brand=None):
+        """
+        Record a chat call from the `usage_metadata` of its response message.
+        """
+        self.record(
+            "chat",
+            model,
+            latency,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            cached_tokens=(usage.get("input_token_details") or {}).get("cache_read", 0),
+            chain=chain,
+            brand=brand,
+        )
+
+    def record_embedding(self, model, latency, texts, brand=None):
+        """
+        Record an embeddings call over `texts`, counting their tokens locally.
+        """
+        if self.enabled:
+            self.record("embedding", model, latency, input_tokens=count_tokens(texts, model), brand=brand)
+
+    def flush(self):
+        """
+        Add the aggregates recorded since the last flush to the store and prune expired per-request rows.
+
+        Returns:
+            int: Hourly aggregates written.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            pending_requests, self._pending_requests = self._pending_requests, {}
+        updates = ", ".join(
+            f"{metric} = MAX({metric}, excluded.{metric})" if metric == "max_latency_seconds"
+            else f"{metric} = {metric} + excluded.{metric}"
+            for metric in METRICS
+        )
+        hourly_columns = ("hour", *ROLLUP_DIMENSIONS, *METRICS)
+        request_columns = (*DIMENSIONS, *METRICS, "recorded_at")
+        with self._db_lock:
+            connection = self._connect()
+            if pending:
+                connection.executemany(
+                    f"INSERT INTO usage_hourly ({', '.join(hourly_columns)}) VALUES ({', '.join('?' for _ in hourly_columns)}) "
+                    f"ON CONFLICT (hour, {', '.join(ROLLUP_DIMENSIONS)}) DO UPDATE SET {updates}",
+                    [(*key, *(totals[metric] for metric in METRICS)) for key, totals in pending.items()],
+                )
+            if pending_requests:
+                connection.executemany(
+                    f"INSERT INTO usage_by_request ({', '.join(request_columns)}) VALUES ({', '.join('?' for _ in request_columns)}) "
+                    f"ON CONFLICT ({', '.join(DIMENSIONS)}) DO UPDATE SET {updates}, "
+                    "recorded_at = MAX(recorded_at, excluded.recorded_at)",
+                    [
+                        (*key, *(totals[metric] for metric in METRICS), totals["recorded_at"])
+                        for key, totals in pending_requests.items()
+                    ],
+                )
+            connection.execute("DELETE FROM usage_by_request WHERE recorded_at < ?", (time.time() - self.request_retention,))
+            connection.commit()
+        return len(pending)
+
+    def summary(self, since=None, until=None, group_by=("endpoint", "brand", "model")):
+        """
+        Usage totals per group of `group_by` dimensions between `since` and `until` (Unix times,
+        resolved to the hour), most expensive first.
+
+        Grouping by `request_id` reads the per-request rows, which only cover the retention window
+        and are filtered by the time of each request's latest call.
+        """
+        unknown = set(group_by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown usage dimensions: {sorted(unknown)}")
+        self.flush()
+        if "request_id" in group_by:
+            table, time_column = "usage_by_request", "recorded_at"
+        else:
+            table, time_column = "usage_hourly", "hour"
+            since = since // 3600 * 3600 if since is not None else None
+        conditions, parameters = [], []
+        if since is not None:
+            conditions.append(f"{time_column} >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append(f"{time_column} <= ?")
+            parameters.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sums = ", ".join(
+            f"MAX({metric})" if metric == "max_latency_seconds" else f"SUM({metric})" for metric in METRICS
+        )
+        group = f"GROUP BY {', '.join(group_by)}" if group_by else ""
+        with self._db_lock:
+            rows = self._connect().execute(
+                f"SELECT {', '.join([*group_by, sums])} FROM {table} {where} {group} ORDER BY SUM(cost_usd) DESC",
+                parameters,
+            ).fetchall()
+
+        groups = []
+        for row in rows:
+            totals = dict(zip(METRICS, row[len(group_by):]))
+            if not totals["calls"]:
+                continue
+            groups.append({
+                **{dimension: value or None for dimension, value in zip(group_by, row)},
+                "calls": totals["calls"],
+                "input_tokens": totals["input_tokens"],
+                "cached_tokens": totals["cached_tokens"],
+                "output_tokens": totals["output_tokens"],
+                "avg_latency_ms": round(totals["latency_seconds"] / totals["calls"] * 1000, 1),
+                "max_latency_ms": round(totals["max_latency_seconds"] * 1000, 1),
+                "cost_usd": round(totals["cost_usd"], 6),
+            })
+        return {
+            "group_by": list(group_by),
+            "groups": groups,
+            "total_cost_usd": round(sum(group["cost_usd"] for group in groups), 6),
+            "total_calls": sum(group["calls"] for group in groups),
+        }
+
+    async def run_forever(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logging.error(f"Flushing usage records failed: {e}")
+
+    def start(self):
+        if self._task is None and self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+
+class UsageAttributionMiddleware:
+    """
+    ASGI middleware attributing the calls made for an HTTP request to its path and request ID.
+
+    The request ID is taken from the `header` request header or generated, and is returned in the
+    same response header so clients can look their request up in the usage store.
+    """
+
+    def __init__(self, app, header="x-request-id"):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = next(
+            (value.decode("latin-1") for name, value in scope.get("headers", []) if name == self.header), None
+        ) or uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (self.header, request_id.encode("latin-1"))]}
+            await send(message)
+
+        with usage_scope(endpoint=scope["path"], request_id=request_id):
+            await self.app(scope, receive, send_with_request_id)
+
+
+usage_tracker = UsageTracker(
+    Config.Paths.USAGE_DB,
+    prices=Config.ModelRouting.PRICES,
+    cached_input_factor=Config.Usage.CACHED_INPUT_PRICE_FACTOR,
+    flush_interval=Config.Usage.FLUSH_INTERVAL_SECONDS,
+    request_retention=Config.Usage.REQUEST_RETENTION_SECONDS,
+    enabled=Config.Usage.ENABLED,
+)
@@ -0,0 +1,137 @@
+import os
+import math
+import logging
+
+import faiss
+import numpy as np
+
+# "float32" keeps LangChain's exact IndexFlatL2; the others trade accuracy for memory
+VECTOR_STORAGES = ("float32", "float16", "int8", "pq")
+
+
+def index_bytes(index):
+    """
+    Approximate memory held by a FAISS index: the size of its serialized form.
+    """
+    if isinstance(index, RerankedIndex):
+        index = index.index
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def _pq_parameters(dimension, count, subquantizers, bits):
+    # Sub-quantizers must divide the dimension, and every codebook needs at least one training point per centroid
+    subquantizers = max(1, min(subquantizers, dimension))
+    while dimension % subquantizers:
+        subquantizers -= 1
+    return subquantizers, max(1, min(bits, int(math.log2(count))))
+
+
+def compressed_index(vectors, storage, pq_subquantizers=96, pq_bits=8):
+    """
+    Build an L2 index over `vectors` with the given storage.
+
+    Args:
+        vectors (np.ndarray): float32 matrix of shape (n, d).
+        storage (str): One of VECTOR_STORAGES.
+        pq_subquantizers (int): Product quantization sub-vectors per vector (bytes per vector at 8 bits).
+        pq_bits (int): Bits per product quantization code.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    count, dimension = vectors.shape
+    if storage == "float32":
+        index = faiss.IndexFlatL2(dimension)
+    elif storage == "float16":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    elif storage == "int8":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    elif storage == "pq":
+        if count < 2:
+            # Too few vectors to train codebooks on; the index is tiny anyway
+            return compressed_index(vectors, "float16")
+        subquantizers, bits = _pq_parameters(dimension, count, pq_subquantizers, pq_bits)
+        index = faiss.IndexPQ(dimension, subquantizers, bits, faiss.METRIC_L2)
+    else:
+        raise ValueError(f"Unknown vector storage '{storage}', expected one of {VECTOR_STORAGES}")
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+class RerankedIndex:
+    """
+    Compressed FAISS index whose top candidates are re-scored with exact float32 vectors.
+
+    The full-precision vectors live in a memory-mapped .npy file, so only the rows of the
+    `factor * k` candidates of a search are paged in. Exposes the parts of the faiss.Index
+    interface used by LangChain's FAISS vector store (search, reconstruct, ntotal, d); the index
+    is read-only.
+    """
+
+    def __init__(self, index, vectors, factor):
+        self.index = index
+        self.vectors = vectors
+        self.factor = factor
+
+    @property
+    def ntotal(self):
+        return self.index.ntotal
+
+    @property
+    def d(self):
+        return self.index.d
+
+    def search(self, queries, k):
+        queries = np.ascontiguousarray(queries, dtype="float32")
+        _, candidates = self.index.search(queries, min(self.ntotal, k * self.factor))
+        distances = np.full((len(queries), k), np.inf, dtype="float32")
+        indices = np.full((len(queries), k), -1, dtype="int64")
+        for row, (query, ids) in enumerate(zip(queries, candidates)):
+            ids = ids[ids >= 0]
+            # Sorted ids read the memory map sequentially
+            ids.sort()
+            exact = ((np.asarray(self.vectors[ids]) - query) ** 2).sum(axis=1)
+            best = np.argsort(exact, kind="stable")[:k]
+            distances[row, :len(best)] = exact[best]
+            indices[row, :len(best)] = ids[best]
+        return distances, indices
+
+    def reconstruct(self, key):
+        return np.asarray(self.vectors[key], dtype="float32")
+
+    def add(self, vectors):
+        raise NotImplementedError("Compressed brand indices are read-only; rebuild the brand's indices instead")
+
+    remove_ids = merge_from = add
+
+
+def compress_vector_store(faiss_store, storage, vectors_path=None, rerank_factor=0, pq_subquantizers=96, pq_bits=8):
+    """
+    Replace the flat float32 index of a LangChain FAISS store with a compressed one, in place.
+
+    With `vectors_path` and a positive `rerank_factor`, the float32 vectors are written to that
+    .npy file and searches re-rank `rerank_factor * k` candidates exactly against it.
+
+    Returns:
+        dict: Storage, vector count and index bytes before and after.
+    """
+    before = index_bytes(faiss_store.index)
+    if storage == "float32":
+        return {"storage": storage, "vectors": faiss_store.index.ntotal, "bytes_before": before, "bytes_after": before}
+
+    vectors = faiss_store.index.reconstruct_n(0, faiss_store.index.ntotal)
+    index = compressed_index(vectors, storage, pq_subquantizers, pq_bits)
+    if vectors_path and rerank_factor > 0:
+        os.makedirs(os.path.dirname(vectors_path) or ".", exist_ok=True)
+        # Replaced rather than overwritten: the indices being rebuilt may still be re-ranking from the old file
+        tmp_path = vectors_path + ".tmp.npy"
+        np.save(tmp_path, vectors)
+        os.replace(tmp_path, vectors_path)
+        index = RerankedIndex(index, np.load(vectors_path, mmap_mode="r"), rerank_factor)
+    faiss_store.index = index
+    after = index_bytes(index)
+    logging.info(
+        "Compressed %d vectors to %s: %.1f MB -> %.1f MB%s", len(vectors), storage, before / 2**20, after / 2**20,
+        f" (re-ranking from {vectors_path})" if isinstance(index, RerankedIndex) else "",
+    )
+    return {"storage": storage, "vectors": len(vectors), "bytes_before": before, "bytes_after": after}
@@ -1,41 +1,89 @@
 import os
 import json
+import time
 import asyncio
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_text_splitters import HTMLHeaderTextSplitter
-from langchain.docstore.document import Document as LangChainDocument
-from utils.playwright_scraper import scrape_website_recursive
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from utils.crawl_checkpoint import CrawlCheckpoint
+from utils.semantic_cache import SemanticCache
+from utils.bm25 import BM25Index, reciprocal_rank_fusion
+from utils.retrieval_matrix import RetrievalMatrix
+from utils.cancellation import check_deadline, within_deadline
+from utils.usage import usage_tracker
 
 import logging
 from config import Config
 from dotenv import load_dotenv
 
-# Set up logging using the configuration
-logging.basicConfig(
-    level=getattr(logging, Config.Logging.LEVEL.upper(), logging.INFO),
-    format=Config.Logging.FORMAT,
-    handlers=[
-        logging.StreamHandler(),
-    ]
-)
-
 load_dotenv()
 os.environ["OPENAI_API_KEY"] = Config.OpenAI.API_KEY
 
-embedding_model = OpenAIEmbeddings()
+# LangChain, the OpenAI client and FAISS are imported on first use, keeping them out of API startup
+embedding_model = None
+
+
+def get_embedding_model():
+    global embedding_model
+    if embedding_model is None:
+        from langchain_openai import OpenAIEmbeddings
+
+        embedding_model = OpenAIEmbeddings()
+    return embedding_model
+
+
+@lru_cache(maxsize=None)
+def embedding_unavailable_errors():
+    """
+    Embedding failures after which topic retrieval answers from the local BM25 index instead.
+    """
+    import openai
+
+    return (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)
+
 
 class VectorStoreManager:
     def __init__(self):
         self.vector_stores = {}
+        self.retrieval_cache = SemanticCache("retrieval", threshold=Config.SemanticCache.RETRIEVAL_THRESHOLD)
+        # Exact repeats of a query string skip the embeddings API entirely
+        self._query_embeddings = OrderedDict()
+        # Held by a brand's running refresh, whose crawl thread can outlive a timed-out job
+        self._refresh_locks = {}
 
-    def save_scraped_data(self, brand_name, scraped_data):
-        file_name = Config.Paths.SCRAPED_DATA_TEMPLATE.format(brand_name=brand_name)
-        os.makedirs(Config.Paths.DATA_DIR, exist_ok=True)
-        with open(file_name, "w", encoding="utf-8") as file:
-            json.dump(scraped_data, file, ensure_ascii=False, indent=4)
-        logging.info(f"Saved scraped data for {brand_name} to {file_name}")
+    def _cached_embedding(self, query):
+        key = " ".join(query.lower().split())
+        vector = self._query_embeddings.get(key)
+        if vector is not None:
+            self._query_embeddings.move_to_end(key)
+        return key, vector
+
+    def _remember_embedding(self, key, vector):
+        self._query_embeddings[key] = vector
+        if len(self._query_embeddings) > Config.SemanticCache.MAX_ENTRIES:
+            self._query_embeddings.popitem(last=False)
+
+    @staticmethod
+    def _record_embedding(texts, started, brand=None):
+        usage_tracker.record_embedding(get_embedding_model().model, time.perf_counter() - started, texts, brand=brand)
+
+    def embed_query(self, query, brand=None):
+        key, vector = self._cached_embedding(query)
+        if vector is None:
+            started = time.perf_counter()
+            vector = get_embedding_model().embed_query(query)
+            self._record_embedding([query], started, brand)
+            self._remember_embedding(key, vector)
+        return vector
+
+    async def aembed_query(self, query, brand=None):
+        key, vector = self._cached_embedding(query)
+        if vector is None:
+            started = time.perf_counter()
+            vector = await get_embedding_model().aembed_query(query)
+            self._record_embedding([query], started, brand)
+            self._remember_embedding(key, vector)
+        return vector
 
     def load_scraped_data(self, brand_name):
         file_name = Config.Paths.SCRAPED_DATA_TEMPLATE.format(brand_name=brand_name)
@@ -43,51 +91,266 @@ class VectorStoreManager:
             with open(file_name, "r", encoding="utf-8") as file:
                 logging.info(f"Loaded scraped data for {brand_name} from {file_name}")
                 return json.load(file)
+
+        # Crawls are streamed to a checkpoint; only a finished crawl counts as saved data. Its pages
+        # are streamed to the caller, so a large crawl is never held in memory as a whole.
+        checkpoint = CrawlCheckpoint.for_brand(brand_name)
+        if checkpoint.complete and checkpoint.has_pages:
+            logging.info(f"Loading scraped data for {brand_name} from {checkpoint.pages_path}")
+            return checkpoint.iter_pages()
         return None
 
-    def scrape_website_sync(self, brand_base_url):
-        return asyncio.run(scrape_website_recursive(brand_base_url, max_depth=Config.Scraper.MAX_DEPTH))
+    def scrape_website_sync(self, brand_base_url, brand_name, checkpoint=None, stop=None):
+        """
+        Crawl a brand's website into its checkpoint, resuming an interrupted crawl if there is one.
+
+        Crawls run on the shared browser pool's loop, so consecutive brands reuse one browser.
+
+        Args:
+            checkpoint (CrawlCheckpoint | None): Where to crawl to, defaults to the brand's checkpoint.
+            stop (threading.Event | None): Ends the crawl between pages once set, leaving it incomplete.
+
+        Returns:
+            Iterator[dict]: The crawled pages, streamed from the checkpoint.
+        """
+        from utils.browser_pool import browser_pool_service
+        from utils.playwright_scraper import scrape_website_recursive
+        from utils.url_scope import CrawlScope
+
+        scope = CrawlScope.for_brand(brand_base_url, brand_name)
+        checkpoint = checkpoint or CrawlCheckpoint.for_brand(brand_name)
+        browser_pool_service.run(scrape_website_recursive(
+            brand_base_url,
+            max_depth=Config.Scraper.MAX_DEPTH,
+            scope=scope,
+            checkpoint=checkpoint,
+            browser_pool=browser_pool_service.pool,
+            stop=stop,
+        ))
+        logging.info(f"Browser pool after crawling {brand_name}: {browser_pool_service.stats()}")
+        return checkpoint.iter_pages()
+
+    def _crawl_staged(self, brand_base_url, brand_name, stop=None):
+        """
+        Crawl a brand's website from scratch beside its saved crawl, which is left untouched.
+
+        Returns:
+            CrawlCheckpoint | None: The staged crawl, or None when it did not finish with any pages.
+        """
+        staged = CrawlCheckpoint.for_brand(brand_name).staging()
+        staged.reset()
+        try:
+            self.scrape_website_sync(brand_base_url, brand_name, checkpoint=staged, stop=stop)
+        except BaseException:
+            staged.reset()
+            raise
+        if staged.complete and staged.has_pages:
+            return staged
+        logging.warning(f"The new crawl of {brand_name} did not finish with any pages; its saved data is kept")
+        staged.reset()
+        return None
+
+    def _keep_crawl(self, brand_name, staged):
+        """
+        Make a staged crawl the brand's scraped data, dropping the data file that would take precedence.
+        """
+        CrawlCheckpoint.for_brand(brand_name).replace_with(staged)
+        file_name = Config.Paths.SCRAPED_DATA_TEMPLATE.format(brand_name=brand_name)
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+    def rescrape_brand(self, brand_base_url, brand_name):
+        """
+        Crawl a brand's website from scratch; the finished crawl replaces its scraped data if it has any pages.
+
+        Returns:
+            bool: Whether the scraped data was replaced.
+        """
+        staged = self._crawl_staged(brand_base_url, brand_name)
+        if staged is None:
+            return False
+        self._keep_crawl(brand_name, staged)
+        return True
+
+    def refresh_brand(self, brand_base_url, brand_name, stop=None):
+        """
+        Re-crawl one brand and replace its indices with ones built from the new crawl. The current
+        indices and scraped data are kept until the new crawl has pages and its indices are built,
+        and the other brands are untouched.
+
+        Args:
+            stop (threading.Event | None): Ends the crawl between pages once set, keeping the current data.
+
+        Returns:
+            bool: Whether indices were built from the new crawl.
+
+        Raises:
+            RuntimeError: If a refresh of the brand is already running.
+        """
+        lock = self._refresh_locks.setdefault(brand_name, threading.Lock())
+        if not lock.acquire(blocking=False):
+            raise RuntimeError(f"A refresh of {brand_name} is already running")
+        try:
+            staged = self._crawl_staged(brand_base_url, brand_name, stop)
+            if staged is None:
+                return False
+            try:
+                previous = self.vector_stores.get(brand_name)
+                self.build_indices_for_brand(brand_base_url, brand_name, rebuild=True, scraped_data=staged.iter_pages())
+                if self.vector_stores.get(brand_name) is previous:
+                    return False
+                self._keep_crawl(brand_name, staged)
+                return True
+            finally:
+                # No-op once the staged crawl was kept
+                staged.reset()
+        finally:
+            lock.release()
+
+    @staticmethod
+    def brand_documents(scraped_data, brand_name):
+        """
+        Build the documents of a brand's three indices from its scraped pages, in a single pass so
+        that `scraped_data` can be a stream of pages.
+
+        Returns:
+            tuple: Title documents, (chunk IDs, content chunk documents) and paragraph documents by ID.
+        """
+        from langchain.docstore.document import Document as LangChainDocument
+        from utils.chunking import StructuredChunker, chunk_id
+
+        title_documents = []
+        # Paragraphs repeated across pages (footers, disclaimers) are embedded once
+        paragraph_documents = {}
+
+        def pages():
+            # Collects titles and paragraphs while the chunker consumes the pages
+            for data in scraped_data:
+                if data.get("title"):
+                    title_documents.append(
+                        LangChainDocument(page_content=data["title"], metadata={"url": data["url"], "name": brand_name})
+                    )
+                for paragraph in data.get("paragraphs") or []:
+                    paragraph_id = chunk_id(paragraph) if paragraph else None
+                    if paragraph_id and paragraph_id not in paragraph_documents:
+                        paragraph_documents[paragraph_id] = LangChainDocument(
+                            page_content=paragraph,
+                            metadata={"url": data["url"], "title": data["title"], "name": brand_name, "chunk_id": paragraph_id},
+                        )
+                yield data
+
+        content_ids, content_documents = StructuredChunker().chunk_pages(pages(), brand_name)
+        return title_documents, (content_ids, content_documents), paragraph_documents
 
-    def build_indices_for_brand(self, brand_base_url, brand_name):
-        if brand_name in self.vector_stores:
+    def build_indices_for_brand(self, brand_base_url, brand_name, scrape=False, rebuild=False, scraped_data=None):
+        """
+        Build a brand's indices from its saved scraped data.
+
+        Args:
+            scrape (bool): Crawl the brand's website when there is no saved data. The API never does;
+                crawls run through `python -m utils.init_vector_store` or a `refresh_brand` job.
+            rebuild (bool): Build even if the brand has indices, replacing them once the new ones are complete.
+            scraped_data (Iterable[dict] | None): Pages to build from instead of the saved scraped data.
+        """
+        if brand_name in self.vector_stores and not rebuild:
             logging.info(f"Indices for {brand_name} already exist. Skipping build.")
             return
 
-        scraped_data = self.load_scraped_data(brand_name)
+        if scraped_data is None:
+            scraped_data = self.load_scraped_data(brand_name)
         if not scraped_data:
+            if not scrape:
+                logging.warning(f"No saved data found for {brand_name}. Skipping build until it is scraped.")
+                return
             logging.info(f"No saved data found for {brand_name}. Starting scraping.")
-            scraped_data = self.scrape_website_sync(brand_base_url)
-            self.save_scraped_data(brand_name, scraped_data)
+            scraped_data = self.scrape_website_sync(brand_base_url, brand_name)
 
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        title_documents = [
-            LangChainDocument(page_content=data["title"], metadata={"url": data["url"], "name": brand_name})
-            for data in scraped_data if data.get("title")
-        ]
-        content_documents = [
-            LangChainDocument(page_content=chunk, metadata={"url": data["url"], "title": data["title"], "name": brand_name})
-            for data in scraped_data if data.get("content")
-            for chunk in text_splitter.split_text(data["content"])
-        ]
-        paragraphs_documents = [
-            LangChainDocument(page_content=paragraph, metadata={"url": data["url"], "title": data["title"], "name": brand_name})
-            for data in scraped_data if data.get("paragraphs")
-            for paragraph in data["paragraphs"]
-        ]
+        from langchain_community.vectorstores import FAISS
+        from utils.compact_docstore import CompactDocstore
+        from utils.vector_compression import compress_vector_store
+
+        title_documents, (content_ids, content_documents), paragraph_documents = self.brand_documents(
+            scraped_data, brand_name
+        )
 
         # Build FAISS indices
-        title_faiss_index = FAISS.from_documents(title_documents, embedding_model)
-        content_faiss_index = FAISS.from_documents(content_documents, embedding_model)
-        paragraphs_faiss_index = FAISS.from_documents(paragraphs_documents, embedding_model)
+        embeddings = get_embedding_model()
+        started = time.perf_counter()
+        title_faiss_index = FAISS.from_documents(title_documents, embeddings)
+        content_faiss_index = FAISS.from_documents(content_documents, embeddings, ids=content_ids)
+        paragraphs_faiss_index = FAISS.from_documents(
+            list(paragraph_documents.values()), embeddings, ids=list(paragraph_documents)
+        )
+        self._record_embedding(
+            [
+                document.page_content
+                for documents in (title_documents, content_documents, paragraph_documents.values())
+                for document in documents
+            ],
+            started,
+            brand_name,
+        )
 
-        # Store indices in memory
-        self.vector_stores[brand_name] = {
+        if Config.VectorStore.COMPACT_DOCSTORE:
+            # Keep texts and metadata in columnar stores; Documents are materialized per search hit
+            for faiss_index in (title_faiss_index, content_faiss_index, paragraphs_faiss_index):
+                faiss_index.docstore = CompactDocstore.from_docstore(faiss_index.docstore)
+            bm25_index = BM25Index(content_ids, content_documents, docstore=content_faiss_index.docstore)
+        else:
+            bm25_index = BM25Index(content_ids, content_documents)
+
+        faiss_indices = {
             "title_index": title_faiss_index,
             "content_index": content_faiss_index,
             "paragraphs_index": paragraphs_faiss_index,
         }
+        vector_storage = {
+            index_name: compress_vector_store(
+                faiss_index,
+                Config.VectorStore.VECTOR_STORAGE,
+                vectors_path=Config.Paths.VECTORS_TEMPLATE.format(brand_name=brand_name, index_name=index_name),
+                rerank_factor=Config.VectorStore.RERANK_FACTOR,
+                pq_subquantizers=Config.VectorStore.PQ_SUBQUANTIZERS,
+                pq_bits=Config.VectorStore.PQ_BITS,
+            )
+            for index_name, faiss_index in faiss_indices.items()
+        }
+
+        # Store indices in memory, replacing any previous ones in a single assignment
+        self.vector_stores[brand_name] = {
+            **faiss_indices,
+            "bm25_index": bm25_index,
+            "vector_storage": vector_storage,
+        }
+        self.retrieval_cache.clear()
+        self.build_retrieval_matrix(brand_name)
         logging.info(f"Indices for {brand_name} built and stored.")
 
+    def build_retrieval_matrix(self, brand_name, topics=None):
+        """
+        Precompute the top-k chunks of every standard topic for a brand, so requests over those
+        topics skip embedding and search.
+        """
+        topics = topics or Config.VectorStore.STANDARD_TOPICS
+        k = Config.VectorStore.MATRIX_TOP_K
+        mode = Config.VectorStore.RETRIEVAL_MODE
+        try:
+            # One batched embeddings call for all topics
+            if mode == "lexical":
+                vectors = [None] * len(topics)
+            else:
+                started = time.perf_counter()
+                vectors = get_embedding_model().embed_documents(topics)
+                self._record_embedding(topics, started, brand_name)
+        except embedding_unavailable_errors() as e:
+            logging.warning(f"Could not embed standard topics for {brand_name}, skipping retrieval matrix: {e}")
+            return
+        rankings = [self._rank_topic(brand_name, topic, k, vector, mode) for topic, vector in zip(topics, vectors)]
+        bm25_index = self.vector_stores[brand_name]["bm25_index"]
+        self.vector_stores[brand_name]["retrieval_matrix"] = RetrievalMatrix.build(
+            topics, bm25_index.ids, rankings, k, mode, resolve=bm25_index.document
+        )
+
     def search_indices(self, brand_name, query, k_title=5, k_content=5):
         if brand_name not in self.vector_stores:
             logging.info(f"No indices found for {brand_name}. Building them.")
@@ -104,16 +367,121 @@ class VectorStoreManager:
 
         return "\n".join([result.page_content for result in paragraphs_results])
 
-    def retrieve_documents_by_topics(self, brand_name, topics, k=5):
+    def _precomputed(self, brand_name, topic, k, mode):
+        matrix = self.vector_stores[brand_name].get("retrieval_matrix")
+        return matrix.lookup(topic, k, mode) if matrix is not None else None
+
+    def retrieve_documents_by_topics(self, brand_name, topics, k=5, mode=None):
+        """
+        Retrieve the top `k` content chunks for each topic.
+
+        Standard topics are served from the brand's precomputed retrieval matrix; other topics are
+        searched live.
+
+        Args:
+            mode (str): "dense", "hybrid" or "lexical"; defaults to `Config.VectorStore.RETRIEVAL_MODE`.
+        """
         if brand_name not in self.vector_stores:
             logging.error(f"No indices available for {brand_name}.")
             return []
 
-        content_index = self.vector_stores[brand_name]["content_index"]
+        mode = mode or Config.VectorStore.RETRIEVAL_MODE
         results = []
-
         for topic in topics:
-            topic_results = content_index.similarity_search(topic, k=k)
-            results.extend(topic_results)
-
+            precomputed = self._precomputed(brand_name, topic, k, mode)
+            if precomputed is not None:
+                results.extend(precomputed)
+                continue
+            check_deadline("retrieval")
+            vector = None
+            if mode != "lexical":
+                try:
+                    vector = self.embed_query(topic, brand=brand_name)
+                except embedding_unavailable_errors() as e:
+                    logging.warning(f"Embedding topic '{topic}' failed, falling back to lexical retrieval: {e}")
+            results.extend(self._search_topic(brand_name, topic, k, vector, mode))
         return results
+
+    def _rank_topic(self, brand_name, topic, k, vector, mode):
+        """
+        Rank the content chunks of a brand for one topic.
+
+        Without a query vector (lexical mode or embeddings unavailable) only the BM25 index is used.
+        Scores are those of the retriever: BM25 score, fused RRF score or FAISS L2 distance.
+
+        Returns:
+            list[tuple[str, Document, float]]: (chunk_id, document, score), best first.
+        """
+        bm25_index = self.vector_stores[brand_name]["bm25_index"]
+        if vector is None or mode == "lexical":
+            return bm25_index.search(topic, k)
+
+        content_index = self.vector_stores[brand_name]["content_index"]
+        if mode == "hybrid":
+            candidates = k * Config.VectorStore.HYBRID_CANDIDATES_FACTOR
+            dense = content_index.similarity_search_by_vector(vector, k=candidates)
+            lexical = bm25_index.search(topic, candidates)
+            return reciprocal_rank_fusion(
+                [
+                    [(document.metadata["chunk_id"], document) for document in dense],
+                    [(document_id, document) for document_id, document, _ in lexical],
+                ],
+                k,
+                rrf_k=Config.VectorStore.RRF_K,
+            )
+        return [
+            (document.metadata["chunk_id"], document, float(distance))
+            for document, distance in content_index.similarity_search_with_score_by_vector(vector, k=k)
+        ]
+
+    def _search_topic(self, brand_name, topic, k, vector, mode):
+        """
+        Search one topic with the given retrieval mode, reusing results of semantically equivalent topics.
+        """
+        if vector is None or mode == "lexical":
+            return [document for _, document, _ in self._rank_topic(brand_name, topic, k, vector, mode)]
+
+        scope = f"{brand_name}:{k}:{mode}"
+        cached = self.retrieval_cache.lookup(scope, vector, topic)
+        if cached is not None:
+            return cached
+        topic_results = [document for _, document, _ in self._rank_topic(brand_name, topic, k, vector, mode)]
+        self.retrieval_cache.store(scope, vector, topic, topic_results)
+        return topic_results
+
+    async def _aembed_topic(self, topic, brand_name=None):
+        try:
+            return await within_deadline(self.aembed_query(topic, brand=brand_name), "embedding", timeout=Config.VectorStore.EMBEDDING_TIMEOUT)
+        except (asyncio.TimeoutError, *embedding_unavailable_errors()) as e:
+            logging.warning(f"Embedding topic '{topic}' failed, falling back to lexical retrieval: {e!r}")
+            return None
+
+    async def aretrieve_documents_by_topics(self, brand_name, topics, k=5, mode=None):
+        """
+        Async variant of `retrieve_documents_by_topics`; live topic searches run concurrently.
+
+        Topics whose embedding times out after `Config.VectorStore.EMBEDDING_TIMEOUT` seconds or is
+        rate-limited are answered from the BM25 index alone. Past the request deadline, embeddings
+        and searches stop with DeadlineExceeded.
+        """
+        if brand_name not in self.vector_stores:
+            logging.error(f"No indices available for {brand_name}.")
+            return []
+
+        mode = mode or Config.VectorStore.RETRIEVAL_MODE
+        precomputed = [self._precomputed(brand_name, topic, k, mode) for topic in topics]
+        live_topics = [topic for topic, documents in zip(topics, precomputed) if documents is None]
+        if mode == "lexical":
+            vectors = [None] * len(live_topics)
+        else:
+            vectors = await asyncio.gather(*(self._aembed_topic(topic, brand_name) for topic in live_topics))
+        searched = []
+        for topic, vector in zip(live_topics, vectors):
+            check_deadline("retrieval")
+            searched.append(self._search_topic(brand_name, topic, k, vector, mode))
+        live_results = iter(searched)
+        return [
+            document
+            for documents in precomputed
+            for document in (documents if documents is not None else next(live_results))
+        ]
@@ -18,6 +18,11 @@ class Config:
         Backend API configuration.
         """
         URL = os.environ.get("BACKEND_URL", "http://localhost:8000")
+        CONNECT_TIMEOUT = float(os.environ.get("BACKEND_CONNECT_TIMEOUT", 5))  # Seconds
+        READ_TIMEOUT = float(os.environ.get("BACKEND_READ_TIMEOUT", 180))  # Seconds; analyses call the LLM
+        POOL_SIZE = int(os.environ.get("BACKEND_POOL_SIZE", 10))  # Keep-alive connections to the backend
+        CACHE_TTL = int(os.environ.get("BACKEND_CACHE_TTL", 600))  # Seconds responses are reused per (endpoint, payload)
+        MAX_CONCURRENCY = int(os.environ.get("BACKEND_MAX_CONCURRENCY", 4))  # Parallel requests of "run all analyses"
 
     class UI:
         """
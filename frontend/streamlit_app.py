@@ -1,6 +1,9 @@
 import streamlit as st
 import requests
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from config import Config
 
 # Set up logging
@@ -17,6 +20,127 @@ banking_brands = Config.Data.BRANDS
 banking_topics = Config.Data.TOPICS
 time_periods = Config.Data.TIME_PERIODS
 
+
+class BackendError(Exception):
+    """
+    Non-200 response from the backend. Raised rather than returned so it is never cached.
+    """
+
+
+@st.cache_resource
+def http_session():
+    """
+    Keep-alive HTTP session shared by all reruns and user sessions of this Streamlit server.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.Backend.POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=Config.Backend.CACHE_TTL, show_spinner=False)
+def post_backend(endpoint, payload):
+    """
+    POST `payload` to a backend endpoint. Successful responses are memoized per (endpoint, payload)
+    for `Config.Backend.CACHE_TTL` seconds.
+    """
+    response = http_session().post(
+        f"{BACKEND_URL}{endpoint}",
+        json=payload,
+        timeout=(Config.Backend.CONNECT_TIMEOUT, Config.Backend.READ_TIMEOUT),
+        # The backend stops working on the request once this client would have given up
+        headers={"X-Request-Timeout": str(Config.Backend.READ_TIMEOUT)}
+    )
+    if response.status_code != 200:
+        logger.warning(f"{endpoint} returned {response.status_code}: {response.text[:200]}")
+        raise BackendError(response.status_code)
+    return response.json()
+
+
+def record_result(key, payload, error_message, fetch):
+    """
+    Call `fetch` and keep its result (or error) in the session state, so it survives reruns
+    triggered by other widgets.
+    """
+    try:
+        result = ("ok", fetch())
+    except BackendError:
+        result = ("error", error_message)
+    except Exception as e:
+        result = ("error", f"Error: {e}")
+    st.session_state[f"{key}_result"] = (payload, *result)
+
+
+def run_analysis(key, endpoint, payload, error_message):
+    with st.spinner("Running analysis..."):
+        record_result(key, payload, error_message, lambda: post_backend(endpoint, payload))
+
+
+def show_analysis(key):
+    """
+    Render the last result of an analysis in this session, if any.
+    """
+    if f"{key}_result" not in st.session_state:
+        return
+    payload, status, value = st.session_state[f"{key}_result"]
+    st.caption("Results for: " + ", ".join(
+        ", ".join(item) if isinstance(item, list) else str(item) for item in payload.values()
+    ))
+    if status == "ok":
+        st.json(value)
+    else:
+        st.error(value)
+
+
+def run_all_analyses(brand_name, time_period, topics):
+    """
+    Request every single-brand analysis concurrently and render each as soon as it completes.
+    Results also populate the matching sub-tabs.
+    """
+    analyses = [
+        ("visibility", "Brand Visibility", "/brand/visibility", {"brand_name": brand_name},
+         "Failed to fetch visibility analysis."),
+        ("trends", "Brand Trends", "/brand/trends", {"brand_name": brand_name, "time_period": time_period},
+         "Failed to fetch trend analysis."),
+        ("crisis_analysis", "Crisis Analysis", "/brand/crisis_analysis",
+         {"brand_name": brand_name, "time_period": time_period}, "Failed to fetch crisis analysis."),
+        ("health_score", "Brand Health Score", "/brand/health_score", {"brand_name": brand_name},
+         "Failed to fetch brand health score."),
+        ("audience_segmentation", "Audience Segmentation", "/brand/audience_segmentation",
+         {"brand_name": brand_name, "time_period": time_period}, "Failed to fetch audience segmentation."),
+    ]
+    if topics:
+        analyses += [
+            ("self_representation", "Self Representation", "/brand/self_representation",
+             {"brand_name": brand_name, "topics": topics}, "Failed to analyze self-representation."),
+            ("gpt_perception", "GPT Perception", "/brand/gpt_perception",
+             {"brand_name": brand_name, "topics": topics}, "Failed to analyze GPT perception."),
+            ("self_vs_gpt", "Self vs GPT Comparison", "/brand/self_vs_gpt",
+             {"brand_name": brand_name, "topics": topics}, "Failed to compare self vs GPT perception."),
+        ]
+
+    placeholders = {}
+    for key, title, *_ in analyses:
+        placeholders[key] = st.empty()
+        placeholders[key].info(f"{title}: running...")
+
+    # Worker threads get this script's context so the cached calls work outside the script thread
+    context = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=Config.Backend.MAX_CONCURRENCY, initializer=add_script_run_ctx, initargs=(None, context)
+    ) as executor:
+        futures = {
+            executor.submit(post_backend, endpoint, payload): (key, title, payload, error_message)
+            for key, title, endpoint, payload, error_message in analyses
+        }
+        for future in as_completed(futures):
+            key, title, payload, error_message = futures[future]
+            record_result(key, payload, error_message, future.result)
+            with placeholders[key].container():
+                st.markdown(f"**{title}**")
+                show_analysis(key)
+
 # Set the Streamlit page configuration
 st.set_page_config(
     page_title=Config.UI.PAGE_TITLE,
@@ -32,6 +156,19 @@ st.write(
     """
 )
 
+# Every single-brand analysis at once
+with st.expander("Run all analyses for a brand"):
+    run_all_columns = st.columns(3)
+    run_all_brand = run_all_columns[0].selectbox("Select the brand:", options=banking_brands, key="run_all_brand")
+    run_all_time_period = run_all_columns[1].selectbox(
+        "Select the time period:",
+        options=time_periods,
+        key="run_all_time_period"
+    )
+    run_all_topics = run_all_columns[2].multiselect("Select topics:", options=banking_topics, key="run_all_topics")
+    if st.button("Run All Analyses", key="run_all_button"):
+        run_all_analyses(run_all_brand, run_all_time_period, run_all_topics)
+
 # Main Tabs for broader categories
 main_tabs = st.tabs(["Visibility & Trends", "Competitor Insights", "Brand Health", "Perception Analysis"])
 
@@ -53,17 +190,12 @@ with main_tabs[0]:
         brand_name = st.selectbox("Select the brand:", options=banking_brands, key="visibility_brand_name")
         if st.button("Analyze Visibility", key="visibility_button"):
             if brand_name:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/visibility",
-                        json={"brand_name": brand_name}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch visibility analysis.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "visibility", "/brand/visibility",
+                    {"brand_name": brand_name},
+                    "Failed to fetch visibility analysis."
+                )
+        show_analysis("visibility")
 
     # Brand Trends
     with sub_tabs[1]:
@@ -78,17 +210,12 @@ with main_tabs[0]:
 
         if st.button("Analyze Trends", key="trends_button"):
             if brand_name:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/trends",
-                        json={"brand_name": brand_name, "time_period": selected_time_period}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch trend analysis.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "trends", "/brand/trends",
+                    {"brand_name": brand_name, "time_period": selected_time_period},
+                    "Failed to fetch trend analysis."
+                )
+        show_analysis("trends")
 
     # Regional Trends
     with sub_tabs[2]:
@@ -103,17 +230,12 @@ with main_tabs[0]:
         )
         if st.button("Get Regional Trends", key="regional_trends_button"):
             if brand_name and region:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/regional_trends",
-                        json={"brand_name": brand_name, "region": region, "time_period": selected_time_period}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch regional trends.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "regional_trends", "/brand/regional_trends",
+                    {"brand_name": brand_name, "region": region, "time_period": selected_time_period},
+                    "Failed to fetch regional trends."
+                )
+        show_analysis("regional_trends")
 
     # Crisis Analysis
     with sub_tabs[3]:
@@ -127,17 +249,12 @@ with main_tabs[0]:
         )
         if st.button("Analyze Crisis", key="crisis_analysis_button"):
             if brand_name:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/crisis_analysis",
-                        json={"brand_name": brand_name, "time_period": selected_time_period}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch crisis analysis.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "crisis_analysis", "/brand/crisis_analysis",
+                    {"brand_name": brand_name, "time_period": selected_time_period},
+                    "Failed to fetch crisis analysis."
+                )
+        show_analysis("crisis_analysis")
 
 # Competitor Insights Tab
 with main_tabs[1]:
@@ -159,17 +276,12 @@ with main_tabs[1]:
        
         if st.button("Get Overall Ranking", key="overall_ranking_button"):
             if brands and topics:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/rankings",
-                        json={"brands": brands, "topics": topics}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch overall ranking.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "overall_ranking", "/brand/rankings",
+                    {"brands": brands, "topics": topics},
+                    "Failed to fetch overall ranking."
+                )
+        show_analysis("overall_ranking")
                     
     # Brand Comparison
     with sub_tabs[1]:
@@ -183,17 +295,12 @@ with main_tabs[1]:
         )
         if st.button("Compare Brands", key="comparison_button"):
             if brand1 and brand2:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/comparison",
-                        json={"brand1": brand1, "brand2": brand2}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch brand comparison.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "comparison", "/brand/comparison",
+                    {"brand1": brand1, "brand2": brand2},
+                    "Failed to fetch brand comparison."
+                )
+        show_analysis("comparison")
 
     # Emerging Competitors
     with sub_tabs[2]:
@@ -203,17 +310,12 @@ with main_tabs[1]:
         industry = st.text_input("Enter the industry:", key="emerging_competitors_industry")
         if st.button("Get Emerging Competitors", key="emerging_competitors_button"):
             if brand_name and industry:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/emerging_competitors",
-                        json={"brand_name": brand_name, "industry": industry}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch emerging competitors.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "emerging_competitors", "/brand/emerging_competitors",
+                    {"brand_name": brand_name, "industry": industry},
+                    "Failed to fetch emerging competitors."
+                )
+        show_analysis("emerging_competitors")
 
     # Competitive Benchmarking
     with sub_tabs[3]:
@@ -232,17 +334,12 @@ with main_tabs[1]:
         )
         if st.button("Get Competitive Benchmarking", key="competitive_benchmarking_button"):
             if brand_name and competitors:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/competitive_benchmarking",
-                        json={"brand_name": brand_name, "competitors": competitors, "time_period": selected_time_period}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch competitive benchmarking.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "competitive_benchmarking", "/brand/competitive_benchmarking",
+                    {"brand_name": brand_name, "competitors": competitors, "time_period": selected_time_period},
+                    "Failed to fetch competitive benchmarking."
+                )
+        show_analysis("competitive_benchmarking")
 
 # Brand Health Tab
 with main_tabs[2]:
@@ -268,17 +365,12 @@ with main_tabs[2]:
 
         if st.button("Analyze Brand Health Score", key="health_score_button"):
             if brand_name:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/health_score",
-                        json={"brand_name": brand_name}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch brand health score.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "health_score", "/brand/health_score",
+                    {"brand_name": brand_name},
+                    "Failed to fetch brand health score."
+                )
+        show_analysis("health_score")
 
     # Audience Segmentation Subtab
     with sub_tabs[1]:
@@ -294,17 +386,12 @@ with main_tabs[2]:
 
         if st.button("Analyze Audience Segmentation", key="audience_segmentation_button"):
             if brand_name and time_period:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/audience_segmentation",
-                        json={"brand_name": brand_name, "time_period": time_period}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to fetch audience segmentation.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "audience_segmentation", "/brand/audience_segmentation",
+                    {"brand_name": brand_name, "time_period": time_period},
+                    "Failed to fetch audience segmentation."
+                )
+        show_analysis("audience_segmentation")
 
 
 # GPT Analysis Tab
@@ -330,17 +417,12 @@ with main_tabs[3]:
         )
         if st.button("Analyze Self Representation", key="self_representation_button"):
             if brand_name and topics:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/self_representation",
-                        json={"brand_name": brand_name, "topics": topics}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to analyze self-representation.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "self_representation", "/brand/self_representation",
+                    {"brand_name": brand_name, "topics": topics},
+                    "Failed to analyze self-representation."
+                )
+        show_analysis("self_representation")
 
     # GPT Perception
     with sub_tabs[1]:
@@ -354,17 +436,12 @@ with main_tabs[3]:
         )
         if st.button("Analyze GPT Perception", key="gpt_perception_button"):
             if brand_name and topics:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/gpt_perception",
-                        json={"brand_name": brand_name, "topics": topics}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to analyze GPT perception.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "gpt_perception", "/brand/gpt_perception",
+                    {"brand_name": brand_name, "topics": topics},
+                    "Failed to analyze GPT perception."
+                )
+        show_analysis("gpt_perception")
 
     # Self vs GPT Comparison
     with sub_tabs[2]:
@@ -378,17 +455,12 @@ with main_tabs[3]:
         )
         if st.button("Compare Self vs GPT", key="self_vs_gpt_button"):
             if brand_name and topics:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/self_vs_gpt",
-                        json={"brand_name": brand_name, "topics": topics}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to compare self vs GPT perception.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "self_vs_gpt", "/brand/self_vs_gpt",
+                    {"brand_name": brand_name, "topics": topics},
+                    "Failed to compare self vs GPT perception."
+                )
+        show_analysis("self_vs_gpt")
 
     # Self Representation Ranking
     with sub_tabs[3]:
@@ -398,14 +470,9 @@ with main_tabs[3]:
         topics = st.multiselect("Select topics:", options=banking_topics, key="self_representation_ranking_topics")
         if st.button("Rank Brands", key="self_representation_ranking_button"):
             if brands and topics:
-                try:
-                    response = requests.post(
-                        f"{BACKEND_URL}/brand/self_representation_ranking",
-                        json={"brands": brands, "topics": topics}
-                    )
-                    if response.status_code == 200:
-                        st.json(response.json())
-                    else:
-                        st.error("Failed to rank brands by self-representation.")
-                except Exception as e:
-                    st.error(f"Error: {e}")
+                run_analysis(
+                    "self_representation_ranking", "/brand/self_representation_ranking",
+                    {"brands": brands, "topics": topics},
+                    "Failed to rank brands by self-representation."
+                )
+        show_analysis("self_representation_ranking")